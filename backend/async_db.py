@@ -0,0 +1,266 @@
+"""
+Async, connection-pooled access to the Supabase tables.
+
+AsyncSupabaseDB mirrors db.SupabaseDB method for method, as awaitables. Queries
+go through postgrest-py's AsyncPostgrestClient (the async client supabase-py
+ships), whose httpx session is created with a bounded pool of keep-alive
+connections. Database I/O no longer blocks the event loop or occupies a
+threadpool slot, and concurrent requests reuse warm TLS connections.
+
+get_chat_context loads everything a chat turn reads in one round-trip time:
+concurrently, or with CHAT_CONTEXT_RPC=true through the get_chat_context
+Postgres function in create_tables.sql as a single request.
+"""
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+from dotenv import load_dotenv
+from postgrest import DEFAULT_POSTGREST_CLIENT_HEADERS, AsyncPostgrestClient
+
+from user_cache import user_cache
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "20"))
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", "10"))
+DB_POOL_KEEPALIVE_SECONDS = float(os.getenv("DB_POOL_KEEPALIVE_SECONDS", "60"))
+DB_TIMEOUT_SECONDS = float(os.getenv("DB_TIMEOUT_SECONDS", "10"))
+CHAT_CONTEXT_RPC = os.getenv("CHAT_CONTEXT_RPC", "false").lower() == "true"
+CHAT_LOGS_LIMIT = 30
+CHAT_MESSAGES_LIMIT = 50
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """AsyncPostgrestClient whose httpx session has bounded, keep-alive connection limits."""
+
+    def __init__(self, base_url: str, headers: Dict[str, str], limits: httpx.Limits,
+                 timeout: Union[int, float, httpx.Timeout] = DB_TIMEOUT_SECONDS):
+        # create_session runs inside the base constructor
+        self.limits = limits
+        super().__init__(base_url, headers=headers, timeout=timeout)
+
+    def create_session(self, base_url, headers, timeout, verify: bool = True, proxy: Optional[str] = None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=True,
+            limits=self.limits,
+        )
+
+
+def create_postgrest_client(url: Optional[str] = SUPABASE_URL, key: Optional[str] = SUPABASE_SERVICE_ROLE_KEY,
+                            max_connections: int = DB_POOL_MAX_CONNECTIONS, max_keepalive: int = DB_POOL_MAX_KEEPALIVE,
+                            keepalive_seconds: float = DB_POOL_KEEPALIVE_SECONDS,
+                            timeout: float = DB_TIMEOUT_SECONDS) -> PooledPostgrestClient:
+    if not all([url, key]):
+        raise ValueError("Missing required Supabase environment variables")
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                          keepalive_expiry=keepalive_seconds)
+    headers = {**DEFAULT_POSTGREST_CLIENT_HEADERS, "apikey": key, "Authorization": f"Bearer {key}"}
+    return PooledPostgrestClient(f"{url.rstrip('/')}/rest/v1", headers, limits, timeout)
+
+
+# Shared by every request in the process, created on first use; replaceable
+# (e.g. by the offline load-test fake)
+postgrest_client = None
+
+
+def get_postgrest() -> AsyncPostgrestClient:
+    global postgrest_client
+    if postgrest_client is None:
+        postgrest_client = create_postgrest_client()
+    return postgrest_client
+
+
+async def close_postgrest():
+    global postgrest_client
+    if postgrest_client is not None:
+        await postgrest_client.aclose()
+        postgrest_client = None
+
+
+class AsyncSupabaseDB:
+    """Async counterparts of db.SupabaseDB, with the same return values and error handling"""
+
+    @staticmethod
+    async def create_user(email: str, hashed_password: str, current_strategy: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new user"""
+        try:
+            data = {
+                "email": email,
+                "hashed_password": hashed_password,
+                "current_strategy": current_strategy
+            }
+            response = await get_postgrest().table('users').insert(data).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error creating user: {e}")
+            return None
+
+    @staticmethod
+    async def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
+        """Get user by email"""
+        try:
+            response = await get_postgrest().table('users').select('*').eq('email', email).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error getting user by email: {e}")
+            return None
+
+    @staticmethod
+    async def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
+        """Get user by ID"""
+        try:
+            response = await get_postgrest().table('users').select('*').eq('id', user_id).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error getting user by ID: {e}")
+            return None
+
+    @staticmethod
+    async def update_user_strategy(user_id: int, strategy: str) -> bool:
+        """Update user's current strategy"""
+        try:
+            await get_postgrest().table('users').update({"current_strategy": strategy}).eq('id', user_id).execute()
+            user_cache.invalidate(user_id=user_id)
+            return True
+        except Exception as e:
+            print(f"Error updating user strategy: {e}")
+            return False
+
+    @staticmethod
+    async def create_chat_message(user_id: int, sender: str, text: str) -> Optional[Dict[str, Any]]:
+        """Create a new chat message"""
+        try:
+            data = {
+                "user_id": user_id,
+                "sender": sender,
+                "text": text
+            }
+            response = await get_postgrest().table('chat_messages').insert(data).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error creating chat message: {e}")
+            return None
+
+    @staticmethod
+    async def get_chat_messages(user_id: int, limit: int = CHAT_MESSAGES_LIMIT) -> List[Dict[str, Any]]:
+        """Get chat messages for a user"""
+        try:
+            response = await get_postgrest().table('chat_messages').select('*').eq('user_id', user_id).order('timestamp', desc=True).limit(limit).execute()
+            return response.data or []
+        except Exception as e:
+            print(f"Error getting chat messages: {e}")
+            return []
+
+    @staticmethod
+    async def create_trial_period(user_id: int, strategy_name: str, start_date: str, end_date: str) -> Optional[Dict[str, Any]]:
+        """Create a new trial period"""
+        try:
+            data = {
+                "user_id": user_id,
+                "strategy_name": strategy_name,
+                "start_date": start_date,
+                "end_date": end_date,
+                "is_active": True
+            }
+            response = await get_postgrest().table('trial_periods').insert(data).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error creating trial period: {e}")
+            return None
+
+    @staticmethod
+    async def get_user_trial_periods(user_id: int) -> List[Dict[str, Any]]:
+        """Get trial periods for a user"""
+        try:
+            response = await get_postgrest().table('trial_periods').select('*').eq('user_id', user_id).order('created_at', desc=True).execute()
+            return response.data or []
+        except Exception as e:
+            print(f"Error getting trial periods: {e}")
+            return []
+
+    @staticmethod
+    async def create_daily_log(user_id: int, date: str, applied_strategy: bool, energy: int, mood: int,
+                               symptom_scores: Dict[str, int], extra_symptoms: Optional[str] = None,
+                               extra_notes: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Create a new daily log"""
+        try:
+            data = {
+                "user_id": user_id,
+                "date": date,
+                "applied_strategy": applied_strategy,
+                "energy": energy,
+                "mood": mood,
+                "symptom_scores": symptom_scores,
+                "extra_symptoms": extra_symptoms,
+                "extra_notes": extra_notes
+            }
+            response = await get_postgrest().table('daily_logs').insert(data).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error creating daily log: {e}")
+            return None
+
+    @staticmethod
+    async def get_user_logs(user_id: int, limit: int = CHAT_LOGS_LIMIT) -> List[Dict[str, Any]]:
+        """Get daily logs for a user"""
+        try:
+            response = await get_postgrest().table('daily_logs').select('*').eq('user_id', user_id).order('date', desc=True).limit(limit).execute()
+            return response.data or []
+        except Exception as e:
+            print(f"Error getting daily logs: {e}")
+            return []
+
+    @staticmethod
+    async def create_tracked_symptom(user_id: int, symptom: str, order: int = 0) -> Optional[Dict[str, Any]]:
+        """Create a tracked symptom"""
+        try:
+            data = {
+                "user_id": user_id,
+                "symptom": symptom,
+                "order": order
+            }
+            response = await get_postgrest().table('tracked_symptoms').insert(data).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error creating tracked symptom: {e}")
+            return None
+
+    @staticmethod
+    async def get_user_symptoms(user_id: int) -> List[Dict[str, Any]]:
+        """Get tracked symptoms for a user"""
+        try:
+            response = await get_postgrest().table('tracked_symptoms').select('*').eq('user_id', user_id).order('order').execute()
+            return response.data or []
+        except Exception as e:
+            print(f"Error getting tracked symptoms: {e}")
+            return []
+
+    @staticmethod
+    async def get_chat_context(user_id: int, logs_limit: int = CHAT_LOGS_LIMIT,
+                               messages_limit: int = CHAT_MESSAGES_LIMIT) -> Dict[str, List[Dict[str, Any]]]:
+        """Get a user's symptoms, recent logs and recent chat messages (newest first) in one round-trip time"""
+        if CHAT_CONTEXT_RPC:
+            try:
+                params = {"p_user_id": user_id, "p_logs_limit": logs_limit, "p_messages_limit": messages_limit}
+                response = await get_postgrest().rpc('get_chat_context', params).execute()
+                row = response.data[0] if response.data else {}
+                return {key: row.get(key) or [] for key in ('symptoms', 'logs', 'messages')}
+            except Exception as e:
+                print(f"Error getting chat context via RPC, falling back to separate reads: {e}")
+        symptoms, logs, messages = await asyncio.gather(
+            AsyncSupabaseDB.get_user_symptoms(user_id),
+            AsyncSupabaseDB.get_user_logs(user_id, logs_limit),
+            AsyncSupabaseDB.get_chat_messages(user_id, messages_limit),
+        )
+        return {"symptoms": symptoms, "logs": logs, "messages": messages}
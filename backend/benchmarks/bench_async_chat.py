@@ -0,0 +1,68 @@
+# python -m benchmarks.bench_async_chat
+"""
+Concurrency benchmark: blocking ChatEngine.invoke vs. awaited ChatEngine.ainvoke.
+
+Simulates N chat turns arriving at one uvicorn worker at once, with a fake LLM
+that takes as long as a real GPT-4 call. Blocking calls on the event loop run
+one after another; awaited calls overlap, so wall time stays close to a
+single call.
+"""
+import asyncio
+import time
+
+from benchmarks.fakes import FakeRetriever, SlowFakeChatModel, make_chat_history, make_docs
+from chat_engine import ChatEngine
+
+CONCURRENT_REQUESTS = 30
+LLM_DELAY_SECONDS = 0.2
+
+
+async def run_blocking(engine, history):
+    """What the old endpoint did: a sync call directly on the event loop."""
+    async def one_request():
+        return engine.invoke("What should I eat?", chat_history=history)
+    await asyncio.gather(*(one_request() for _ in range(CONCURRENT_REQUESTS)))
+
+
+async def run_async(engine, history):
+    await asyncio.gather(*(
+        engine.ainvoke("What should I eat?", chat_history=history)
+        for _ in range(CONCURRENT_REQUESTS)
+    ))
+
+
+async def probe_health(stop: asyncio.Event, latencies: list):
+    """Measures how long a trivial coroutine (like /health) waits for the loop."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def timed(label, coro_fn, engine, history):
+    stop = asyncio.Event()
+    latencies = []
+    probe = asyncio.create_task(probe_health(stop, latencies))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await coro_fn(engine, history)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    worst = max(latencies) * 1000 if latencies else 0.0
+    print(f"{label:<28} wall {elapsed:7.2f} s   worst /health stall {worst:8.1f} ms")
+
+
+async def main():
+    llm = SlowFakeChatModel(first_token_delay=LLM_DELAY_SECONDS, tokens_per_second=0)
+    engine = ChatEngine(llm, FakeRetriever(docs=make_docs()))
+    history = make_chat_history(turns=3)  # with history each turn makes two LLM calls
+
+    print(f"{CONCURRENT_REQUESTS} concurrent chat turns, {LLM_DELAY_SECONDS}s per LLM call\n")
+    await timed("blocking invoke on loop", run_blocking, engine, history)
+    await timed("awaited ainvoke", run_async, engine, history)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
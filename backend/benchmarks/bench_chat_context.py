@@ -0,0 +1,41 @@
+# python -m benchmarks.bench_chat_context
+"""
+Prompt-context size as a user's history grows: raw dumps vs. the token-budgeted builder.
+
+The raw variant reproduces the profile string /api/v1/chat used to build (full
+strategy dict, every log dict with notes) plus all fetched messages.
+"""
+from benchmarks.fakes import make_chat_history
+from benchmarks.fixtures import STRATEGY_DETAILS, SYMPTOMS, USER, make_logs
+from chat_context import build_user_profile, count_tokens, trim_history
+
+
+def raw_context(logs, history):
+    profile = f"""
+User Profile:
+- Email: {USER['email']}
+- Symptoms: {', '.join(SYMPTOMS)}
+- Goals: None
+- Current Strategy: {USER['current_strategy']}
+- Strategy Details: {STRATEGY_DETAILS}
+- Progress/Logs: {logs}
+"""
+    return count_tokens(profile) + sum(count_tokens(text) + 4 for _, text in history)
+
+
+def budgeted_context(logs, history):
+    profile = build_user_profile(USER, SYMPTOMS, STRATEGY_DETAILS, logs)
+    _, history_tokens = trim_history(history)
+    return count_tokens(profile) + history_tokens
+
+
+def main():
+    print(f"{'logs':>5} {'messages':>9} {'raw tokens':>11} {'budgeted':>9}")
+    for days, turns in [(1, 1), (7, 5), (14, 10), (30, 25)]:
+        logs = make_logs(days)
+        history = make_chat_history(turns)
+        print(f"{days:>5} {len(history):>9} {raw_context(logs, history):>11} {budgeted_context(logs, history):>9}")
+
+
+if __name__ == "__main__":
+    main()
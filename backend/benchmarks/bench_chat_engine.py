@@ -0,0 +1,92 @@
+# python -m benchmarks.bench_chat_engine
+"""
+Micro-benchmark: per-request chain construction vs. the prebuilt ChatEngine.
+
+The legacy path rebuilds the prompt, a ConversationBufferMemory and a
+ConversationalRetrievalChain on every chat turn and replays the history into
+the memory. The ChatEngine path reuses runnables built once. Both run against
+a fake LLM and a fake retriever so only framework overhead is measured.
+"""
+import time
+import tracemalloc
+
+from langchain.chains import ConversationalRetrievalChain
+from langchain.memory import ConversationBufferMemory
+from langchain.prompts import PromptTemplate
+
+from benchmarks.fakes import FakeRetriever, make_chat_history, make_docs, make_fake_llm
+from chat_engine import CHAT_PROMPT_TEMPLATE, ChatEngine
+
+ITERATIONS = 200
+
+
+def build_legacy_chain(llm, retriever, chat_history):
+    """What generate_advice did on every call before the ChatEngine existed."""
+    prompt_template = PromptTemplate(
+        input_variables=["context", "question", "user_profile"],
+        template=CHAT_PROMPT_TEMPLATE
+    )
+    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True, output_key="answer")
+    for sender, text in chat_history:
+        if sender == 'user':
+            memory.chat_memory.add_user_message(text)
+        elif sender == 'bot':
+            memory.chat_memory.add_ai_message(text)
+    return ConversationalRetrievalChain.from_llm(
+        llm=llm,
+        retriever=retriever,
+        memory=memory,
+        return_source_documents=True,
+        combine_docs_chain_kwargs={"prompt": prompt_template},
+        output_key="answer"
+    )
+
+
+def measure(label, fn, iterations=ITERATIONS):
+    """Run fn repeatedly; report mean latency and bytes allocated per call."""
+    fn()  # warm-up
+    tracemalloc.start()
+    start_snapshot = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    end_snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in end_snapshot.compare_to(start_snapshot, "filename") if stat.size_diff > 0)
+    mean_ms = elapsed / iterations * 1000
+    print(f"{label:<40} {mean_ms:8.3f} ms/call   peak {peak / 1024:8.1f} KiB   retained {allocated / iterations:8.0f} B/call")
+    return mean_ms
+
+
+def main():
+    llm = make_fake_llm()
+    retriever = FakeRetriever(docs=make_docs())
+    history = make_chat_history(turns=25)  # main.chat replays up to 50 messages
+    profile = "User Profile:\n- Symptoms: Fatigue, Cravings\n- Current Strategy: Bloedsuiker in balans"
+    question = "What should I eat tonight?"
+
+    engine = ChatEngine(llm, retriever)
+
+    print(f"Chat chain benchmark ({ITERATIONS} iterations, {len(history)} history messages)\n")
+    print("Construction only")
+    legacy_build = measure("  legacy: build chain + replay memory", lambda: build_legacy_chain(llm, retriever, history))
+
+    print("\nFull chat turn (fake LLM, fake retriever)")
+    legacy_turn = measure(
+        "  legacy: build + invoke",
+        lambda: build_legacy_chain(llm, retriever, history)({"question": question, "user_profile": profile}),
+    )
+    engine_turn = measure(
+        "  ChatEngine.invoke",
+        lambda: engine.invoke(question, user_profile=profile, chat_history=history),
+    )
+
+    print(f"\nPer-request construction removed: {legacy_build:.3f} ms "
+          f"({legacy_build / legacy_turn * 100:.0f}% of a legacy turn)")
+    print(f"Turn speed-up: {legacy_turn / engine_turn:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
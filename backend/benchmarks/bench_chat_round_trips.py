@@ -0,0 +1,132 @@
+# python -m benchmarks.bench_chat_round_trips [--iterations 30] [--db-latency 0.015] [--llm-delay 0.4] [--tokens-per-second 80] [--embed-delay 0.05]
+"""
+Supabase round trips of one /api/v1/chat turn, before and after batching.
+
+"serial" replays the database calls the endpoint used to make one after another
+(user lookup, symptoms, logs, chat history, insert user message, insert bot
+message, full history re-read) against the fake, without the LLM. "concurrent"
+and "rpc" run real chat turns through the app on the offline backend, with
+async_db.CHAT_CONTEXT_RPC off and on, and read the per-stage times from the
+Server-Timing header: "context" and "store" are the database stages, and the
+user message is stored while the LLM answers.
+
+The user cache is cleared before every turn so every mode pays for the user
+lookup. Per mode it reports Supabase requests per turn and the database time.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import shutil
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.fake_supabase import FakeSupabaseClient
+from benchmarks.fakes import make_chat_history
+from benchmarks.fixtures import CHAT_QUESTIONS, SYMPTOMS, make_logs
+from benchmarks.latency import format_ms, summarize
+from benchmarks.offline_app import add_backend_arguments, backend_from_arguments
+
+SEED_LOG_DAYS = 30
+SEED_CHAT_TURNS = 20
+DB_STAGES = ("context", "store")
+
+
+def parse_server_timing(header: str) -> dict:
+    timings = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, _, duration = entry.partition(";dur=")
+        timings[name] = float(duration) / 1000
+    return timings
+
+
+async def seed_user(http: httpx.AsyncClient, supabase: FakeSupabaseClient) -> dict:
+    """Register a user with tracked symptoms, a month of logs and some chat history; returns auth headers."""
+    response = await http.post("/api/v1/register", json={"email": "round-trips@example.com", "password": "bench-password"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await http.post("/api/v1/symptoms", headers=headers, json=SYMPTOMS)
+    user_id = supabase.tables["users"][0]["id"]
+    supabase.table("daily_logs").insert([{**log, "user_id": user_id} for log in make_logs(SEED_LOG_DAYS)]).execute()
+    supabase.table("chat_messages").insert(
+        [{"user_id": user_id, "sender": sender, "text": text} for sender, text in make_chat_history(SEED_CHAT_TURNS)]
+    ).execute()
+    return headers
+
+
+async def serial_turn(email: str, question: str, answer: str) -> float:
+    """The endpoint's previous database calls, in series; returns their wall time."""
+    from async_db import AsyncSupabaseDB
+
+    start = time.perf_counter()
+    user = await AsyncSupabaseDB.get_user_by_email(email)
+    await AsyncSupabaseDB.get_user_symptoms(user["id"])
+    await AsyncSupabaseDB.get_user_logs(user["id"])
+    await AsyncSupabaseDB.get_chat_messages(user["id"])
+    await AsyncSupabaseDB.create_chat_message(user["id"], "user", question)
+    await AsyncSupabaseDB.create_chat_message(user["id"], "bot", answer)
+    await AsyncSupabaseDB.get_chat_messages(user["id"])
+    return time.perf_counter() - start
+
+
+async def run_mode(mode: str, http: httpx.AsyncClient, headers: dict, supabase: FakeSupabaseClient, iterations: int):
+    """Returns (db seconds per turn, mean seconds per stage, Supabase requests per turn)."""
+    import async_db
+    from user_cache import user_cache
+
+    async_db.CHAT_CONTEXT_RPC = mode == "rpc"
+    db_times = []
+    stage_totals = defaultdict(float)
+    requests_before = supabase.stats()["requests"]
+    for i in range(iterations):
+        user_cache.clear()
+        question = CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)]
+        if mode == "serial":
+            db_times.append(await serial_turn("round-trips@example.com", question, "Serial baseline answer."))
+            continue
+        response = await http.post("/api/v1/chat", headers=headers, json={"question": question})
+        response.raise_for_status()
+        timings = parse_server_timing(response.headers["Server-Timing"])
+        db_times.append(sum(timings.get(stage, 0.0) for stage in DB_STAGES))
+        for stage, seconds in timings.items():
+            stage_totals[stage] += seconds
+    requests = (supabase.stats()["requests"] - requests_before) / iterations
+    return db_times, {stage: seconds / iterations for stage, seconds in stage_totals.items()}, requests
+
+
+async def run(args, app, supabase: FakeSupabaseClient, out):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://offline", timeout=120.0) as http:
+        headers = await seed_user(http, supabase)
+        await http.post("/api/v1/chat", headers=headers, json={"question": CHAT_QUESTIONS[0]})  # warm-up
+        for mode in ("serial", "concurrent", "rpc"):
+            db_times, stages, requests = await run_mode(mode, http, headers, supabase, args.iterations)
+            summary = summarize(db_times)
+            print(f"{mode:<11} {requests:4.1f} requests/turn  db {format_ms(summary)}  mean {summary['mean'] * 1000:6.1f} ms", file=out)
+            if stages:
+                breakdown = "  ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in stages.items())
+                print(f"{'':<11} stages: {breakdown}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+
+    app, supabase, snapshot = backend_from_arguments(args)
+    print(f"Fake Supabase {args.db_latency * 1000:.0f} ms/request, {SEED_LOG_DAYS} logs, "
+          f"{SEED_CHAT_TURNS * 2} seeded messages, {args.iterations} turns per mode\n")
+    out = sys.stdout
+    try:
+        # The endpoint's debug logging would drown the report
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            asyncio.run(run(args, app, supabase, out))
+    finally:
+        snapshot.close()
+        shutil.rmtree(snapshot.path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# python -m benchmarks.bench_chat_stream
+"""
+Time-to-first-token benchmark for the streaming chat path.
+
+Compares when the first byte of the answer is available with ChatEngine.ainvoke
+(whole answer at once, as /api/v1/chat does) against ChatEngine.astream (token by
+token, as /api/v1/chat/stream does), using a local fake LLM with a fixed
+first-token delay and token rate.
+"""
+import asyncio
+import time
+
+from benchmarks.fakes import FakeRetriever, SlowFakeChatModel, make_docs
+from chat_engine import ChatEngine
+
+FIRST_TOKEN_DELAY = 0.3
+TOKENS_PER_SECOND = 40
+ANSWER = " ".join(["Focus on magnesium, complex carbohydrates and B-vitamins in your luteal phase."] * 8)
+
+
+async def time_invoke(engine):
+    start = time.perf_counter()
+    result = await engine.ainvoke("What should I eat in my luteal phase?")
+    total = time.perf_counter() - start
+    return total, total, len(result["answer"])
+
+
+async def time_stream(engine):
+    start = time.perf_counter()
+    first_token = None
+    chars = 0
+    async for token in engine.astream("What should I eat in my luteal phase?"):
+        if first_token is None:
+            first_token = time.perf_counter() - start
+        chars += len(token)
+    return first_token, time.perf_counter() - start, chars
+
+
+async def main():
+    llm = SlowFakeChatModel(answer=ANSWER, first_token_delay=FIRST_TOKEN_DELAY, tokens_per_second=TOKENS_PER_SECOND)
+    engine = ChatEngine(llm, FakeRetriever(docs=make_docs()))
+
+    ttft_invoke, total_invoke, chars_invoke = await time_invoke(engine)
+    ttft_stream, total_stream, chars_stream = await time_stream(engine)
+
+    print(f"Fake LLM: {FIRST_TOKEN_DELAY}s to first token, {TOKENS_PER_SECOND} tokens/s\n")
+    print(f"{'path':<12} {'first token':>12} {'total':>10} {'chars':>8}")
+    print(f"{'ainvoke':<12} {ttft_invoke:>11.3f}s {total_invoke:>9.3f}s {chars_invoke:>8}")
+    print(f"{'astream':<12} {ttft_stream:>11.3f}s {total_stream:>9.3f}s {chars_stream:>8}")
+
+    assert chars_stream == chars_invoke, "streamed answer differs from invoked answer"
+    assert ttft_stream < total_invoke / 2, "streaming did not improve time-to-first-token"
+    print(f"\nTime-to-first-token improved {ttft_invoke / ttft_stream:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+# python -m benchmarks.bench_condense_modes
+"""
+Per-mode chat-turn latency for the question-condensing strategies.
+
+The main fake LLM stands in for GPT-4, the condense fake for a small fast
+model. Every turn has chat history, so CONDENSE_LLM always pays for two LLM
+calls while the other modes skip or shorten the first one.
+"""
+import time
+
+from benchmarks.fakes import FakeRetriever, SlowFakeChatModel, make_chat_history, make_docs
+from chat_engine import CONDENSE_FAST_MODEL, CONDENSE_MODES, ChatEngine
+
+MAIN_LLM_DELAY = 0.4
+FAST_LLM_DELAY = 0.08
+
+QUESTIONS = [
+    "What should I eat during my luteal phase for more energy?",
+    "Which foods help with PMS cramps and bloating?",
+    "And what about snacks?",
+    "Is it safe to keep doing that every day?",
+    "Why am I so tired before my period starts?",
+    "How much magnesium do I need per day?",
+]
+
+
+def main():
+    main_llm = SlowFakeChatModel(first_token_delay=MAIN_LLM_DELAY, tokens_per_second=0)
+    fast_llm = SlowFakeChatModel(first_token_delay=FAST_LLM_DELAY, tokens_per_second=0)
+    retriever = FakeRetriever(docs=make_docs())
+    history = make_chat_history(turns=3)
+
+    print(f"{len(QUESTIONS)} follow-up turns; main LLM {MAIN_LLM_DELAY}s, fast LLM {FAST_LLM_DELAY}s\n")
+    print(f"{'mode':<12} {'mean turn':>10} {'condense':>10} {'llm rewrites':>13}")
+    for mode in CONDENSE_MODES:
+        engine = ChatEngine(
+            main_llm, retriever, condense_mode=mode,
+            condense_llm=fast_llm if mode == CONDENSE_FAST_MODEL else None,
+        )
+        start = time.perf_counter()
+        for question in QUESTIONS:
+            engine.invoke(question, chat_history=history)
+        mean_turn_ms = (time.perf_counter() - start) / len(QUESTIONS) * 1000
+        stats = engine.condense_stats()[mode]
+        print(f"{mode:<12} {mean_turn_ms:>8.0f}ms {stats['mean_ms']:>8.0f}ms {stats['llm_calls']:>7}/{stats['turns']}")
+
+
+if __name__ == "__main__":
+    main()
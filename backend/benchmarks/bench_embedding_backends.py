@@ -0,0 +1,74 @@
+# python -m benchmarks.bench_embedding_backends
+"""
+Query-embedding latency and document throughput: local ONNX model vs OpenAI.
+
+Calls the uncached backends directly, so every number is a real model call.
+The OpenAI path is skipped when OPENAI_API_KEY is not set, the ONNX path when
+the model directory (ONNX_EMBEDDING_MODEL_DIR) is missing.
+"""
+import json
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from embedding_backends import BACKEND_ONNX, BACKEND_OPENAI, ONNX_MODEL_DIR, make_embeddings
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNKS_PATH = os.path.join(BASE_DIR, "data", "processed", "chunks_AlisaVita.json")
+QUERIES = [
+    "magnesium",
+    "What should I eat during my luteal phase to reduce cravings?",
+    "Which foods support estrogen detox in the follicular phase?",
+    "How can seed cycling help with irregular cycles?",
+    "I feel tired and bloated before my period, what can I change in my diet?",
+]
+QUERY_ROUNDS = 4
+DOCUMENTS = 256
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def bench(backend, documents):
+    model = make_embeddings(backend)
+    model.embed_query("warm-up")
+
+    latencies = []
+    for _ in range(QUERY_ROUNDS):
+        for query in QUERIES:
+            start = time.perf_counter()
+            model.embed_query(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    vectors = model.embed_documents(documents)
+    throughput = len(documents) / (time.perf_counter() - start)
+
+    print(f"{backend:<8} dim {len(vectors[0]):>5}  query p50 {statistics.median(latencies):8.2f} ms  "
+          f"p95 {percentile(latencies, 95):8.2f} ms  documents {throughput:8.1f}/s")
+
+
+def main():
+    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+        documents = json.load(f)[:DOCUMENTS]
+    print(f"{len(QUERIES) * QUERY_ROUNDS} queries, {len(documents)} book chunks\n")
+
+    if os.path.exists(os.path.join(ONNX_MODEL_DIR, "model.onnx")):
+        bench(BACKEND_ONNX, documents)
+    else:
+        print(f"onnx     skipped: no model.onnx in {ONNX_MODEL_DIR}")
+
+    if os.getenv("OPENAI_API_KEY"):
+        bench(BACKEND_OPENAI, documents)
+    else:
+        print("openai   skipped: OPENAI_API_KEY not set")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# python -m benchmarks.bench_incremental_build
+"""
+Build time for full, no-op and partial rebuilds of the book vectorstore.
+
+Uses the real book chunks and a fake embedding model with a fixed per-request
+latency (no OpenAI calls), so the numbers show what the manifest and the
+concurrent batching save rather than the provider's speed.
+"""
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+from typing import List
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from lexical_index import CHUNKS_PATH
+from vectorstore_build import build_incremental, format_report
+
+DIM = 256
+REQUEST_LATENCY = 0.2  # seconds per embedding request, like a remote API call
+EDITED_FRACTION = 0.05
+
+
+class SlowFakeEmbeddings(DeterministicFakeEmbedding):
+    namespace: str = "slow-fake"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(REQUEST_LATENCY)
+        return super().embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(REQUEST_LATENCY)
+        return super().embed_documents(texts)
+
+
+def main():
+    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    documents = [Document(page_content=chunk, metadata={"source": "AlisaVita"}) for chunk in chunks]
+    embeddings = SlowFakeEmbeddings(size=DIM)
+
+    workdir = tempfile.mkdtemp()
+    try:
+        # The old path: Chroma.from_documents embeds everything, one request per batch, serially
+        start = time.perf_counter()
+        batch = 128
+        for i in range(0, len(documents), batch):
+            embeddings.embed_documents([d.page_content for d in documents[i:i + batch]])
+        print(f"serial full embed (old path)   {time.perf_counter() - start:6.2f}s")
+
+        store = Chroma(collection_name="langchain", persist_directory=workdir, embedding_function=embeddings)
+        print(f"full build     {format_report(build_incremental(store, documents, embeddings, workdir))}")
+        print(f"no-op rebuild  {format_report(build_incremental(store, documents, embeddings, workdir))}")
+
+        edited = list(documents)
+        step = int(1 / EDITED_FRACTION)
+        for i in range(0, len(edited), step):
+            edited[i] = Document(page_content=edited[i].page_content + " (revised)", metadata=edited[i].metadata)
+        edited = edited[:-10]  # and drop a few chunks
+        print(f"partial build  {format_report(build_incremental(store, edited, embeddings, workdir))}")
+        assert store._collection.count() == len({d.page_content for d in edited})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
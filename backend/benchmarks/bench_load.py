@@ -0,0 +1,167 @@
+# python -m benchmarks.bench_load [--url http://127.0.0.1:8001] [--concurrency 1,4,16,64] [--journeys 2] [--chat-turns 2]
+"""
+Load test: realistic user journeys against the API at increasing concurrency.
+
+Each virtual user runs journeys back to back: register, submit the intake and
+get strategies, pick the first one, set tracked symptoms, log today and read it
+back, a few chat turns, then open the profile. Every level starts with fresh
+users. Per level it reports journeys/s and, per endpoint, requests/s, errors
+and p50/p95/p99 latency.
+
+Without --url the app runs in-process on the offline backend (benchmarks/offline_app:
+FakeSupabaseClient + fake OpenAI models) behind httpx's ASGI transport. For real
+HTTP, start `python -m benchmarks.offline_app` (or any deployment) and pass its URL;
+the load generator then runs in its own process.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import shutil
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.fixtures import CHAT_QUESTIONS, INTAKES, SYMPTOMS
+from benchmarks.latency import PERCENTILES, summarize
+from benchmarks.offline_app import add_backend_arguments, backend_from_arguments
+
+REQUEST_TIMEOUT_SECONDS = 120.0
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+class LoadStats:
+    """Latencies and error counts per endpoint label ("POST /api/v1/chat")."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.journeys = 0
+        self.failed_journeys = 0
+
+    def record(self, label: str, seconds: float, ok: bool):
+        self.latencies[label].append(seconds)
+        if not ok:
+            self.errors[label] += 1
+
+    def requests(self) -> int:
+        return sum(len(samples) for samples in self.latencies.values())
+
+
+async def run_journey(client: httpx.AsyncClient, stats: LoadStats, email: str, user_no: int, chat_turns: int):
+    async def call(method: str, path: str, label: str = None, **kwargs) -> httpx.Response:
+        label = label or f"{method} {path}"
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        stats.record(label, time.perf_counter() - start, ok)
+        if not ok:
+            raise JourneyFailed(label)
+        return response
+
+    response = await call("POST", "/api/v1/register", json={"email": email, "password": "load-test-password"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    intake = INTAKES[user_no % len(INTAKES)]
+    recommended = (await call("POST", "/api/v1/strategies", json=intake)).json()["strategies"]
+    if recommended:
+        await call("POST", "/api/v1/set_strategy", headers=headers, json={"strategy_name": recommended[0]["Strategie naam"]})
+    await call("POST", "/api/v1/symptoms", headers=headers, json=SYMPTOMS)
+
+    await call("POST", "/api/v1/logs/today", headers=headers, json={
+        "applied_strategy": True,
+        "energy": 3 + user_no % 6,
+        "mood": 4 + user_no % 5,
+        "symptom_scores": {symptom: (user_no + i) % 6 for i, symptom in enumerate(SYMPTOMS)},
+        "extra_notes": "Felt a bit tired after lunch.",
+    })
+    await call("GET", "/api/v1/logs/today", headers=headers)
+
+    for turn in range(chat_turns):
+        question = CHAT_QUESTIONS[(user_no + turn) % len(CHAT_QUESTIONS)]
+        await call("POST", "/api/v1/chat", headers=headers, json={"question": question})
+    await call("GET", "/api/v1/profile", headers=headers)
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, journeys_per_user: int, chat_turns: int):
+    stats = LoadStats()
+    run_id = uuid.uuid4().hex[:8]
+
+    async def virtual_user(user_no: int):
+        for journey_no in range(journeys_per_user):
+            email = f"load-{run_id}-{user_no}-{journey_no}@example.com"
+            try:
+                await run_journey(client, stats, email, user_no, chat_turns)
+                stats.journeys += 1
+            except JourneyFailed:
+                stats.failed_journeys += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user(user_no) for user_no in range(concurrency)))
+    return stats, time.perf_counter() - start
+
+
+def print_level(concurrency: int, stats: LoadStats, elapsed: float, out):
+    print(f"\nconcurrency {concurrency}: {stats.journeys} journeys in {elapsed:.1f}s "
+          f"({stats.journeys / elapsed:.2f} journeys/s, {stats.requests() / elapsed:.1f} req/s), "
+          f"{stats.failed_journeys} failed", file=out)
+    header = "  ".join(f"{'p' + str(p):>8}" for p in PERCENTILES)
+    print(f"  {'endpoint':<28} {'n':>5} {'err':>4} {'req/s':>7}  {header}", file=out)
+    for label, samples in stats.latencies.items():
+        summary = summarize(samples)
+        percentiles = "  ".join(f"{summary[f'p{p}'] * 1000:6.0f}ms" for p in PERCENTILES)
+        print(f"  {label:<28} {len(samples):>5} {stats.errors[label]:>4} {len(samples) / elapsed:>7.1f}  {percentiles}", file=out)
+    out.flush()
+
+
+async def run(args, client: httpx.AsyncClient, out):
+    async with client:
+        for concurrency in args.concurrency:
+            stats, elapsed = await run_level(client, concurrency, args.journeys, args.chat_turns)
+            print_level(concurrency, stats, elapsed, out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API with user journeys at increasing concurrency")
+    parser.add_argument("--url", help="base URL of a running API; in-process offline backend when omitted")
+    parser.add_argument("--concurrency", type=lambda value: [int(c) for c in value.split(",")], default=[1, 4, 16, 64])
+    parser.add_argument("--journeys", type=int, default=2, help="journeys per virtual user and level")
+    parser.add_argument("--chat-turns", type=int, default=2)
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    if args.url:
+        print(f"Load-testing {args.url}")
+        client = httpx.AsyncClient(base_url=args.url, timeout=REQUEST_TIMEOUT_SECONDS, limits=limits)
+        asyncio.run(run(args, client, sys.stdout))
+        return
+
+    app, supabase_client, snapshot = backend_from_arguments(args)
+    print(f"Load-testing the in-process app on the offline backend: Supabase {args.db_latency * 1000:.0f} ms/request, "
+          f"LLM {args.llm_delay * 1000:.0f} ms to first token at {args.tokens_per_second:.0f} tokens/s, "
+          f"embeddings {args.embed_delay * 1000:.0f} ms/request")
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://offline",
+                               timeout=REQUEST_TIMEOUT_SECONDS, limits=limits)
+    out = sys.stdout
+    try:
+        # The endpoints' debug logging would drown the report
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            asyncio.run(run(args, client, out))
+        print(f"\nFake Supabase: {supabase_client.stats()['requests']} requests")
+    finally:
+        snapshot.close()
+        shutil.rmtree(snapshot.path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
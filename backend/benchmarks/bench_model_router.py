@@ -0,0 +1,62 @@
+# python -m benchmarks.bench_model_router
+"""
+Chat-turn latency with and without the model router, on fake local models.
+
+The standard fake stands in for GPT-4, the fast fake for a small model. Short
+questions early in a conversation go to the fast tier; long questions and deep
+conversations stay on the standard model. Also checks the routing decisions.
+"""
+import time
+
+from benchmarks.fakes import FakeRetriever, SlowFakeChatModel, make_chat_history, make_docs
+from chat_engine import CONDENSE_HEURISTIC, ChatEngine
+from model_router import TIER_FAST, TIER_STANDARD, ModelRouter, default_tiers
+
+STANDARD_LLM_DELAY = 0.4
+FAST_LLM_DELAY = 0.08
+TOKENS_PER_SECOND = 200
+
+LONG_QUESTION = (
+    "I have had irregular cycles for a year, with heavy cramps, acne along my jaw and low energy in the second half "
+    "of my cycle. I'm vegetarian and I already take magnesium. What should I change in my diet per cycle phase, and "
+    "which foods should I avoid while I try to get my cycle more regular again?"
+)
+TURNS = [
+    ("How much magnesium do I need per day?", 0),
+    ("Are pumpkin seeds a good snack?", 2),
+    ("Which foods help with cramps?", 4),
+    (LONG_QUESTION, 0),
+    ("And what about snacks?", 12),
+    ("Is dark chocolate ok?", 2),
+]
+
+
+def main():
+    standard_llm = SlowFakeChatModel(first_token_delay=STANDARD_LLM_DELAY, tokens_per_second=TOKENS_PER_SECOND)
+    fast_llm = SlowFakeChatModel(first_token_delay=FAST_LLM_DELAY, tokens_per_second=TOKENS_PER_SECOND)
+    retriever = FakeRetriever(docs=make_docs())
+
+    router = ModelRouter(default_tiers(fast_llm, standard_llm))
+    expected = [TIER_FAST, TIER_FAST, TIER_FAST, TIER_STANDARD, TIER_STANDARD, TIER_FAST]
+    docs = make_docs()
+    for (question, depth), tier in zip(TURNS, expected):
+        route = router.route_documents(question, docs, depth)
+        assert route.tier.name == tier, (question, depth, route)
+
+    print(f"{len(TURNS)} chat turns; standard LLM {STANDARD_LLM_DELAY}s, fast LLM {FAST_LLM_DELAY}s\n")
+    for label, engine_router in (("gpt-4 only", None), ("routed", router)):
+        engine = ChatEngine(standard_llm, retriever, condense_mode=CONDENSE_HEURISTIC, router=engine_router)
+        start = time.perf_counter()
+        for question, depth in TURNS:
+            engine.invoke(question, chat_history=make_chat_history(depth // 2))
+        mean_turn_ms = (time.perf_counter() - start) / len(TURNS) * 1000
+        print(f"{label:<11} mean turn {mean_turn_ms:6.0f} ms")
+
+    print()
+    for tier, stats in router.stats().items():
+        print(f"{tier:<9} requests {stats['requests']}  mean {stats['mean_ms']:6.0f} ms  "
+              f"prompt tokens {stats['prompt_tokens']:>5}  completion tokens {stats['completion_tokens']:>4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# python -m benchmarks.bench_openai_limiter
+"""
+Burst of OpenAI requests against a rate-limited fake upstream, with and without
+the shared limiter.
+
+The fake upstream accepts UPSTREAM_RPS requests per second and answers 429
+beyond that. Without the limiter, callers retry on a fixed short delay (the
+pile-up this replaces); with it, requests are paced by the token bucket, 429s
+are backed off, and requests that would wait too long are rejected at once.
+"""
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from openai_limiter import OpenAILimiter, TokenBucket
+
+UPSTREAM_RPS = 20
+UPSTREAM_LATENCY = 0.05
+BURST = 200
+NAIVE_RETRY_DELAY = 0.05
+NAIVE_MAX_RETRIES = 50
+
+
+class FakeUpstream:
+    def __init__(self):
+        self.bucket = TokenBucket(UPSTREAM_RPS * 60, capacity=UPSTREAM_RPS)
+        self.calls = 0
+        self.rate_limited = 0
+
+    async def send(self, request):
+        self.calls += 1
+        await asyncio.sleep(UPSTREAM_LATENCY)
+        if self.bucket.reserve(1) > 0:
+            self.bucket.cancel(1)
+            self.rate_limited += 1
+            return httpx.Response(429, request=request)
+        return httpx.Response(200, json={"ok": True}, request=request)
+
+
+def make_request():
+    return httpx.Request("POST", "https://api.openai.com/v1/embeddings", json={"input": ["magnesium"], "model": "x"})
+
+
+async def naive(upstream):
+    for _ in range(NAIVE_MAX_RETRIES):
+        response = await upstream.send(make_request())
+        if response.status_code != 429:
+            return response
+        await asyncio.sleep(NAIVE_RETRY_DELAY)
+    return response
+
+
+async def run(label, call):
+    upstream = FakeUpstream()
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            response = await call(upstream)
+            if response.status_code != 200:
+                failures += 1
+        except httpx.TransportError:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(BURST)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"{label:<12} upstream calls {upstream.calls:>5}  429s {upstream.rate_limited:>5}  failed/rejected {failures:>4}  "
+          f"p50 {statistics.median(latencies) * 1000:7.0f} ms  p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1000:7.0f} ms  "
+          f"total {elapsed:.1f} s")
+
+
+def main():
+    asyncio.run(run("naive retry", naive))
+
+    limiter = OpenAILimiter(max_queue=BURST, max_wait_seconds=5.0, backoff_base=0.05)
+    limiter.requests = TokenBucket(UPSTREAM_RPS * 60, capacity=UPSTREAM_RPS)
+    asyncio.run(run("limiter", lambda upstream: limiter.asend(make_request(), upstream.send)))
+    print(f"             {limiter.stats()}")
+
+
+if __name__ == "__main__":
+    main()
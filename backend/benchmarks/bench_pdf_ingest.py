@@ -0,0 +1,90 @@
+# python -m benchmarks.bench_pdf_ingest [path/to/book.pdf]
+"""
+Streaming page-wise chunking vs splitting the whole book as one string.
+
+Always runs on data/raw_book/InFloBook.txt cut into page-sized pieces, which
+checks that chunks across page boundaries come out like the single-string split
+and compares peak memory. With a PDF path it also times the old serial
+`text += page.extract_text()` extraction against the process-pool pipeline.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from pdf_ingest import CHUNK_OVERLAP, CHUNK_SIZE, ingest_pdfs, iter_chunks, write_chunks
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOOK_TXT_PATH = os.path.join(BASE_DIR, "data", "raw_book", "InFloBook.txt")
+PAGE_CHARS = 2500
+
+
+def fake_pages(path):
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            page = f.read(PAGE_CHARS)
+            if not page:
+                return
+            yield page
+
+
+def whole_text_split(path):
+    text = ""
+    for page in fake_pages(path):
+        text += page + "\n"
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP).split_text(text)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        jsonl_path = os.path.join(workdir, "chunks.jsonl")
+        old_chunks, old_s, old_peak = measure(lambda: whole_text_split(BOOK_TXT_PATH))
+        count, new_s, new_peak = measure(lambda: write_chunks(iter_chunks(fake_pages(BOOK_TXT_PATH)), jsonl_path))
+
+        old_set = set(old_chunks)
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            new_chunks = [json.loads(line) for line in f]
+        same = sum(1 for chunk in new_chunks if chunk in old_set) / len(new_chunks)
+        print(f"text book ({PAGE_CHARS}-char pages)")
+        print(f"  whole-string split  {len(old_chunks):>5} chunks  {old_s:6.2f}s  peak {old_peak / 1e6:6.1f} MB")
+        print(f"  streaming chunker   {count:>5} chunks  {new_s:6.2f}s  peak {new_peak / 1e6:6.1f} MB")
+        print(f"  chunks identical to the whole-string split: {same:.1%}")
+
+        if len(sys.argv) > 1:
+            import pdfplumber
+            pdf_path = sys.argv[1]
+
+            def serial():
+                text = ""
+                with pdfplumber.open(pdf_path) as pdf:
+                    for page in pdf.pages:
+                        text += (page.extract_text() or "") + "\n"
+                return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP).split_text(text)
+
+            start = time.perf_counter()
+            serial_chunks = serial()
+            serial_s = time.perf_counter() - start
+            start = time.perf_counter()
+            parallel_count = ingest_pdfs([pdf_path], os.path.join(workdir, "pdf.jsonl"))
+            parallel_s = time.perf_counter() - start
+            print(f"\n{pdf_path}")
+            print(f"  serial extraction   {len(serial_chunks):>5} chunks  {serial_s:6.2f}s")
+            print(f"  process pool        {parallel_count:>5} chunks  {parallel_s:6.2f}s  ({os.cpu_count()} cores)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# python -m benchmarks.bench_rag_latency [--iterations 50] [--llm-delay 0.4] [--tokens-per-second 80] [--embed-delay 0.05] [--async] [--warm-cache]
+"""
+Offline latency suite for get_strategies, get_advice and generate_advice.
+
+Runs the real rag_pipeline code (singleflight, semantic caches, router, chat
+engine, BM25 + flat-vector hybrid retrieval over the real book chunks) with the
+OpenAI models swapped for deterministic fakes via rag_pipeline.use_models():
+an embedding model with a fixed request delay and a chat model with a fixed
+time-to-first-token and token rate. No network access is needed, so it can run
+in CI to catch latency regressions.
+
+Per entry point it reports p50/p95/p99 latency, the mean time per stage
+(embedding, retriever, llm; "pipeline" is everything else, i.e. our own code
+and LangChain overhead) and allocations from a separate tracemalloc pass.
+Answer caches are cleared before every call unless --warm-cache is given.
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Optional
+
+# rag_pipeline builds its (unused, replaced below) OpenAI clients at import
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+import rag_pipeline
+from benchmarks.fakes import SlowFakeChatModel, SlowFakeEmbeddings
+from benchmarks.fixtures import ADVICE_QUESTIONS, INTAKES, make_chat_inputs
+from benchmarks.latency import StageTimer, format_ms, summarize
+from chat_engine import CONDENSE_FAST_MODEL
+from flat_index import FlatSnapshot, FlatVectorRetriever, write_snapshot
+from lexical_index import CHUNKS_PATH, LEXICAL_INDEX_PATH, BM25Index, HybridRetriever
+from strategy_index import StrategyIndex
+
+STRATEGIES_CSV_PATH = os.path.join(rag_pipeline.BASE_DIR, "data", "strategies.csv")
+ALLOCATION_ITERATIONS = 20
+ANSWER = (
+    "During your luteal phase your body needs a bit more energy and steady blood sugar. "
+    "Build meals around complex carbohydrates such as oats, sweet potato and brown rice, "
+    "and combine them with protein and healthy fats, for example lentils with olive oil "
+    "or yoghurt with walnuts. Magnesium-rich foods like spinach, pumpkin seeds and dark "
+    "chocolate can ease fatigue and cramps, and B-vitamins from whole grains and eggs "
+    "support your energy levels. Try to eat regularly, every three to four hours, so "
+    "your blood sugar does not dip in the afternoon, and drink enough water."
+)
+STANDALONE_QUESTION = "What should I eat for dinner to keep my energy stable in my luteal phase?"
+
+
+def load_strategy_index(embeddings) -> StrategyIndex:
+    """Strategy index over the real strategy texts, embedded with the fake model."""
+    with open(STRATEGIES_CSV_PATH, "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f, delimiter=";"))
+    documents = [
+        f"Strategy '{row['Strategie naam']}' helps with: {row['Verhelpt klachten bij']}. {row['Uitleg']}"
+        for row in rows
+    ]
+    metadatas = [
+        {"strategy_name": row["Strategie naam"], "explanation": row["Uitleg"], "helps_with": row["Verhelpt klachten bij"]}
+        for row in rows
+    ]
+    return StrategyIndex(embeddings.embed_documents(documents), metadatas, documents)
+
+
+def install_fakes(snapshot_dir: str, llm_delay: float, tokens_per_second: float, embed_delay: float,
+                  timer: Optional[StageTimer] = None) -> FlatSnapshot:
+    """Point rag_pipeline at fake models and a hybrid retriever over the real chunks."""
+    callbacks = [timer] if timer is not None else None
+    embeddings = SlowFakeEmbeddings(
+        request_delay=embed_delay,
+        on_call=(lambda seconds: timer.record("embedding", seconds)) if timer is not None else None,
+    )
+    builder = SlowFakeEmbeddings(request_delay=0.0, per_text_delay=0.0)
+
+    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    write_snapshot(snapshot_dir, builder.embed_documents(chunks), chunks, namespace=builder.namespace)
+    snapshot = FlatSnapshot(snapshot_dir)
+    retriever = HybridRetriever(
+        lexical_index=BM25Index.load(LEXICAL_INDEX_PATH),
+        vector_retriever=FlatVectorRetriever(snapshot=snapshot, embeddings=embeddings),
+        mode=rag_pipeline.RETRIEVAL_MODE,
+        callbacks=callbacks,
+    )
+
+    def chat_model(answer, speedup=1.0):
+        return SlowFakeChatModel(
+            answer=answer,
+            first_token_delay=llm_delay / speedup,
+            tokens_per_second=tokens_per_second * speedup,
+            callbacks=callbacks,
+        )
+
+    rag_pipeline.use_models(
+        llm=chat_model(ANSWER),
+        # The router's fast tier and the condense model are smaller, faster models
+        fast_llm=chat_model(ANSWER, speedup=3.0) if rag_pipeline.ROUTER_ENABLED else None,
+        condense_llm=chat_model(STANDALONE_QUESTION, speedup=3.0) if rag_pipeline.CHAT_CONDENSE_MODE == CONDENSE_FAST_MODEL else None,
+        embeddings=embeddings,
+        main_retriever=retriever,
+        strategy_index=load_strategy_index(builder),
+    )
+    return snapshot
+
+
+def check_strategies(result):
+    return bool(result)
+
+
+def check_advice(result):
+    return result == ANSWER
+
+
+def check_chat(result):
+    return result["answer"] == ANSWER
+
+
+def scenarios(use_async: bool):
+    chat_inputs = make_chat_inputs()
+    if use_async:
+        return [
+            ("aget_strategies", rag_pipeline.aget_strategies, INTAKES, check_strategies),
+            ("aget_advice", rag_pipeline.aget_advice, ADVICE_QUESTIONS + INTAKES, check_advice),
+            ("agenerate_advice", rag_pipeline.agenerate_advice, chat_inputs, check_chat),
+        ]
+    return [
+        ("get_strategies", rag_pipeline.get_strategies, INTAKES, check_strategies),
+        ("get_advice", rag_pipeline.get_advice, ADVICE_QUESTIONS + INTAKES, check_advice),
+        ("generate_advice", rag_pipeline.generate_advice, chat_inputs, check_chat),
+    ]
+
+
+def run_calls(call, items, iterations, use_async, warm_cache, check):
+    """Call `call` on the fixtures round-robin; returns (latencies, failed calls)."""
+    latencies = []
+    failures = 0
+
+    def before_call():
+        if not warm_cache:
+            rag_pipeline.advice_cache.clear()
+            rag_pipeline.chat_answer_cache.clear()
+
+    async def run_async():
+        nonlocal failures
+        for i in range(iterations):
+            before_call()
+            start = time.perf_counter()
+            result = await call(items[i % len(items)])
+            latencies.append(time.perf_counter() - start)
+            failures += not check(result)
+
+    # The pipeline logs every query; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        if use_async:
+            asyncio.run(run_async())
+        else:
+            for i in range(iterations):
+                before_call()
+                start = time.perf_counter()
+                result = call(items[i % len(items)])
+                latencies.append(time.perf_counter() - start)
+                failures += not check(result)
+    return latencies, failures
+
+
+def measure_allocations(call, items, use_async, warm_cache, check):
+    """Peak traced memory and bytes still allocated per call, from a short tracemalloc run."""
+    tracemalloc.start()
+    start_snapshot = tracemalloc.take_snapshot()
+    run_calls(call, items, ALLOCATION_ITERATIONS, use_async, warm_cache, check)
+    end_snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in end_snapshot.compare_to(start_snapshot, "filename") if stat.size_diff > 0)
+    return peak, retained / ALLOCATION_ITERATIONS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--llm-delay", type=float, default=0.4, help="time to first token, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--embed-delay", type=float, default=0.05, help="seconds per embedding request")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="benchmark the async entry points")
+    parser.add_argument("--warm-cache", action="store_true", help="keep the semantic answer caches between calls")
+    args = parser.parse_args()
+
+    timer = StageTimer()
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        snapshot = install_fakes(snapshot_dir, args.llm_delay, args.tokens_per_second, args.embed_delay, timer)
+        print(f"Fake models: LLM {args.llm_delay * 1000:.0f} ms to first token, {args.tokens_per_second:.0f} tokens/s; "
+              f"embeddings {args.embed_delay * 1000:.0f} ms/request. Router {'on' if rag_pipeline.model_router else 'off'}, "
+              f"retrieval '{rag_pipeline.RETRIEVAL_MODE}', condense '{rag_pipeline.CHAT_CONDENSE_MODE}', "
+              f"{'warm' if args.warm_cache else 'cold'} answer caches, {args.iterations} calls each\n")
+        try:
+            for name, call, items, check in scenarios(args.use_async):
+                run_calls(call, items, 1, args.use_async, args.warm_cache, check)  # warm-up
+                timer.reset()
+                latencies, failures = run_calls(call, items, args.iterations, args.use_async, args.warm_cache, check)
+                stages = timer.reset()
+                peak, retained = measure_allocations(call, items, args.use_async, args.warm_cache, check)
+                timer.reset()
+
+                summary = summarize(latencies)
+                stages["pipeline"] = max(0.0, sum(latencies) - sum(stages.values()))
+                breakdown = "  ".join(f"{stage} {seconds / len(latencies) * 1000:.1f} ms" for stage, seconds in stages.items())
+                print(f"{name:<18} {format_ms(summary)}  mean {summary['mean'] * 1000:8.1f} ms")
+                print(f"{'':<18} stages: {breakdown}")
+                print(f"{'':<18} allocations: peak {peak / 1024:.1f} KiB, retained {retained:.0f} B/call")
+                if failures:
+                    print(f"{'':<18} ⚠️ {failures}/{len(latencies)} calls returned a fallback answer")
+        finally:
+            snapshot.close()
+
+
+if __name__ == "__main__":
+    main()
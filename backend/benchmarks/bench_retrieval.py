@@ -0,0 +1,52 @@
+# python -m benchmarks.bench_retrieval
+"""
+Latency of the book retrieval paths: BM25 only, Chroma only and fused.
+
+The vector path uses FakeEmbeddings, so the numbers exclude the OpenAI
+round-trip that the real vector path adds to every query; the lexical path
+needs no embedding at all.
+"""
+import os
+import time
+
+from langchain_chroma import Chroma
+from langchain_core.embeddings import FakeEmbeddings
+
+from lexical_index import (
+    LEXICAL_INDEX_PATH, RETRIEVAL_AUTO, RETRIEVAL_HYBRID, RETRIEVAL_LEXICAL, RETRIEVAL_VECTOR,
+    BM25Index, HybridRetriever,
+)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_VECTORSTORE_PATH = os.path.join(BASE_DIR, "data", "vectorstore", "chroma")
+QUERIES = [
+    "magnesium",
+    "seed cycling",
+    "What should I eat during my luteal phase to reduce cravings?",
+    "Which foods support estrogen detox in the follicular phase?",
+    "pumpkin seeds",
+]
+ROUNDS = 50
+
+
+def main():
+    start = time.perf_counter()
+    index = BM25Index.load(LEXICAL_INDEX_PATH)
+    print(f"Loaded BM25 index ({len(index)} chunks) in {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    vectorstore = Chroma(persist_directory=MAIN_VECTORSTORE_PATH, embedding_function=FakeEmbeddings(size=1536))
+    vector_retriever = vectorstore.as_retriever()
+
+    print(f"{'mode':<10} {'mean latency':>14}")
+    for mode in (RETRIEVAL_LEXICAL, RETRIEVAL_AUTO, RETRIEVAL_HYBRID, RETRIEVAL_VECTOR):
+        retriever = HybridRetriever(lexical_index=index, vector_retriever=vector_retriever, mode=mode)
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            for query in QUERIES:
+                retriever.invoke(query)
+        mean_ms = (time.perf_counter() - start) / (ROUNDS * len(QUERIES)) * 1000
+        print(f"{mode:<10} {mean_ms:>11.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# python -m benchmarks.bench_semantic_cache
+"""
+Lookup latency and hit rate of the semantic answer cache.
+
+Fills the cache with random 1536-dim question embeddings (the size of OpenAI's
+ada-002 vectors) across a handful of profile buckets, then looks up slightly
+perturbed copies (near-duplicates) and unrelated vectors (misses).
+"""
+import time
+
+import numpy as np
+
+from semantic_cache import SemanticCache, profile_cache_key
+
+DIM = 1536
+ENTRIES = 1000
+LOOKUPS = 2000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    cache = SemanticCache(threshold=0.95, max_entries=ENTRIES)
+    phases = ["menstrual", "follicular", "ovulatory", "luteal"]
+    keys = [profile_cache_key({"cycle": phase, "dietary_restrictions": ["vegetarian"]}) for phase in phases]
+
+    vectors = rng.standard_normal((ENTRIES, DIM)).astype(np.float32)
+    for i, vector in enumerate(vectors):
+        cache.put(vector, f"answer {i}", keys[i % len(keys)])
+
+    start = time.perf_counter()
+    for i in range(LOOKUPS):
+        j = int(rng.integers(ENTRIES))
+        if i % 2 == 0:
+            query = vectors[j] + rng.standard_normal(DIM).astype(np.float32) * 0.05  # near-duplicate
+        else:
+            query = rng.standard_normal(DIM).astype(np.float32)  # unrelated question
+        cache.get(query, keys[j % len(keys)])
+    elapsed = time.perf_counter() - start
+
+    stats = cache.stats()
+    print(f"{ENTRIES} entries, {LOOKUPS} lookups")
+    print(f"mean lookup: {elapsed / LOOKUPS * 1000:.3f} ms")
+    print(f"hits: {stats['hits']}  misses: {stats['misses']}  hit rate: {stats['hit_rate']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# python -m benchmarks.bench_singleflight
+"""
+Burst of identical requests with and without singleflight coalescing.
+
+Simulates a notification sending many users to the same screen at once: each
+request is a slow "embedding + GPT-4" call (a sleep). Without coalescing every
+request pays for its own call; with it, concurrent duplicates share one.
+"""
+import asyncio
+import threading
+import time
+
+from singleflight import SingleFlight
+
+BURST = 200
+DISTINCT_QUERIES = 4
+CALL_SECONDS = 0.2
+
+
+def main():
+    upstream_calls = 0
+
+    async def slow_llm_call(query):
+        nonlocal upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(CALL_SECONDS)
+        return f"advice for {query}"
+
+    async def burst(flight):
+        queries = [f"query {i % DISTINCT_QUERIES}" for i in range(BURST)]
+        if flight is None:
+            return await asyncio.gather(*(slow_llm_call(q) for q in queries))
+        return await asyncio.gather(*(flight.ado(q, slow_llm_call, q) for q in queries))
+
+    for label, flight in (("no coalescing", None), ("singleflight", SingleFlight())):
+        upstream_calls = 0
+        start = time.perf_counter()
+        results = asyncio.run(burst(flight))
+        elapsed = time.perf_counter() - start
+        assert results[0] == "advice for query 0"
+        print(f"{label:<14} {BURST} requests -> {upstream_calls} upstream calls in {elapsed * 1000:.0f} ms")
+        if flight is not None:
+            stats = flight.stats()
+            assert stats["deduplicated"] == BURST - DISTINCT_QUERIES and stats["in_flight"] == 0
+            print(f"               {stats}")
+
+    # Threaded callers (sync get_advice/get_strategies run in the threadpool)
+    flight = SingleFlight()
+    barrier = threading.Barrier(32)
+
+    def worker():
+        barrier.wait()
+        flight.do("same query", time.sleep, CALL_SECONDS)
+
+    threads = [threading.Thread(target=worker) for _ in range(32)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"threads        32 requests -> {flight.stats()['executions']} upstream calls")
+
+
+if __name__ == "__main__":
+    main()
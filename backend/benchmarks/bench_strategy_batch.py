@@ -0,0 +1,41 @@
+# python -m benchmarks.bench_strategy_batch
+"""
+Scoring cost for many intake profiles: one search per profile vs. one batched search.
+
+Uses a synthetic strategy matrix and random query vectors, so it measures only
+the ranking step (embedding calls are batched separately by get_strategies_batch).
+"""
+import time
+
+import numpy as np
+
+from strategy_index import StrategyIndex
+
+DIM = 1536
+STRATEGIES = 60
+PROFILES = 5000
+K = 3
+
+
+def main():
+    rng = np.random.default_rng(0)
+    metadatas = [{"strategy_name": f"Strategy {i}"} for i in range(STRATEGIES)]
+    index = StrategyIndex(rng.standard_normal((STRATEGIES, DIM)), metadatas)
+    queries = rng.standard_normal((PROFILES, DIM)).astype(np.float32)
+
+    start = time.perf_counter()
+    looped = [index.search(q, k=K) for q in queries]
+    looped_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = index.search_batch(queries, k=K).tolist()
+    batched_s = time.perf_counter() - start
+
+    assert looped == batched, "batched ranking differs from per-profile ranking"
+    print(f"{PROFILES} profiles x {STRATEGIES} strategies, top-{K}")
+    print(f"per-profile search: {looped_s * 1000:8.1f} ms")
+    print(f"batched search:     {batched_s * 1000:8.1f} ms ({looped_s / batched_s:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
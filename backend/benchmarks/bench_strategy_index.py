@@ -0,0 +1,54 @@
+# python -m benchmarks.bench_strategy_index
+"""
+Compares the in-memory StrategyIndex with the Chroma strategy collection.
+
+Runs entirely offline: queries are the stored strategy vectors plus noise, so no
+embedding call is needed. Checks that both paths return the same top-k
+strategies and reports the latency of each.
+"""
+import os
+import time
+
+import numpy as np
+from langchain_chroma import Chroma
+
+from strategy_index import StrategyIndex
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STRATEGY_VECTORSTORE_PATH = os.path.join(BASE_DIR, "data", "vectorstore", "strategies_chroma")
+
+QUERIES = 200
+K = 3
+
+
+def main():
+    vectorstore = Chroma(persist_directory=STRATEGY_VECTORSTORE_PATH, collection_name="strategies")
+    index = StrategyIndex.from_chroma(vectorstore)
+    print(f"Loaded {len(index)} strategies, matrix {index.matrix.shape} {index.matrix.dtype}")
+
+    rng = np.random.default_rng(0)
+    base = index.matrix[rng.integers(len(index), size=QUERIES)]
+    queries = base + rng.standard_normal(base.shape).astype(np.float32) * 0.02
+    # Chroma stores the raw (unit-length) OpenAI vectors; keep queries unit-length too
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    chroma_results = [
+        [doc.metadata["strategy_name"] for doc in vectorstore.similarity_search_by_vector(q.tolist(), k=K)]
+        for q in queries
+    ]
+    chroma_ms = (time.perf_counter() - start) / QUERIES * 1000
+
+    start = time.perf_counter()
+    index_results = [[m["strategy_name"] for m in index.search_metadata(q, k=K)] for q in queries]
+    index_ms = (time.perf_counter() - start) / QUERIES * 1000
+
+    mismatches = sum(a != b for a, b in zip(chroma_results, index_results))
+    print(f"Chroma:        {chroma_ms:8.3f} ms/query")
+    print(f"StrategyIndex: {index_ms:8.3f} ms/query ({chroma_ms / index_ms:.0f}x faster)")
+    print(f"Top-{K} mismatches: {mismatches}/{QUERIES}")
+    assert mismatches == 0, "StrategyIndex results differ from Chroma"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+In-process stand-in for the supabase-py client, for load tests without Supabase.
+
+Implements the part of the PostgREST query builder that db.SupabaseDB uses
+(table().select/insert/update/delete, eq/neq/gt/gte/lt/lte/in_, order, limit,
+execute) over in-memory tables, plus an async variant for async_db (with the
+get_chat_context RPC). Rows get an auto-increment `id` and the timestamp
+columns the real tables default. Every execute() waits a fixed round-trip time (sleeping in the sync client, awaiting
+in the async one), so the load test still sees the I/O the real clients do.
+"""
+import asyncio
+import copy
+import itertools
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List
+
+SUPABASE_ROUND_TRIP_SECONDS = 0.015
+
+# Columns the real tables fill in with now() when a row is inserted
+TIMESTAMP_DEFAULTS = {
+    "users": ("created_at",),
+    "chat_messages": ("timestamp",),
+    "trial_periods": ("created_at",),
+    "daily_logs": ("created_at",),
+    "tracked_symptoms": ("created_at",),
+}
+
+
+class FakeAPIResponse:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+        self.count = len(data)
+
+
+class FakeQuery:
+    """One PostgREST request being built; execute() runs it against the in-memory table."""
+
+    def __init__(self, client: "FakeSupabaseClient", table: str):
+        self._client = client
+        self._table = table
+        self._action = "select"
+        self._payload = None
+        self._filters = []
+        self._order = []
+        self._limit = None
+
+    def select(self, columns: str = "*", count=None):
+        self._action = "select"
+        return self
+
+    def insert(self, data):
+        self._action, self._payload = "insert", data
+        return self
+
+    def update(self, data: dict):
+        self._action, self._payload = "update", data
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    def _filter(self, column, predicate):
+        self._filters.append((column, predicate))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v != value)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._filter(column, lambda v: v in values)
+
+    def order(self, column, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int):
+        self._limit = size
+        return self
+
+    def _matches(self, row) -> bool:
+        return all(predicate(row.get(column)) for column, predicate in self._filters)
+
+    def execute(self) -> FakeAPIResponse:
+        time.sleep(self._client.round_trip_seconds)
+        return self._run()
+
+    def _run(self) -> FakeAPIResponse:
+        with self._client.lock:
+            self._client.requests += 1
+            return self._apply()
+
+    def _apply(self) -> FakeAPIResponse:
+        """Run the query; the caller holds the client lock."""
+        rows = self._client.tables[self._table]
+        if self._action == "insert":
+            new_rows = self._payload if isinstance(self._payload, list) else [self._payload]
+            inserted = [self._client.new_row(self._table, row) for row in new_rows]
+            rows.extend(inserted)
+            return FakeAPIResponse(copy.deepcopy(inserted))
+        matched = [row for row in rows if self._matches(row)]
+        if self._action == "update":
+            for row in matched:
+                row.update(self._payload)
+        elif self._action == "delete":
+            self._client.tables[self._table] = [row for row in rows if not self._matches(row)]
+        else:
+            # Stable sorts, least significant key first
+            for column, desc in reversed(self._order):
+                matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            if self._limit is not None:
+                matched = matched[:self._limit]
+        return FakeAPIResponse(copy.deepcopy(matched))
+
+
+class FakeAsyncQuery(FakeQuery):
+    async def execute(self) -> FakeAPIResponse:
+        await asyncio.sleep(self._client.round_trip_seconds)
+        return self._run()
+
+
+class FakeAsyncRPC:
+    """The Postgres functions in create_tables.sql, as one round trip each."""
+
+    def __init__(self, client: "FakeSupabaseClient", function: str, params: dict):
+        self._client = client
+        self._function = function
+        self._params = params
+
+    def _get_chat_context(self) -> list:
+        user_id = self._params["p_user_id"]
+        query = lambda table: FakeQuery(self._client, table).select("*").eq("user_id", user_id)
+        # One row, as PostgREST returns a RETURNS TABLE function
+        return [{
+            "symptoms": query("tracked_symptoms").order("order")._apply().data,
+            "logs": query("daily_logs").order("date", desc=True).limit(self._params["p_logs_limit"])._apply().data,
+            "messages": query("chat_messages").order("timestamp", desc=True).limit(self._params["p_messages_limit"])._apply().data,
+        }]
+
+    async def execute(self) -> FakeAPIResponse:
+        await asyncio.sleep(self._client.round_trip_seconds)
+        with self._client.lock:
+            self._client.requests += 1
+            return FakeAPIResponse(getattr(self, f"_{self._function}")())
+
+
+class FakeAsyncPostgrestClient:
+    """The postgrest AsyncPostgrestClient interface async_db uses, over the same in-memory tables."""
+
+    def __init__(self, client: "FakeSupabaseClient"):
+        self._client = client
+
+    def table(self, name: str) -> FakeAsyncQuery:
+        return FakeAsyncQuery(self._client, name)
+
+    def rpc(self, function: str, params: dict = None) -> FakeAsyncRPC:
+        return FakeAsyncRPC(self._client, function, params or {})
+
+    async def aclose(self):
+        pass
+
+
+class FakeSupabaseClient:
+    """Thread-safe in-memory tables behind the supabase-py `table()` interface."""
+
+    def __init__(self, round_trip_seconds: float = SUPABASE_ROUND_TRIP_SECONDS):
+        self.round_trip_seconds = round_trip_seconds
+        self.tables: Dict[str, List[dict]] = defaultdict(list)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self._ids = defaultdict(lambda: itertools.count(1))
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def async_client(self) -> FakeAsyncPostgrestClient:
+        return FakeAsyncPostgrestClient(self)
+
+    def new_row(self, table: str, data: dict) -> dict:
+        row = dict(data)
+        row.setdefault("id", next(self._ids[table]))
+        now = datetime.utcnow().isoformat()
+        for column in TIMESTAMP_DEFAULTS.get(table, ()):
+            row.setdefault(column, now)
+        return row
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"requests": self.requests, "rows": {name: len(rows) for name, rows in self.tables.items()}}
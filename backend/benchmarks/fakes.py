@@ -0,0 +1,150 @@
+"""
+Deterministic stand-ins for the OpenAI models and the Chroma retrievers.
+
+They let the benchmarks exercise the real chains without network access.
+"""
+import asyncio
+import hashlib
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel, FakeListChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.retrievers import BaseRetriever
+
+
+def make_fake_llm(answer: str = "Eat leafy greens, pumpkin seeds and lentils.") -> FakeListChatModel:
+    """Chat model that always answers with the same text."""
+    return FakeListChatModel(responses=[answer])
+
+
+class SlowFakeChatModel(BaseChatModel):
+    """
+    Chat model with a fixed time-to-first-token and a fixed token rate.
+
+    Sync calls sleep, async calls await asyncio.sleep, so it behaves like a
+    network-bound LLM for both the blocking and the async code paths.
+    """
+
+    answer: str = "Eat leafy greens, pumpkin seeds and lentils."
+    first_token_delay: float = 0.5
+    tokens_per_second: float = 50.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake-chat-model"
+
+    def _tokens(self) -> List[str]:
+        words = self.answer.split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _total_delay(self) -> float:
+        return self.first_token_delay + self._token_delay() * len(self._tokens())
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._total_delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._total_delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_delay)
+        for token in self._tokens():
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(self._token_delay())
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_delay)
+        for token in self._tokens():
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self._token_delay())
+
+
+class SlowFakeEmbeddings(Embeddings):
+    """
+    Deterministic unit vectors (seeded by the text's hash) with a fixed delay per
+    request plus a small delay per text, like a remote embedding API.
+    The same text always gets the same vector; different texts are near-orthogonal.
+    """
+
+    def __init__(self, dim: int = 1536, request_delay: float = 0.02, per_text_delay: float = 0.0005, on_call=None):
+        self.dim = dim
+        self.request_delay = request_delay
+        self.per_text_delay = per_text_delay
+        self.namespace = f"fake-{dim}"
+        # Optional on_call(seconds) hook, e.g. for per-stage timing
+        self.on_call = on_call
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _delay(self, n: int) -> float:
+        return self.request_delay + self.per_text_delay * n
+
+    def _done(self, start: float):
+        self.calls += 1
+        if self.on_call is not None:
+            self.on_call(time.perf_counter() - start)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        time.sleep(self._delay(len(texts)))
+        vectors = [self._vector(text) for text in texts]
+        self._done(start)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        await asyncio.sleep(self._delay(len(texts)))
+        vectors = [self._vector(text) for text in texts]
+        self._done(start)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def make_docs(n: int = 4, size: int = 500) -> List[Document]:
+    """Book-sized chunks, similar to the ones in chunks_AlisaVita.json."""
+    filler = ("Magnesium-rich foods such as spinach and pumpkin seeds support the luteal phase. " * 10)[:size]
+    return [Document(page_content=filler, metadata={"source": "AlisaVita", "chunk": i}) for i in range(n)]
+
+
+class FakeRetriever(BaseRetriever):
+    """Retriever that returns a fixed list of documents for every query."""
+
+    docs: List[Document]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.docs
+
+
+def make_chat_history(turns: int = 10):
+    """(sender, text) pairs in the shape main.chat passes to generate_advice."""
+    history = []
+    for i in range(turns):
+        history.append(("user", f"Question {i}: what should I eat when I feel tired in my luteal phase?"))
+        history.append(("bot", f"Answer {i}: focus on complex carbohydrates, magnesium and B-vitamins."))
+    return history
@@ -0,0 +1,109 @@
+"""
+Realistic request fixtures for the benchmarks: intake forms, advice questions and chat turns.
+
+Intake values are the options the onboarding screens offer; chat turns carry a
+token-budgeted user profile and chat histories of different lengths, like
+/api/v1/chat builds them.
+"""
+from datetime import date, timedelta
+
+from benchmarks.fakes import make_chat_history
+from chat_context import build_user_profile, trim_history
+
+USER = {"id": 1, "email": "user@example.com", "current_strategy": "Bloedsuiker in balans"}
+SYMPTOMS = ["Cravings", "Fatigue", "Bloating"]
+STRATEGY_DETAILS = {
+    "Strategie naam": "Bloedsuiker in balans",
+    "Uitleg": "Combineer koolhydraten met vetten of eiwitten om bloedsuikerspiegel stabiel te houden.",
+    "Waarom": "Schommelende bloedsuikers kunnen leiden tot verhoogde cravings en stemmingswisselingen. " * 3,
+    "Verhelpt klachten bij": "Cravings,Stemmingswisselingen,PCOS,PMS",
+    "Bron(nen)": "Smedegaard et al. (2023); Ma et al. (2009, Diabetes Care)",
+    "Praktische tips": "Eet in de eerste helft van je cyclus lichte maaltijden met langzame koolhydraten; " * 4,
+}
+
+INTAKES = [
+    {
+        "symptoms": ["Irregular cycle", "Acne", "Fatigue"],
+        "goals": ["Regulate cycle", "Improve skin", "Boost energy"],
+        "dietaryRestrictions": ["Vegetarian"],
+        "cycle": "luteal",
+        "reason": "My cycle has been irregular since I stopped the pill.",
+    },
+    {
+        "symptoms": ["Bloating", "Mood swings"],
+        "symptoms_note": "Mostly in the week before my period.",
+        "goals": ["Less bloating", "Stable mood"],
+        "dietaryRestrictions": ["No dairy"],
+        "cycle": "follicular",
+        "whatWorks": "Walking after dinner helps a bit.",
+    },
+    {
+        "symptoms": ["Cravings", "Fatigue"],
+        "goals": ["Fewer cravings", "Boost energy"],
+        "goals_note": "I want to stop snacking in the afternoon.",
+        "dietaryRestrictions": [],
+        "cycle": "menstrual",
+        "extraThoughts": "I work night shifts twice a week.",
+    },
+    {
+        "symptoms": ["PCOS", "Acne", "Irregular cycle"],
+        "goals": ["Regulate cycle", "Improve skin"],
+        "dietaryRestrictions": ["Gluten free", "Vegan"],
+        "dietaryRestrictions_note": "Also avoiding soy.",
+        "cycle": "",
+        "reason": "Diagnosed with PCOS last year.",
+    },
+    {
+        "symptoms": ["Cramps", "Fatigue", "Mood swings"],
+        "goals": ["Less pain", "Stable mood"],
+        "preferences": ["Pescatarian"],
+        "cycle": "ovulatory",
+    },
+]
+
+ADVICE_QUESTIONS = [
+    "What can I eat to improve my energy levels during my luteal phase?",
+    "Which foods help against bloating before my period?",
+    "How can I reduce sugar cravings in the afternoon?",
+    "Is magnesium useful for period cramps, and which foods contain it?",
+    "What should I eat for breakfast to keep my blood sugar stable?",
+]
+
+CHAT_QUESTIONS = [
+    "What should I eat tonight?",
+    "Can you give me a vegetarian lunch idea that keeps my blood sugar stable?",
+    "Why do I get so tired in the week before my period?",
+    "And what about snacks?",
+    "Is coffee bad for my cycle?",
+]
+
+
+def make_logs(days):
+    start = date(2025, 1, 1)
+    return [
+        {
+            "date": (start + timedelta(days=i)).isoformat(),
+            "applied_strategy": i % 3 != 0,
+            "energy": 4 + i % 5,
+            "mood": 5 + i % 4,
+            "symptom_scores": {s: (i + j) % 6 for j, s in enumerate(SYMPTOMS)},
+            "extra_symptoms": "Headache" if i % 7 == 0 else None,
+            "extra_notes": "Felt a bit tired after lunch, had a craving for chocolate in the afternoon.",
+        }
+        for i in range(days)
+    ]
+
+
+def make_chat_inputs(history_turns=(0, 3, 10, 25), log_days: int = 30) -> list:
+    """generate_advice inputs as /api/v1/chat builds them, one per (question, history length)."""
+    profile = build_user_profile(USER, SYMPTOMS, STRATEGY_DETAILS, make_logs(log_days))
+    inputs = []
+    for i, question in enumerate(CHAT_QUESTIONS):
+        history, _ = trim_history(make_chat_history(history_turns[i % len(history_turns)]))
+        inputs.append({
+            "question": question,
+            "user_profile": profile,
+            "chat_history": history,
+            "profile_fields": {"user_id": USER["id"], "symptoms": SYMPTOMS, "current_strategy": USER["current_strategy"]},
+        })
+    return inputs
@@ -0,0 +1,100 @@
+"""
+Latency percentiles and per-stage timing for the benchmarks.
+
+StageTimer attributes wall time to stages with exclusive accounting: time spent
+in a nested stage (e.g. the query embedding inside the retriever) counts for the
+inner stage only. As a LangChain callback handler it times every LLM and
+retriever run it is attached to; embeddings report through record().
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Nearest-rank percentile of unsorted samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, min(len(ordered), math.ceil(p / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    summary = {f"p{p}": percentile(samples, p) for p in PERCENTILES}
+    summary["mean"] = sum(samples) / len(samples) if samples else 0.0
+    summary["n"] = len(samples)
+    return summary
+
+
+def format_ms(summary: Dict[str, float]) -> str:
+    return "  ".join(f"p{p} {summary[f'p{p}'] * 1000:8.1f} ms" for p in PERCENTILES)
+
+
+class StageTimer(BaseCallbackHandler):
+    """Exclusive seconds per stage ("llm", "retriever", "embedding", ...), summed over all runs."""
+
+    # Called in the caller's thread/task, so the nesting stack stays accurate for async runs too
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = {}
+        self._stack = []
+        self.totals = defaultdict(float)
+
+    def reset(self) -> Dict[str, float]:
+        with self._lock:
+            totals, self.totals = dict(self.totals), defaultdict(float)
+            return totals
+
+    def start(self, key, stage: str):
+        with self._lock:
+            frame = [stage, time.perf_counter(), 0.0]
+            self._open[key] = frame
+            self._stack.append(frame)
+
+    def end(self, key):
+        with self._lock:
+            frame = self._open.pop(key, None)
+            if frame is None:
+                return
+            self._stack.remove(frame)
+            self._add(frame[0], time.perf_counter() - frame[1], frame[2])
+
+    def record(self, stage: str, seconds: float):
+        """A leaf stage that was timed elsewhere (e.g. SlowFakeEmbeddings.on_call)."""
+        with self._lock:
+            self._add(stage, seconds, 0.0)
+
+    def _add(self, stage: str, seconds: float, child_seconds: float):
+        self.totals[stage] += seconds - child_seconds
+        if self._stack:
+            self._stack[-1][2] += seconds
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.start(run_id, "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self.start(run_id, "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.end(run_id)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self.start(run_id, "retriever")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self.end(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self.end(run_id)
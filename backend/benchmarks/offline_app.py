@@ -0,0 +1,65 @@
+# python -m benchmarks.offline_app [--port 8001] [--db-latency 0.015] [--llm-delay 0.4] [--tokens-per-second 80] [--embed-delay 0.05]
+"""
+The real FastAPI app wired to offline stand-ins, for load tests.
+
+db.supabase and async_db.postgrest_client are replaced by the in-process
+FakeSupabaseClient (sharing one set of tables) and rag_pipeline
+by the fake models of bench_rag_latency, so every endpoint runs its real code
+path without Supabase or OpenAI. Run as a module to serve it with uvicorn (for
+load-testing over real HTTP from another process), or call
+install_offline_backend() to get the app in-process.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+from benchmarks.fake_supabase import SUPABASE_ROUND_TRIP_SECONDS, FakeSupabaseClient
+
+# db and rag_pipeline refuse to import without credentials; none of them are used
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "offline.load.test")
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+
+def install_offline_backend(db_latency: float = SUPABASE_ROUND_TRIP_SECONDS, llm_delay: float = 0.4,
+                            tokens_per_second: float = 80.0, embed_delay: float = 0.05):
+    """Returns (app, fake Supabase client, flat snapshot); close the snapshot when done."""
+    import async_db
+    import db
+    from benchmarks.bench_rag_latency import install_fakes
+
+    client = FakeSupabaseClient(round_trip_seconds=db_latency)
+    db.supabase = client
+    async_db.postgrest_client = client.async_client()
+    snapshot = install_fakes(tempfile.mkdtemp(prefix="offline_app_"), llm_delay, tokens_per_second, embed_delay)
+
+    import main
+    return main.app, client, snapshot
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--db-latency", type=float, default=SUPABASE_ROUND_TRIP_SECONDS, help="seconds per Supabase request")
+    parser.add_argument("--llm-delay", type=float, default=0.4, help="time to first token, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--embed-delay", type=float, default=0.05, help="seconds per embedding request")
+
+
+def backend_from_arguments(args):
+    return install_offline_backend(args.db_latency, args.llm_delay, args.tokens_per_second, args.embed_delay)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the API with Supabase and OpenAI replaced by offline fakes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+    app, _, snapshot = backend_from_arguments(args)
+    try:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    finally:
+        snapshot.close()
+        shutil.rmtree(snapshot.path, ignore_errors=True)
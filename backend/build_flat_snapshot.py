@@ -0,0 +1,37 @@
+# python build_flat_snapshot.py
+import json
+import time
+
+from dotenv import load_dotenv
+from langchain_chroma import Chroma
+
+from embedding_backends import EMBEDDING_BACKEND, get_embeddings, vectorstore_dir
+from flat_index import FlatSnapshot, write_snapshot
+from lexical_index import CHUNKS_PATH
+
+load_dotenv()
+
+MAIN_VECTORSTORE_PATH = vectorstore_dir("chroma")
+SNAPSHOT_PATH = vectorstore_dir("book_flat")
+EMBED_BATCH_SIZE = 256
+
+embeddings = get_embeddings(EMBEDDING_BACKEND)
+start = time.perf_counter()
+
+# Reuse the vectors already in the main Chroma store when it has them
+data = Chroma(persist_directory=MAIN_VECTORSTORE_PATH, embedding_function=embeddings).get(include=["embeddings", "documents"])
+texts, vectors = data["documents"], data["embeddings"]
+if len(texts):
+    print(f"Exporting {len(texts)} vectors from {MAIN_VECTORSTORE_PATH}")
+else:
+    # Empty store: embed the chunks directly (served from the embedding cache where possible)
+    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+        texts = json.load(f)
+    print(f"Main vectorstore is empty, embedding {len(texts)} chunks from {CHUNKS_PATH} ({EMBEDDING_BACKEND})")
+    vectors = []
+    for batch_start in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(embeddings.embed_documents(texts[batch_start:batch_start + EMBED_BATCH_SIZE]))
+
+write_snapshot(SNAPSHOT_PATH, vectors, texts, namespace=embeddings.namespace)
+snapshot = FlatSnapshot(SNAPSHOT_PATH)
+print(f"✅ Flat snapshot with {len(snapshot)} x {snapshot.meta['dim']} vectors saved to {SNAPSHOT_PATH} in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,15 @@
+# python build_lexical_index.py
+import json
+import time
+
+from lexical_index import CHUNKS_PATH, LEXICAL_INDEX_PATH, BM25Index
+
+# Load the same chunks the main vectorstore was built from
+with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+    chunks = json.load(f)
+print(f"Loaded {len(chunks)} chunks from {CHUNKS_PATH}")
+
+start = time.perf_counter()
+index = BM25Index.build(chunks)
+index.save(LEXICAL_INDEX_PATH)
+print(f"✅ BM25 index with {len(index.postings)} terms saved to {LEXICAL_INDEX_PATH} in {time.perf_counter() - start:.2f}s")
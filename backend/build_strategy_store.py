@@ -1,15 +1,17 @@
 import os
 import pandas as pd
 from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
 from dotenv import load_dotenv
+from embedding_backends import BACKEND_OPENAI, EMBEDDING_BACKEND, get_embeddings, vectorstore_dir
+from vectorstore_build import build_incremental, format_report
 
 load_dotenv()
 
 # Define paths
 CSV_PATH = os.path.join(os.path.dirname(__file__), "data", "strategies.csv")
-PERSIST_DIR = os.path.join(os.path.dirname(__file__), "data", "vectorstore", "strategies_chroma")
+# EMBEDDING_BACKEND=onnx builds a parallel store next to the OpenAI one
+PERSIST_DIR = vectorstore_dir("strategies_chroma", EMBEDDING_BACKEND)
 COLLECTION_NAME = "strategies"
 
 # Load data from CSV
@@ -42,23 +44,25 @@ for _, row in df.iterrows():
 
 print(f"Created {len(documents)} LangChain documents.")
 
-# Initialize OpenAI embeddings
+# Initialize embeddings
 api_key = os.environ.get("OPENAI_API_KEY")
-if not api_key:
+if EMBEDDING_BACKEND == BACKEND_OPENAI and not api_key:
     print("Error: OPENAI_API_KEY not found in environment variables.")
     exit()
-embedding_model = OpenAIEmbeddings(api_key=api_key)
+# Unchanged rows are served from the shared embedding cache instead of re-embedded
+embedding_model = get_embeddings(EMBEDDING_BACKEND, api_key)
+print(f"Embedding backend: {EMBEDDING_BACKEND}")
 
-# Create and persist the vector store
-print(f"Creating vector store at {PERSIST_DIR}...")
-vectorstore = Chroma.from_documents(
-    documents=documents,
-    embedding=embedding_model,
+# Update the vector store: only new or edited rows are embedded, removed rows are deleted
+print(f"Updating vector store at {PERSIST_DIR}...")
+vectorstore = Chroma(
     collection_name=COLLECTION_NAME,
     persist_directory=PERSIST_DIR,
+    embedding_function=embedding_model,
 )
+report = build_incremental(vectorstore, documents, embedding_model, PERSIST_DIR)
 
-print(f"✅ Vector store for strategies created successfully with {len(documents)} documents.") 
+print(f"✅ Vector store for strategies up to date: {format_report(report)}")
 
 # Debug: Inspect stored documents
 print("\n--- Inspecting stored strategy documents ---")
@@ -0,0 +1,235 @@
+"""
+Token-budgeted user-profile and chat-history context for chat prompts.
+
+The chat endpoint used to paste the raw strategy-details dict, every daily log
+(notes included) and up to 50 full messages into the prompt, so prompt size
+grew with a user's history. This module compacts logs into numeric trend
+summaries and trims the profile and the history to fixed token budgets, counted
+with tiktoken. ChatStageStats times the stages of a chat turn.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+PROFILE_TOKEN_BUDGET = int(os.getenv("CHAT_PROFILE_TOKEN_BUDGET", "600"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+TOKENIZER_MODEL = os.getenv("CHAT_TOKENIZER_MODEL", "gpt-4")
+
+# Strategy fields worth sending to the model, in order of importance
+STRATEGY_SUMMARY_FIELDS = ("Uitleg", "Verhelpt klachten bij", "Praktische tips")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    except Exception as e:
+        print(f"[CONTEXT] tiktoken unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, marking the cut with an ellipsis."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        limit = max_tokens * 4
+        return text if len(text) <= limit else text[:limit - 1] + "…"
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens - 1]) + "…"
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+def _numeric(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _trend(chronological_values):
+    """Mean of the recent half minus mean of the older half."""
+    values = [v for v in chronological_values if v is not None]
+    if len(values) < 2:
+        return None
+    half = len(values) // 2
+    return _mean(values[half:]) - _mean(values[:half])
+
+
+def _describe(label, values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    trend = _trend(values)
+    trend_text = f", trend {trend:+.1f}" if trend is not None else ""
+    return f"{label} avg {_mean(values):.1f}{trend_text}"
+
+
+def summarize_logs(logs) -> str:
+    """Compact daily logs (any order) into adherence and numeric trends; free-text notes are dropped."""
+    if not logs:
+        return "None"
+    chronological = sorted(logs, key=lambda log: str(log.get('date', '')))
+    first, last = chronological[0].get('date'), chronological[-1].get('date')
+    applied = sum(1 for log in chronological if log.get('applied_strategy'))
+
+    parts = [f"{len(chronological)} logs ({first} to {last})", f"strategy applied {applied}/{len(chronological)} days"]
+    for field in ('energy', 'mood'):
+        description = _describe(field, [_numeric(log.get(field)) for log in chronological])
+        if description:
+            parts.append(description)
+
+    symptom_series = {}
+    for log in chronological:
+        scores = log.get('symptom_scores') or {}
+        if isinstance(scores, dict):
+            for symptom, score in scores.items():
+                symptom_series.setdefault(symptom, []).append(_numeric(score))
+    for symptom, series in symptom_series.items():
+        description = _describe(symptom, series)
+        if description:
+            parts.append(description)
+    return "; ".join(parts)
+
+
+def summarize_strategy(name, details) -> str:
+    if not name:
+        return "None"
+    if not details:
+        return name
+    fields = [f"{field}: {details[field]}" for field in STRATEGY_SUMMARY_FIELDS if details.get(field)]
+    return f"{name} ({'; '.join(fields)})" if fields else name
+
+
+def build_user_profile(user: dict, symptom_names, strategy_details, logs, budget: int = PROFILE_TOKEN_BUDGET) -> str:
+    """
+    User profile for the chat prompt, at most `budget` tokens.
+    Lines are added in priority order; the first line that doesn't fit is truncated
+    and the rest are dropped.
+    """
+    lines = [
+        "User Profile:",
+        f"- Email: {user['email']}",
+        f"- Symptoms: {', '.join(symptom_names) if symptom_names else 'None'}",
+        f"- Goals: {user.get('goals', 'None')}",
+        f"- Current Strategy: {user.get('current_strategy') or 'None'}",
+        f"- Progress/Logs: {summarize_logs(logs)}",
+        f"- Strategy Details: {summarize_strategy(user.get('current_strategy'), strategy_details)}",
+    ]
+    kept = []
+    remaining = budget
+    for line in lines:
+        tokens = count_tokens(line) + 1  # newline
+        if tokens <= remaining:
+            kept.append(line)
+            remaining -= tokens
+        else:
+            truncated = truncate_to_tokens(line, remaining - 1)
+            if truncated:
+                kept.append(truncated)
+            break
+    return "\n" + "\n".join(kept) + "\n"
+
+
+def trim_history(history, budget: int = HISTORY_TOKEN_BUDGET):
+    """Keep the most recent (sender, text) pairs of chronological history that fit the budget."""
+    kept = []
+    used = 0
+    for sender, text in reversed(history):
+        tokens = count_tokens(text) + 4  # role prefix and separators
+        if used + tokens > budget:
+            break
+        kept.append((sender, text))
+        used += tokens
+    kept.reverse()
+    return kept, used
+
+
+class PromptTokenStats:
+    """Running totals of prompt-context token counts, exported on /api/v1/metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.profile_tokens = 0
+        self.history_tokens = 0
+        self.max_total_tokens = 0
+        self.history_messages_dropped = 0
+
+    def record(self, profile_tokens: int, history_tokens: int, dropped_messages: int):
+        with self._lock:
+            self.turns += 1
+            self.profile_tokens += profile_tokens
+            self.history_tokens += history_tokens
+            self.max_total_tokens = max(self.max_total_tokens, profile_tokens + history_tokens)
+            self.history_messages_dropped += dropped_messages
+
+    def stats(self) -> dict:
+        with self._lock:
+            turns = self.turns or 1
+            return {
+                "turns": self.turns,
+                "mean_profile_tokens": self.profile_tokens / turns,
+                "mean_history_tokens": self.history_tokens / turns,
+                "max_total_tokens": self.max_total_tokens,
+                "history_messages_dropped": self.history_messages_dropped,
+                "profile_token_budget": PROFILE_TOKEN_BUDGET,
+                "history_token_budget": HISTORY_TOKEN_BUDGET,
+            }
+
+
+prompt_token_stats = PromptTokenStats()
+
+
+class ChatStageStats:
+    """Wall time per chat-turn stage (context, prompt, llm, store), exported on /api/v1/metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.totals = defaultdict(float)
+
+    @contextmanager
+    def stage(self, timings: dict, name: str):
+        """Add the time spent in the block to timings[name]; one timings dict per request."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self, timings: dict):
+        with self._lock:
+            self.turns += 1
+            for name, seconds in timings.items():
+                self.totals[name] += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            turns = self.turns or 1
+            return {
+                "turns": self.turns,
+                "mean_ms": {name: seconds / turns * 1000 for name, seconds in self.totals.items()},
+            }
+
+
+def server_timing(timings: dict) -> str:
+    """Server-Timing header value for one request's stage timings."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+chat_stage_stats = ChatStageStats()
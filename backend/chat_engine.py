@@ -0,0 +1,235 @@
+"""
+Reusable conversational RAG engine for the chat endpoint.
+
+The prompt, the question-condensing chain and the combine-docs chain are built
+once when the engine is created. Per-request state (user profile, chat history,
+question) is passed in as plain inputs, so a chat turn no longer constructs a
+ConversationBufferMemory or a ConversationalRetrievalChain.
+"""
+import re
+import threading
+import time
+
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain.chains.conversational_retrieval.prompts import CONDENSE_QUESTION_PROMPT
+from langchain.prompts import PromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+
+from chat_context import count_tokens
+
+CHAT_PROMPT_TEMPLATE = """
+You are a cycle-aware nutrition assistant based on holistic and scientific insights.
+
+You have access to the following up-to-date user profile:
+{user_profile}
+
+Always answer user questions helpfully and always provide answers in a warm, empowering tone and information dense way.
+
+For the foods, refer to ingredients and nutrients rather than recipes or dishes.
+
+If the source materials really don't mention anything related to the question, say:
+"There are limited recommendations for your question based on science, but what science does advise is…"
+
+Be concise, clear, and nurturing in your responses.
+Keep a warm and empowering tone.
+
+Answer based on the context below:
+
+Context:
+{context}
+
+Question:
+{question}
+"""
+
+chat_prompt = PromptTemplate(
+    input_variables=["context", "question", "user_profile"],
+    template=CHAT_PROMPT_TEMPLATE
+)
+
+# Same role prefixes ConversationalRetrievalChain uses when it renders memory
+_ROLE_PREFIXES = {"user": "Human", "bot": "Assistant"}
+
+
+def format_chat_history(chat_history) -> str:
+    """Render (sender, text) pairs as the transcript the condense prompt expects."""
+    lines = []
+    for sender, text in chat_history:
+        prefix = _ROLE_PREFIXES.get(sender)
+        if prefix:
+            lines.append(f"{prefix}: {text}")
+    return "\n".join(lines)
+
+
+# Question-condensing strategies for turns that have chat history
+CONDENSE_LLM = "llm"                # always rewrite with the condense model (ConversationalRetrievalChain behaviour)
+CONDENSE_HEURISTIC = "heuristic"    # skip the rewrite when the question looks self-contained
+CONDENSE_FAST_MODEL = "fast_model"  # always rewrite, but with a small fast model
+CONDENSE_LAST_TURN = "last_turn"    # no LLM call: use the question plus the previous user turn
+CONDENSE_MODES = (CONDENSE_LLM, CONDENSE_HEURISTIC, CONDENSE_FAST_MODEL, CONDENSE_LAST_TURN)
+
+# Words that usually point back at earlier turns ("what about that one?", "is it safe?")
+_FOLLOW_UP_WORDS = {
+    "it", "its", "that", "those", "these", "they", "them", "their", "there",
+    "also", "else", "instead", "same", "again", "above", "previous", "more",
+}
+_FOLLOW_UP_OPENERS = ("and ", "but ", "so ", "or ", "what about", "how about", "then ")
+
+
+def is_self_contained(question: str) -> bool:
+    """Cheap check whether a question can be retrieved on as-is, without the chat history."""
+    text = question.strip().lower()
+    words = re.findall(r"[a-z']+", text)
+    if len(words) < 4 or text.startswith(_FOLLOW_UP_OPENERS):
+        return False
+    return not any(word in _FOLLOW_UP_WORDS for word in words)
+
+
+def last_user_turn(chat_history):
+    """Most recent user message in chronological (sender, text) history."""
+    for sender, text in reversed(list(chat_history)):
+        if sender == "user":
+            return text
+    return None
+
+
+class ChatEngine:
+    """Conversational retrieval chain whose runnables are built once per process."""
+
+    def __init__(self, llm, retriever, prompt=chat_prompt, condense_mode=CONDENSE_LLM, condense_llm=None, router=None):
+        if condense_mode not in CONDENSE_MODES:
+            raise ValueError(f"Unknown condense mode {condense_mode!r}, expected one of {CONDENSE_MODES}")
+        self.llm = llm
+        self.retriever = retriever
+        self.prompt = prompt
+        self.condense_mode = condense_mode
+        self.condense_question_chain = CONDENSE_QUESTION_PROMPT | (condense_llm or llm) | StrOutputParser()
+        self.combine_docs_chain = create_stuff_documents_chain(llm, prompt)
+        # With a ModelRouter, the answer model is picked per request (see model_router)
+        self.router = router
+        self._tier_chains = {
+            tier.name: create_stuff_documents_chain(tier.llm, prompt) for tier in router.tiers
+        } if router is not None else {}
+        self._stats_lock = threading.Lock()
+        self._condense_stats = {}
+
+    def _record_condense(self, used_llm: bool, seconds: float):
+        with self._stats_lock:
+            stats = self._condense_stats.setdefault(
+                self.condense_mode, {"turns": 0, "llm_calls": 0, "skipped": 0, "total_seconds": 0.0}
+            )
+            stats["turns"] += 1
+            stats["llm_calls" if used_llm else "skipped"] += 1
+            stats["total_seconds"] += seconds
+
+    def condense_stats(self) -> dict:
+        """Per-mode count of condensed turns, LLM calls made/skipped and mean latency."""
+        with self._stats_lock:
+            return {
+                mode: {**stats, "mean_ms": stats["total_seconds"] / stats["turns"] * 1000 if stats["turns"] else 0.0}
+                for mode, stats in self._condense_stats.items()
+            }
+
+    def _plan_condense(self, question: str, chat_history):
+        """Return (standalone question, None) when no LLM call is needed, else (None, transcript)."""
+        transcript = format_chat_history(chat_history)
+        if not transcript:
+            return question, None
+        if self.condense_mode == CONDENSE_HEURISTIC and is_self_contained(question):
+            return question, None
+        if self.condense_mode == CONDENSE_LAST_TURN:
+            previous = last_user_turn(chat_history)
+            return (f"{question} (follow-up to: {previous})" if previous else question), None
+        return None, transcript
+
+    def condense_question(self, question: str, chat_history) -> str:
+        """Rewrite a follow-up into a standalone question, per the configured condense mode."""
+        start = time.perf_counter()
+        standalone_question, transcript = self._plan_condense(question, chat_history)
+        if transcript is not None:
+            standalone_question = self.condense_question_chain.invoke(
+                {"question": question, "chat_history": transcript}
+            )
+        if chat_history:
+            self._record_condense(transcript is not None, time.perf_counter() - start)
+        return standalone_question
+
+    def _answer_chain(self, standalone_question: str, docs, history_messages: int):
+        """(combine-docs chain, Route or None) for this request."""
+        if self.router is None:
+            return self.combine_docs_chain, None
+        route = self.router.route_documents(standalone_question, docs, history_messages)
+        return self._tier_chains[route.tier.name], route
+
+    def _record_route(self, route, start: float, answer: str, user_profile: str):
+        if route is not None:
+            self.router.record(route, time.perf_counter() - start, answer, count_tokens(user_profile))
+
+    def answer(self, standalone_question: str, user_profile: str = "", history_messages: int = 0) -> dict:
+        """Retrieve and answer an already self-contained question."""
+        docs = self.retriever.invoke(standalone_question)
+        chain, route = self._answer_chain(standalone_question, docs, history_messages)
+        start = time.perf_counter()
+        answer = chain.invoke({
+            "context": docs,
+            "question": standalone_question,
+            "user_profile": user_profile,
+        })
+        self._record_route(route, start, answer, user_profile)
+        return {"answer": answer, "source_documents": docs}
+
+    def invoke(self, question: str, user_profile: str = "", chat_history=()) -> dict:
+        """Answer one chat turn. Returns {"answer": str, "source_documents": [Document]}."""
+        standalone_question = self.condense_question(question, chat_history)
+        return self.answer(standalone_question, user_profile, len(chat_history))
+
+    async def acondense_question(self, question: str, chat_history) -> str:
+        """Async version of condense_question."""
+        start = time.perf_counter()
+        standalone_question, transcript = self._plan_condense(question, chat_history)
+        if transcript is not None:
+            standalone_question = await self.condense_question_chain.ainvoke(
+                {"question": question, "chat_history": transcript}
+            )
+        if chat_history:
+            self._record_condense(transcript is not None, time.perf_counter() - start)
+        return standalone_question
+
+    async def aanswer(self, standalone_question: str, user_profile: str = "", history_messages: int = 0) -> dict:
+        """Async version of answer."""
+        docs = await self.retriever.ainvoke(standalone_question)
+        chain, route = self._answer_chain(standalone_question, docs, history_messages)
+        start = time.perf_counter()
+        answer = await chain.ainvoke({
+            "context": docs,
+            "question": standalone_question,
+            "user_profile": user_profile,
+        })
+        self._record_route(route, start, answer, user_profile)
+        return {"answer": answer, "source_documents": docs}
+
+    async def ainvoke(self, question: str, user_profile: str = "", chat_history=()) -> dict:
+        """Async version of invoke, built on the chains' ainvoke."""
+        standalone_question = await self.acondense_question(question, chat_history)
+        return await self.aanswer(standalone_question, user_profile, len(chat_history))
+
+    async def astream_answer(self, standalone_question: str, user_profile: str = "", history_messages: int = 0):
+        """Yield answer tokens for an already self-contained question."""
+        docs = await self.retriever.ainvoke(standalone_question)
+        chain, route = self._answer_chain(standalone_question, docs, history_messages)
+        start = time.perf_counter()
+        tokens = []
+        async for token in chain.astream({
+            "context": docs,
+            "question": standalone_question,
+            "user_profile": user_profile,
+        }):
+            tokens.append(token)
+            yield token
+        self._record_route(route, start, "".join(tokens), user_profile)
+
+    async def astream(self, question: str, user_profile: str = "", chat_history=()):
+        """Yield answer tokens as the LLM produces them."""
+        standalone_question = await self.acondense_question(question, chat_history)
+        async for token in self.astream_answer(standalone_question, user_profile, len(chat_history)):
+            yield token
@@ -0,0 +1,149 @@
+"""
+Near-duplicate chunk elimination with MinHash + LSH, before anything is embedded.
+
+The book export repeats tables of contents, headers and boilerplate, so some
+chunks are (almost) the same text. Each chunk is reduced to a MinHash signature
+over its word 5-gram shingles (hashed with mmh3); LSH banding finds candidate
+pairs without comparing every chunk with every other, and a candidate counts as
+a duplicate when its estimated Jaccard similarity reaches the threshold. The
+first occurrence is kept.
+
+Neighbouring chunks share only their 100-character overlap, far below the
+default threshold, so they are not affected.
+"""
+import os
+import re
+from typing import Iterable, Iterator, List, Optional
+
+import mmh3
+import numpy as np
+
+DEDUP_THRESHOLD = float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.8"))
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always share a band
+SHINGLE_WORDS = 5
+# OpenAI text-embedding-ada-002 list price, for the savings report
+EMBEDDING_PRICE_PER_1M_TOKENS = float(os.getenv("EMBEDDING_PRICE_PER_1M_TOKENS", "0.10"))
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingles(text: str) -> List[str]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+
+
+class MinHashLSH:
+    """Streaming MinHash/LSH index: add() returns the id of an earlier near-duplicate, if any."""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = NUM_PERM, bands: int = BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        # Universal hashing (a * x + b) mod p, one (a, b) per permutation
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = []
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = _shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.uint64)
+        hashes = np.fromiter((mmh3.hash(s, signed=False) for s in shingles), dtype=np.uint64, count=len(shingles))
+        hashes %= _MERSENNE_PRIME
+        permuted = (self._a[:, np.newaxis] * hashes[np.newaxis, :] + self._b[:, np.newaxis]) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def query(self, signature: np.ndarray) -> Optional[int]:
+        """Id of the most similar indexed item at or above the threshold, or None."""
+        candidates = set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(key, ()))
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+
+    def insert(self, signature: np.ndarray) -> int:
+        item_id = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in self._band_keys(signature):
+            self._buckets[band].setdefault(key, []).append(item_id)
+        return item_id
+
+    def add(self, text: str) -> Optional[int]:
+        """Index text unless it near-duplicates an indexed item; returns that item's id in that case."""
+        signature = self.signature(text)
+        duplicate_of = self.query(signature)
+        if duplicate_of is None:
+            self.insert(signature)
+        return duplicate_of
+
+
+class DedupReport:
+    """
+    What dropping near-duplicates saved, in chunks, characters, index bytes and embedding cost.
+    Index bytes need the vector size of the embeddings the chunks go to
+    (embedding_backends.embedding_dimension()); without it they are left out.
+    """
+
+    def __init__(self, embedding_dim: Optional[int] = None):
+        self.embedding_dim = embedding_dim
+        self.chunks_in = 0
+        self.chunks_out = 0
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def record(self, text: str, kept: bool):
+        self.chunks_in += 1
+        self.chars_in += len(text)
+        if kept:
+            self.chunks_out += 1
+            self.chars_out += len(text)
+
+    def summary(self) -> dict:
+        dropped = self.chunks_in - self.chunks_out
+        tokens_saved = (self.chars_in - self.chars_out) / 4
+        summary = {
+            "chunks_in": self.chunks_in,
+            "chunks_out": self.chunks_out,
+            "dropped": dropped,
+            "dropped_fraction": dropped / self.chunks_in if self.chunks_in else 0.0,
+            "embedding_tokens_saved": int(tokens_saved),
+            "embedding_cost_saved_usd": tokens_saved / 1e6 * EMBEDDING_PRICE_PER_1M_TOKENS,
+        }
+        if self.embedding_dim:
+            summary["index_bytes_saved"] = dropped * self.embedding_dim * 4
+        return summary
+
+    def __str__(self):
+        s = self.summary()
+        index = f"index {s['index_bytes_saved'] / 1e6:.1f} MB smaller, " if "index_bytes_saved" in s else ""
+        return (f"{s['chunks_in']} chunks -> {s['chunks_out']} ({s['dropped']} near-duplicates, {s['dropped_fraction']:.1%}); "
+                f"{index}{s['embedding_tokens_saved']} fewer embedding tokens "
+                f"(${s['embedding_cost_saved_usd']:.4f} per full embed)")
+
+
+def dedup_chunks(chunks: Iterable[str], threshold: float = DEDUP_THRESHOLD, report: Optional[DedupReport] = None) -> Iterator[str]:
+    """Yield chunks, skipping any that near-duplicates an earlier one. Streams; fits between ingestion and writing."""
+    lsh = MinHashLSH(threshold)
+    for chunk in chunks:
+        kept = lsh.add(chunk) is None
+        if report is not None:
+            report.record(chunk, kept)
+        if kept:
+            yield chunk
@@ -66,6 +66,20 @@ CREATE INDEX IF NOT EXISTS idx_daily_logs_date ON daily_logs(date);
 CREATE INDEX IF NOT EXISTS idx_trial_periods_user_id ON trial_periods(user_id);
 CREATE INDEX IF NOT EXISTS idx_trial_periods_is_active ON trial_periods(is_active);
 
+-- Chat context in a single request: one row with the symptoms, recent logs and recent chat messages (newest first).
+-- Called by async_db.AsyncSupabaseDB.get_chat_context when CHAT_CONTEXT_RPC=true
+CREATE OR REPLACE FUNCTION get_chat_context(p_user_id BIGINT, p_logs_limit INTEGER DEFAULT 30, p_messages_limit INTEGER DEFAULT 50)
+RETURNS TABLE (symptoms JSON, logs JSON, messages JSON)
+LANGUAGE SQL STABLE
+AS $$
+    SELECT
+        COALESCE((SELECT json_agg(s ORDER BY s."order") FROM tracked_symptoms s WHERE s.user_id = p_user_id), '[]'::json),
+        COALESCE((SELECT json_agg(l ORDER BY l.date DESC)
+                  FROM (SELECT * FROM daily_logs WHERE user_id = p_user_id ORDER BY date DESC LIMIT p_logs_limit) l), '[]'::json),
+        COALESCE((SELECT json_agg(m ORDER BY m.timestamp DESC)
+                  FROM (SELECT * FROM chat_messages WHERE user_id = p_user_id ORDER BY timestamp DESC LIMIT p_messages_limit) m), '[]'::json);
+$$;
+
 -- Enable Row Level Security (RLS)
 ALTER TABLE users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE chat_messages ENABLE ROW LEVEL SECURITY;
@@ -5,6 +5,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from supabase import create_client, Client
 from typing import Optional, Dict, Any, List
+from user_cache import user_cache
 
 # Load environment variables
 load_dotenv()
@@ -31,36 +32,45 @@ def test_supabase_connection():
         print(f"❌ Supabase connection failed: {e}")
         return False
 
-# Test connection
-supabase_connected = test_supabase_connection()
-
-# Configure database based on connection status
-if supabase_connected:
-    print("✅ Using Supabase database (HTTP API)")
-    # No SQLAlchemy engine needed for Supabase - we use the client directly
-    engine = None
-    SQLALCHEMY_DATABASE_URL = "supabase://http-api"
-else:
-    # Fallback to SQLite
-    SQLALCHEMY_DATABASE_URL = "sqlite:///./users.db"
-    print("⚠️ Using SQLite fallback - data won't persist in production")
-    
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        echo=False
-    )
-
-# Create session maker (only for SQLite fallback)
-if engine:
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-else:
-    SessionLocal = None
+# Database status, filled in by configure_database() (called from the API's startup
+# task) so that importing this module never makes a network call
+supabase_connected = None
+engine = None
+SQLALCHEMY_DATABASE_URL = None
+SessionLocal = None
 
 # Create base model (only for SQLite fallback)
 Base = declarative_base()
 
-print(f"Database configured: {'Supabase (HTTP API)' if supabase_connected else 'SQLite'}")
+def configure_database():
+    """Test the Supabase connection once and set up the SQLite fallback if it fails"""
+    global supabase_connected, engine, SQLALCHEMY_DATABASE_URL, SessionLocal
+    if supabase_connected is not None:
+        return supabase_connected
+
+    connected = test_supabase_connection()
+    if connected:
+        print("✅ Using Supabase database (HTTP API)")
+        # No SQLAlchemy engine needed for Supabase - we use the client directly
+        engine = None
+        SQLALCHEMY_DATABASE_URL = "supabase://http-api"
+    else:
+        # Fallback to SQLite
+        SQLALCHEMY_DATABASE_URL = "sqlite:///./users.db"
+        print("⚠️ Using SQLite fallback - data won't persist in production")
+
+        engine = create_engine(
+            SQLALCHEMY_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            echo=False
+        )
+
+    # Create session maker (only for SQLite fallback)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) if engine else None
+    supabase_connected = connected
+
+    print(f"Database configured: {'Supabase (HTTP API)' if supabase_connected else 'SQLite'}")
+    return supabase_connected
 
 # Supabase database operations functions
 class SupabaseDB:
@@ -106,6 +116,8 @@ class SupabaseDB:
         """Update user's current strategy"""
         try:
             supabase.table('users').update({"current_strategy": strategy}).eq('id', user_id).execute()
+            # The API caches user rows per token; drop this user's stale copies
+            user_cache.invalidate(user_id=user_id)
             return True
         except Exception as e:
             print(f"Error updating user strategy: {e}")
@@ -219,6 +231,3 @@ class SupabaseDB:
         except Exception as e:
             print(f"Error getting tracked symptoms: {e}")
             return []
-
-print(os.path.abspath('data/strategies.csv'))
-print(os.path.exists('data/strategies.csv')) 
\ No newline at end of file
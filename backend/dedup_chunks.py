@@ -0,0 +1,28 @@
+# python dedup_chunks.py [--dry-run]
+"""
+Drop near-duplicate chunks from the existing chunk file without re-ingesting the PDF.
+Run build_lexical_index.py, build_vectorstore.py and build_flat_snapshot.py afterwards;
+the incremental build deletes the vectors of the removed chunks.
+"""
+import json
+import sys
+import time
+
+from chunk_dedup import DEDUP_THRESHOLD, DedupReport, dedup_chunks
+from embedding_backends import embedding_dimension
+from lexical_index import CHUNKS_PATH
+from pdf_ingest import write_chunks
+
+with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+    chunks = json.load(f)
+print(f"Loaded {len(chunks)} chunks from {CHUNKS_PATH} (threshold {DEDUP_THRESHOLD})")
+
+start = time.perf_counter()
+report = DedupReport(embedding_dim=embedding_dimension())
+kept = list(dedup_chunks(chunks, report=report))
+print(f"🧹 {report} in {time.perf_counter() - start:.2f}s")
+
+if "--dry-run" not in sys.argv and len(kept) < len(chunks):
+    jsonl_path = CHUNKS_PATH.rsplit(".", 1)[0] + ".jsonl"
+    write_chunks(kept, jsonl_path, CHUNKS_PATH)
+    print(f"✅ Wrote {len(kept)} chunks to {CHUNKS_PATH} and {jsonl_path}")
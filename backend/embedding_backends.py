@@ -0,0 +1,112 @@
+"""
+Pluggable embedding backends: OpenAI (remote) or a local ONNX sentence-embedding model.
+
+The ONNX backend runs a sentence-transformers style model exported to ONNX
+(e.g. all-MiniLM-L6-v2) on the CPU with onnxruntime, tokenized with the
+HuggingFace `tokenizers` library. No network round-trip per query, and
+retrieval keeps working offline. The model directory needs model.onnx and
+tokenizer.json, e.g. from
+`optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 data/models/all-MiniLM-L6-v2`.
+
+Vectors from different backends live in different spaces (and dimensions), so
+each backend gets its own vectorstore directories and cache namespace; see
+vectorstore_dir().
+"""
+import os
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import cached
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BACKEND_OPENAI = "openai"
+BACKEND_ONNX = "onnx"
+EMBEDDING_BACKENDS = (BACKEND_OPENAI, BACKEND_ONNX)
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", BACKEND_OPENAI)
+# Directory holding model.onnx and tokenizer.json
+ONNX_MODEL_DIR = os.getenv("ONNX_EMBEDDING_MODEL_DIR", os.path.join(BASE_DIR, "data", "models", "all-MiniLM-L6-v2"))
+ONNX_BATCH_SIZE = int(os.getenv("ONNX_EMBEDDING_BATCH_SIZE", "32"))
+ONNX_MAX_LENGTH = int(os.getenv("ONNX_EMBEDDING_MAX_LENGTH", "256"))
+
+
+class OnnxEmbeddings(Embeddings):
+    """Mean-pooled, L2-normalized sentence embeddings from a local ONNX model."""
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, batch_size: int = ONNX_BATCH_SIZE, max_length: int = ONNX_MAX_LENGTH, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir
+        self.model = f"onnx:{os.path.basename(os.path.normpath(model_dir))}"
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return pooled / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(texts[start:start + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+def make_embeddings(backend: str = EMBEDDING_BACKEND, api_key=None) -> Embeddings:
+    """Uncached embedding model for the given backend."""
+    if backend == BACKEND_ONNX:
+        return OnnxEmbeddings()
+    if backend == BACKEND_OPENAI:
+        from langchain_openai import OpenAIEmbeddings
+        from openai_limiter import openai_client_kwargs
+        return OpenAIEmbeddings(api_key=api_key or os.getenv("OPENAI_API_KEY"), **openai_client_kwargs())
+    raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+
+def get_embeddings(backend: str = EMBEDDING_BACKEND, api_key=None) -> Embeddings:
+    """Embedding model for the given backend, wrapped in the shared embedding cache."""
+    return cached(make_embeddings(backend, api_key))
+
+
+def embedding_dimension(backend: str = EMBEDDING_BACKEND, api_key=None) -> int:
+    """Vector size of the given backend's embeddings; one (cached) probe embedding."""
+    return len(get_embeddings(backend, api_key).embed_query("dimension"))
+
+
+def vectorstore_dir(name: str, backend: str = EMBEDDING_BACKEND) -> str:
+    """
+    Persist directory for a vectorstore under data/vectorstore. OpenAI keeps the
+    original paths; other backends get a parallel "<name>_<backend>" directory.
+    """
+    suffix = "" if backend == BACKEND_OPENAI else f"_{backend}"
+    return os.path.join(BASE_DIR, "data", "vectorstore", f"{name}{suffix}")
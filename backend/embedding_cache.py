@@ -0,0 +1,216 @@
+"""
+Content-hash-keyed embedding cache shared by the API and the build scripts.
+
+CachedEmbeddings wraps any LangChain Embeddings model. Vectors are looked up in
+an in-process LRU first, then in an on-disk SQLite store, and only the texts
+missing from both are sent to the underlying model (in one batch call). Keys are
+sha256(model name + text), so the same text is never embedded twice, across
+queries, documents and processes. The async methods run the SQLite reads and
+writes in a worker thread, so disk I/O never blocks the event loop.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", os.path.join(BASE_DIR, "data", "embedding_cache.sqlite3")
+)
+
+
+class EmbeddingStore:
+    """SQLite table of sha256 key -> float32 vector blob."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> dict:
+        found = {}
+        with self._lock:
+            # SQLite caps the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items: dict):
+        if not items:
+            return
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an in-process LRU backed by an EmbeddingStore."""
+
+    def __init__(self, underlying: Embeddings, store: Optional[EmbeddingStore] = None, max_memory_entries: int = 10000, namespace: Optional[str] = None):
+        self.underlying = underlying
+        self.store = store
+        self.max_memory_entries = max_memory_entries
+        self.namespace = namespace or getattr(underlying, "model", None) or type(underlying).__name__
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup_memory(self, texts: List[str]):
+        """Return (keys, vectors-or-None, indices of texts missing from memory)."""
+        keys = [self._key(text) for text in texts]
+        vectors = [None] * len(texts)
+        pending = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    vectors[i] = vector
+                    self.memory_hits += 1
+                else:
+                    pending.append(i)
+        return keys, vectors, pending
+
+    def _fill_from_store(self, keys, vectors, pending, on_disk: dict):
+        """Fill vectors found by store.get_many; returns the indices still missing."""
+        still_missing = []
+        for i in pending:
+            vector = on_disk.get(keys[i])
+            if vector is not None:
+                vectors[i] = vector
+                self._remember(keys[i], vector)
+            else:
+                still_missing.append(i)
+        with self._lock:
+            self.disk_hits += len(pending) - len(still_missing)
+        return still_missing
+
+    def _lookup(self, texts: List[str]):
+        """Return (keys, vectors-or-None, indices of texts still missing)."""
+        keys, vectors, pending = self._lookup_memory(texts)
+        if pending and self.store is not None:
+            on_disk = self.store.get_many(list({keys[i] for i in pending}))
+            pending = self._fill_from_store(keys, vectors, pending, on_disk)
+        return keys, vectors, pending
+
+    async def _alookup(self, texts: List[str]):
+        keys, vectors, pending = self._lookup_memory(texts)
+        if pending and self.store is not None:
+            on_disk = await asyncio.to_thread(self.store.get_many, list({keys[i] for i in pending}))
+            pending = self._fill_from_store(keys, vectors, pending, on_disk)
+        return keys, vectors, pending
+
+    def _remember_new(self, keys, vectors, missing, new_vectors) -> dict:
+        """Fill and remember freshly embedded vectors; returns them by key for the store."""
+        fresh = {}
+        for i, vector in zip(missing, new_vectors):
+            vectors[i] = vector
+            fresh[keys[i]] = vector
+            self._remember(keys[i], vector)
+        with self._lock:
+            self.misses += len(missing)
+        return fresh
+
+    def _store_new(self, keys, vectors, missing, new_vectors):
+        fresh = self._remember_new(keys, vectors, missing, new_vectors)
+        if self.store is not None:
+            self.store.put_many(fresh)
+
+    async def _astore_new(self, keys, vectors, missing, new_vectors):
+        fresh = self._remember_new(keys, vectors, missing, new_vectors)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.put_many, fresh)
+
+    @staticmethod
+    def _unique(texts, keys, missing):
+        """Deduplicate missing texts so repeats within one batch are embedded once."""
+        first_index = {}
+        for i in missing:
+            first_index.setdefault(keys[i], i)
+        unique = list(first_index.values())
+        return unique, [texts[i] for i in unique]
+
+    @staticmethod
+    def _fill_duplicates(keys, vectors, missing, unique):
+        by_key = {keys[i]: vectors[i] for i in unique}
+        for i in missing:
+            if vectors[i] is None:
+                vectors[i] = by_key[keys[i]]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = self._lookup(texts)
+        if missing:
+            unique, unique_texts = self._unique(texts, keys, missing)
+            self._store_new(keys, vectors, unique, self.underlying.embed_documents(unique_texts))
+            self._fill_duplicates(keys, vectors, missing, unique)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, vectors, missing = self._lookup([text])
+        if missing:
+            self._store_new(keys, vectors, missing, [self.underlying.embed_query(text)])
+        return vectors[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = await self._alookup(texts)
+        if missing:
+            unique, unique_texts = self._unique(texts, keys, missing)
+            await self._astore_new(keys, vectors, unique, await self.underlying.aembed_documents(unique_texts))
+            self._fill_duplicates(keys, vectors, missing, unique)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, vectors, missing = await self._alookup([text])
+        if missing:
+            await self._astore_new(keys, vectors, missing, [await self.underlying.aembed_query(text)])
+        return vectors[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+def cached(underlying: Embeddings, path: str = DEFAULT_CACHE_PATH) -> CachedEmbeddings:
+    """Wrap an embedding model with the shared on-disk cache."""
+    return CachedEmbeddings(underlying, EmbeddingStore(path))
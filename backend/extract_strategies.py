@@ -1,22 +1,36 @@
 # python extract_strategies.py
 import os
 import json
+import asyncio
+import hashlib
+import numpy as np
 import pandas as pd
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import logging
+from openai_limiter import limited_async_http_client, openai_limiter
+from embedding_backends import get_embeddings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Initialize OpenAI client; requests go through the shared rate limiter, which owns retries
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=limited_async_http_client(), max_retries=0)
 
 # Define paths
 CHUNKS_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'processed', 'chunks_AlisaVita.json')
 OUTPUT_CSV_PATH = os.path.join(os.path.dirname(__file__), 'data', 'strategies_from_book.csv')
+# One JSON line per processed chunk: {"chunk_hash": ..., "strategy": {...} or null}
+CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), 'data', 'strategies_extraction.jsonl')
+
+# Chunks in flight at once; the limiter still enforces the account's rate budget
+EXTRACT_CONCURRENCY = int(os.getenv("EXTRACT_CONCURRENCY", "8"))
+# Strategies whose name + explanation embeddings are at least this similar are merged
+STRATEGY_MERGE_THRESHOLD = float(os.getenv("STRATEGY_MERGE_THRESHOLD", "0.9"))
+MIN_CHUNK_LENGTH = 150
+REQUIRED_KEYS = ["strategy_name", "explanation", "why", "helps_with", "practical_tips"]
 
 def load_book_chunks(path):
     #Loads book chunks from a JSON file.
@@ -33,7 +47,36 @@ def load_book_chunks(path):
         logging.error(f"Error decoding JSON from {path}")
         return None
 
-def extract_strategies_with_llm(text_chunk):
+def chunk_text(chunk):
+    # Chunks are plain strings or {"page_content": ...} dicts
+    return chunk if isinstance(chunk, str) else chunk.get('page_content', '')
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def load_checkpoint(path):
+    #Returns {chunk_hash: strategy or None} for every chunk a previous run finished.
+    processed = {}
+    if not os.path.exists(path):
+        return processed
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut off by a crash; that chunk is simply redone
+            processed[record['chunk_hash']] = record.get('strategy')
+    return processed
+
+def terminate_last_line(path):
+    #After a crash mid-write, start the next record on a fresh line.
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+async def extract_strategies_with_llm(text_chunk):
     #Uses an LLM to extract a single, well-defined strategy from a text chunk.
     system_prompt = """
 You are an expert in nutrition and hormonal health, specializing in distilling actionable advice from text.
@@ -50,20 +93,65 @@ The JSON object must have the following keys:
 
 Only extract a strategy if it is a specific, actionable instruction. General information is not a strategy.
 """
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text_chunk}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.2
-        )
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        logging.error(f"Error calling OpenAI API: {e}")
-        return {}
+    response = await client.chat.completions.create(
+        model="gpt-4-turbo",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": text_chunk}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.2
+    )
+    return json.loads(response.choices[0].message.content)
+
+def is_valid_strategy(strategy):
+    return bool(strategy) and all(k in strategy for k in REQUIRED_KEYS)
+
+async def process_chunks(pending, checkpoint_file, concurrency=EXTRACT_CONCURRENCY):
+    #Extracts strategies from (hash, text) pairs concurrently, appending each result to the checkpoint.
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def process(hash_, text):
+        nonlocal done
+        async with semaphore:
+            try:
+                strategy = await extract_strategies_with_llm(text)
+            except Exception as e:
+                # Not checkpointed, so the next run retries this chunk
+                logging.error(f"Error calling OpenAI API: {e}")
+                return
+        strategy = strategy if is_valid_strategy(strategy) else None
+        checkpoint_file.write(json.dumps({"chunk_hash": hash_, "strategy": strategy}, ensure_ascii=False) + "\n")
+        checkpoint_file.flush()
+        done += 1
+        if strategy:
+            logging.info(f"[{done}/{len(pending)}] Found strategy: {strategy['strategy_name']}")
+
+    await asyncio.gather(*(process(hash_, text) for hash_, text in pending))
+
+def merge_near_duplicates(strategies, threshold=STRATEGY_MERGE_THRESHOLD):
+    #Greedy clustering on embedding similarity: each strategy joins the first kept one it is close to.
+    if not strategies:
+        return []
+    embeddings = get_embeddings()
+    texts = [f"{s['strategy_name']}: {s['explanation']}" for s in strategies]
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    kept, kept_vectors = [], []
+    for strategy, vector in zip(strategies, vectors):
+        if kept_vectors:
+            similarities = np.asarray(kept_vectors) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                merged = kept[best]
+                symptoms = [x.strip() for x in f"{merged['helps_with']},{strategy['helps_with']}".split(',') if x.strip()]
+                merged['helps_with'] = ",".join(dict.fromkeys(symptoms))
+                continue
+        kept.append(dict(strategy))
+        kept_vectors.append(vector)
+    return kept
 
 def main():
     #Main function to run the strategy extraction process.
@@ -71,34 +159,43 @@ def main():
     if not chunks:
         return
 
-    all_strategies = []
-    # Process all chunks. This might take a while.
-    for i, chunk in enumerate(chunks):
-        content = chunk.get('page_content', '')
-        if len(content) < 150: # Skip very short chunks
+    processed = load_checkpoint(CHECKPOINT_PATH)
+    pending = {}
+    for chunk in chunks:
+        text = chunk_text(chunk)
+        if len(text) < MIN_CHUNK_LENGTH:  # Skip very short chunks
             continue
-            
-        logging.info(f"Processing chunk {i+1}/{len(chunks)}...")
-        strategy = extract_strategies_with_llm(content)
-        
-        # Validate that the extracted object is a valid strategy
-        if strategy and all(k in strategy for k in ["strategy_name", "explanation", "why", "helps_with", "practical_tips"]):
-            all_strategies.append(strategy)
-            logging.info(f"Found strategy: {strategy['strategy_name']}")
+        hash_ = chunk_hash(text)
+        if hash_ not in processed:
+            pending.setdefault(hash_, text)
+    logging.info(f"{len(processed)} chunks already processed, {len(pending)} to go (concurrency {EXTRACT_CONCURRENCY})")
+
+    if pending:
+        os.makedirs(os.path.dirname(CHECKPOINT_PATH), exist_ok=True)
+        terminate_last_line(CHECKPOINT_PATH)
+        with open(CHECKPOINT_PATH, 'a', encoding='utf-8') as checkpoint_file:
+            asyncio.run(process_chunks(list(pending.items()), checkpoint_file))
+        processed = load_checkpoint(CHECKPOINT_PATH)
 
+    all_strategies = [strategy for strategy in processed.values() if strategy]
     if not all_strategies:
         logging.warning("No strategies were extracted from the book chunks.")
         return
 
+    # Merge strategies that say the same thing under different names
+    unique_strategies = merge_near_duplicates(all_strategies)
+    logging.info(f"Merged {len(all_strategies)} extracted strategies into {len(unique_strategies)}")
+
     # Convert to DataFrame and save to CSV
-    df = pd.DataFrame(all_strategies)
+    df = pd.DataFrame(unique_strategies)
     # Ensure no duplicates
     df.drop_duplicates(subset=['strategy_name'], inplace=True, keep='first')
     
     logging.info(f"Saving {len(df)} unique strategies to {OUTPUT_CSV_PATH}...")
     df.to_csv(OUTPUT_CSV_PATH, index=False, sep=';')
     logging.info("✅ Successfully created strategies CSV from the book.")
+    logging.info(f"OpenAI limiter: {openai_limiter.stats()}")
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,109 @@
+"""
+Memory-mapped flat-vector snapshot of the book corpus.
+
+The book is a couple of thousand 500-character chunks, so an exact search over
+a flat float32 matrix beats Chroma's HNSW index + SQLite, and is much smaller
+in memory. The snapshot directory holds:
+
+    vectors.npy   L2-normalized float32 matrix, one row per chunk
+    texts.bin     all chunk texts, UTF-8, back to back
+    offsets.npy   int64 byte offsets into texts.bin (n + 1 entries)
+    meta.json     count, dimension and the embedding namespace that made the vectors
+
+Everything is opened with mmap, so the pages live once in the OS page cache and
+are shared by every uvicorn worker instead of being copied into each process.
+"""
+import json
+import mmap
+import os
+from typing import List
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from strategy_index import StrategyIndex
+
+VECTORS_FILE = "vectors.npy"
+TEXTS_FILE = "texts.bin"
+OFFSETS_FILE = "offsets.npy"
+META_FILE = "meta.json"
+
+
+def write_snapshot(path: str, vectors, texts: List[str], namespace: str = ""):
+    """Write normalized vectors and texts as a snapshot directory (atomically per file)."""
+    os.makedirs(path, exist_ok=True)
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    def _replace(name, write):
+        tmp = os.path.join(path, name + ".tmp")
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, os.path.join(path, name))
+
+    _replace(VECTORS_FILE, lambda f: np.save(f, matrix))
+    _replace(OFFSETS_FILE, lambda f: np.save(f, offsets))
+    _replace(TEXTS_FILE, lambda f: f.write(b"".join(encoded)))
+    meta = {"count": len(encoded), "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0, "namespace": namespace}
+    _replace(META_FILE, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+
+class FlatSnapshot:
+    """Read-only, memory-mapped view of a snapshot directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._texts_file = open(os.path.join(path, TEXTS_FILE), "rb")
+        size = os.fstat(self._texts_file.fileno()).st_size
+        self._texts = mmap.mmap(self._texts_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return int(self.vectors.shape[0])
+
+    def text(self, i: int) -> str:
+        return self._texts[int(self.offsets[i]):int(self.offsets[i + 1])].decode("utf-8")
+
+    def search(self, query_vector, k: int = 4):
+        """Top-k (row, cosine score) pairs, best first."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = self.vectors @ (query / norm if norm else query)
+        return [(int(i), float(scores[i])) for i in StrategyIndex.top_k_indices(scores, k)]
+
+    def close(self):
+        if isinstance(self._texts, mmap.mmap):
+            self._texts.close()
+        self._texts_file.close()
+
+
+class FlatVectorRetriever(BaseRetriever):
+    """Exact top-k retriever over a FlatSnapshot; a drop-in for the Chroma retriever."""
+
+    snapshot: FlatSnapshot
+    embeddings: Embeddings
+    k: int = 4
+
+    def _documents(self, query_vector) -> List[Document]:
+        return [
+            Document(page_content=self.snapshot.text(i), metadata={"source": "AlisaVita", "score": score})
+            for i, score in self.snapshot.search(query_vector, self.k)
+        ]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self._documents(self.embeddings.embed_query(query))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> List[Document]:
+        return self._documents(await self.embeddings.aembed_query(query))
@@ -0,0 +1,163 @@
+"""
+Local BM25 index over the book chunks, plus a hybrid lexical/vector retriever.
+
+Keyword-style questions ("magnesium", an ingredient) can be answered from the
+inverted index in microseconds, without the embedding round-trip that every
+Chroma search needs. HybridRetriever can answer purely lexically, purely from
+the vectorstore, or fuse both rankings with reciprocal rank fusion.
+"""
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHUNKS_PATH = os.path.join(BASE_DIR, "data", "processed", "chunks_AlisaVita.json")
+LEXICAL_INDEX_PATH = os.path.join(BASE_DIR, "data", "vectorstore", "bm25_index.json")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOP_WORDS = frozenset("""
+a about after all also am an and any are as at be because been before being but by can could did do does
+doing during each for from had has have having he her here hers him his how i if in into is it its just
+me more most my no nor not of off on once only or other our out over own same she should so some such
+than that the their them then there these they this those through to too under until up very was we were
+what when where which while who whom why will with would you your
+""".split())
+
+RETRIEVAL_LEXICAL = "lexical"
+RETRIEVAL_VECTOR = "vector"
+RETRIEVAL_HYBRID = "hybrid"
+RETRIEVAL_AUTO = "auto"
+RETRIEVAL_MODES = (RETRIEVAL_LEXICAL, RETRIEVAL_VECTOR, RETRIEVAL_HYBRID, RETRIEVAL_AUTO)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of term -> [(doc id, term frequency)]."""
+
+    def __init__(self, texts: List[str], postings: dict, doc_lengths: List[int], k1: float = 1.5, b: float = 0.75):
+        self.texts = texts
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+        n_docs = len(texts)
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in postings.items()
+        }
+
+    def __len__(self):
+        return len(self.texts)
+
+    @classmethod
+    def build(cls, texts: List[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        postings = {}
+        doc_lengths = []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc_id, tf))
+        return cls(texts, postings, doc_lengths, k1, b)
+
+    def save(self, path: str = LEXICAL_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "texts": self.texts,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        postings = {term: [tuple(p) for p in docs] for term, docs in data["postings"].items()}
+        return cls(data["texts"], postings, data["doc_lengths"], data["k1"], data["b"])
+
+    def search(self, query: str, k: int = 4):
+        """Top-k (doc id, score) pairs, best first."""
+        scores = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in docs:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def documents(self, query: str, k: int = 4) -> List[Document]:
+        return [
+            Document(page_content=self.texts[doc_id], metadata={"source": "AlisaVita", "bm25_score": score})
+            for doc_id, score in self.search(query, k)
+        ]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """Fuse several ranked document lists; documents are matched on page_content."""
+    scores = {}
+    by_content = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            scores[doc.page_content] = scores.get(doc.page_content, 0.0) + 1.0 / (rrf_k + rank + 1)
+            by_content.setdefault(doc.page_content, doc)
+    best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+    return [by_content[content] for content, _ in best]
+
+
+def is_keyword_query(query: str, max_terms: int = 3) -> bool:
+    """Short keyword-style queries ("magnesium", "seed cycling") are served lexically in auto mode."""
+    terms = tokenize(query)
+    return 0 < len(terms) <= max_terms
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever over the book chunks that answers lexically, from vectors, or both fused."""
+
+    lexical_index: BM25Index
+    vector_retriever: Optional[BaseRetriever] = None
+    mode: str = RETRIEVAL_HYBRID
+    k: int = 4
+
+    def _use_vectors(self, query: str) -> bool:
+        if self.vector_retriever is None or self.mode == RETRIEVAL_LEXICAL:
+            return False
+        if self.mode == RETRIEVAL_AUTO:
+            return not is_keyword_query(query)
+        return True
+
+    def _fuse(self, lexical_docs, vector_docs):
+        if self.mode == RETRIEVAL_VECTOR:
+            return vector_docs[:self.k]
+        return reciprocal_rank_fusion([lexical_docs, vector_docs], self.k)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        lexical_docs = self.lexical_index.documents(query, self.k)
+        if not self._use_vectors(query):
+            return lexical_docs
+        vector_docs = self.vector_retriever.invoke(query)
+        return self._fuse(lexical_docs, vector_docs)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> List[Document]:
+        lexical_docs = self.lexical_index.documents(query, self.k)
+        if not self._use_vectors(query):
+            return lexical_docs
+        vector_docs = await self.vector_retriever.ainvoke(query)
+        return self._fuse(lexical_docs, vector_docs)
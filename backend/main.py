@@ -1,18 +1,20 @@
 # python main.py
-from fastapi import FastAPI, Depends, HTTPException, status, Request, Body, Path, Query
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Body, Path, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, conint
 from typing import List, Optional
-import pandas as pd
-from rag_pipeline import get_strategies, get_advice, generate_advice
+import asyncio
 import os
+import json
 import urllib.parse
-from models import create_db_and_tables
-from db import SessionLocal
 import bcrypt
 from jose import jwt
 from datetime import datetime, timedelta, date
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+from chat_context import build_user_profile, trim_history, count_tokens, prompt_token_stats, chat_stage_stats, server_timing
+from user_cache import user_cache
 from datetime import datetime as dt
 
 app = FastAPI(
@@ -21,23 +23,101 @@ app = FastAPI(
     version="1.0.0"
 )
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database tables on startup"""
-    print("🚀 Starting HerFoodCode API...")
-    
-    # Test database connection
-    from db import test_supabase_connection, supabase_connected
-    print(f"📊 Database connection status: {'✅ Supabase' if supabase_connected else '⚠️ SQLite fallback'}")
-    
+# Heavy resources (pandas, LangChain + the vectorstores, the Supabase check) are
+# loaded by a background task after startup, so the process accepts connections
+# and answers liveness probes immediately. Endpoints await the resource they need.
+STRATEGIES_FILE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'strategies.csv')
+
+def _load_strategies():
+    import pandas as pd
+    strategies_df = pd.read_csv(STRATEGIES_FILE_PATH, sep=';')
+    strategies_df.fillna('', inplace=True)
+    # Strategy details by name, for joining many recommendation lists without filtering the DataFrame each time
+    strategy_records_by_name = strategies_df.drop_duplicates('Strategie naam').set_index('Strategie naam').to_dict(orient='index')
+    print(f"[STARTUP] Loaded {len(strategies_df)} strategies from {STRATEGIES_FILE_PATH}")
+    return strategies_df, strategy_records_by_name
+
+def _load_rag_pipeline():
+    import rag_pipeline
+    return rag_pipeline
+
+def _init_database():
+    from models import create_db_and_tables
     try:
         create_db_and_tables()
         print("✅ Database initialization completed")
     except Exception as e:
         print(f"⚠️ Warning: Could not create database tables: {e}")
         print("Application will continue without database initialization")
-    
-    print("🎉 HerFoodCode API startup complete!")
+    from db import supabase_connected
+    print(f"📊 Database connection status: {'✅ Supabase' if supabase_connected else '⚠️ SQLite fallback'}")
+    return supabase_connected
+
+RESOURCE_LOADERS = {
+    "strategies": _load_strategies,
+    "rag_pipeline": _load_rag_pipeline,
+    "database": _init_database,
+}
+_resource_tasks = {}
+# The background warm-up task; the event loop only keeps a weak reference to it
+_warm_up_task = None
+
+def _warm(name: str) -> asyncio.Future:
+    task = _resource_tasks.get(name)
+    # A failed load is retried by the next caller
+    if task is None or (task.done() and not task.cancelled() and task.exception() is not None):
+        task = _resource_tasks[name] = asyncio.ensure_future(run_in_threadpool(RESOURCE_LOADERS[name]))
+    return task
+
+async def load_resource(name: str):
+    """Wait for a background-loaded resource, starting the load if it hasn't started yet."""
+    return await asyncio.shield(_warm(name))
+
+async def get_rag():
+    return await load_resource("rag_pipeline")
+
+async def get_strategies_df():
+    return (await load_resource("strategies"))[0]
+
+async def get_strategy_records_by_name():
+    return (await load_resource("strategies"))[1]
+
+def resource_status() -> dict:
+    states = {}
+    for name in RESOURCE_LOADERS:
+        task = _resource_tasks.get(name)
+        if task is None or not task.done():
+            states[name] = "loading" if task is not None else "pending"
+        elif task.cancelled() or task.exception() is not None:
+            states[name] = "failed"
+        else:
+            states[name] = "ready"
+    return states
+
+async def _warm_up():
+    # One at a time: parallel imports of overlapping packages only contend for the GIL
+    started = datetime.utcnow()
+    for name in RESOURCE_LOADERS:
+        try:
+            await _warm(name)
+        except Exception as e:
+            print(f"⚠️ Warning: could not load {name}: {e}")
+    print(f"🎉 HerFoodCode API warm-up complete in {(datetime.utcnow() - started).total_seconds():.1f}s")
+
+@app.on_event("startup")
+async def startup_event():
+    """Start loading the strategies, RAG pipeline and database in the background"""
+    global _warm_up_task
+    print("🚀 Starting HerFoodCode API...")
+    _warm_up_task = asyncio.ensure_future(_warm_up())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the warm-up if it is still running and close the pooled database connections"""
+    if _warm_up_task is not None and not _warm_up_task.done():
+        _warm_up_task.cancel()
+    from async_db import close_postgrest
+    await close_postgrest()
 
 @app.get("/")
 async def root():
@@ -50,10 +130,30 @@ async def root():
     }
 
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
-    """Health check endpoint for container orchestration"""
+    """Liveness: the process is up and serving; doesn't wait for the background warm-up"""
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 200 once the strategies, RAG pipeline and database are loaded, 503 before"""
+    components = resource_status()
+    ready = all(state == "ready" for state in components.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "components": components, "timestamp": datetime.utcnow().isoformat()}
+    )
+
+@app.get("/api/v1/metrics")
+async def metrics():
+    """RAG pipeline counters (semantic cache hits/misses, prompt token counts etc.)"""
+    rag_metrics = (await get_rag()).get_metrics() if resource_status()["rag_pipeline"] == "ready" else {}
+    return {
+        "metrics": {**rag_metrics, "prompt_tokens": prompt_token_stats.stats(), "chat_stages": chat_stage_stats.stats(), "user_cache": user_cache.stats()},
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 @app.get("/api/v1/test-db")
 async def test_database():
     """Test database tables and connections"""
@@ -106,16 +206,9 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")  # Change this in production!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 1 week
-
-# Load strategies from the correct CSV
-STRATEGIES_FILE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'strategies.csv')
-print("[DEBUG] Absolute path to strategies.csv:", os.path.abspath(STRATEGIES_FILE_PATH))
-print("[DEBUG] strategies.csv exists:", os.path.exists(STRATEGIES_FILE_PATH))
-strategies_df = pd.read_csv(STRATEGIES_FILE_PATH, sep=';')
-print("[DEBUG] Loaded strategies.csv shape:", strategies_df.shape)
-print("[DEBUG] Loaded strategies.csv columns:", strategies_df.columns)
-print("[DEBUG] First row of strategies.csv:", strategies_df.head(1))
-strategies_df.fillna('', inplace=True)
+# /api/v1/strategies/batch is unauthenticated: bound the embedding work one request can cause
+STRATEGY_BATCH_MAX_PROFILES = int(os.getenv("STRATEGY_BATCH_MAX_PROFILES", "100"))
+STRATEGY_BATCH_MAX_TOP_K = 10
 
 # Dependency to get Supabase client
 def get_supabase():
@@ -129,6 +222,10 @@ class IntakeData(BaseModel):
     preferences: Optional[List[str]] = None
     goals: Optional[List[str]] = None
 
+class IntakeBatch(BaseModel):
+    profiles: List[IntakeData] = Field(..., max_length=STRATEGY_BATCH_MAX_PROFILES)
+    top_k: conint(ge=1, le=STRATEGY_BATCH_MAX_TOP_K) = 3
+
 class UserCreate(BaseModel):
     email: str
     password: str
@@ -151,37 +248,59 @@ class TrialPeriodCreate(BaseModel):
 
 security = HTTPBearer()
 
-# Make get_current_user async and use Supabase
-async def get_current_user(request: Request, supabase_client = Depends(get_supabase)):
+def create_access_token(db_user: dict) -> str:
+    # `uid` lets endpoints that only need the user id skip the user lookup
+    return jwt.encode({
+        "sub": db_user['email'],
+        "uid": db_user['id'],
+        "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    }, SECRET_KEY, algorithm=ALGORITHM)
+
+async def get_token_claims(request: Request):
+    """Return (token, payload) of a valid bearer token; raises 401 otherwise."""
     auth: HTTPAuthorizationCredentials = await security(request)
     token = auth.credentials
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get('sub')
-        if not email:
-            raise HTTPException(status_code=401, detail='Invalid token')
-        
-        # Use Supabase to get user
-        from db import SupabaseDB
-        user = SupabaseDB.get_user_by_email(email)
-        if not user:
-            raise HTTPException(status_code=404, detail='User not found')
+    except Exception:
+        raise HTTPException(status_code=401, detail='Invalid token')
+    if not payload.get('sub'):
+        raise HTTPException(status_code=401, detail='Invalid token')
+    return token, payload
+
+# Make get_current_user async and use Supabase
+async def get_current_user(request: Request, supabase_client = Depends(get_supabase)):
+    token, payload = await get_token_claims(request)
+    email = payload['sub']
+    # The user row is cached per token for a short TTL (see user_cache)
+    user = user_cache.get(email, token)
+    if user is not None:
         return user
+    try:
+        from async_db import AsyncSupabaseDB
+        user = await AsyncSupabaseDB.get_user_by_email(email)
     except Exception:
         raise HTTPException(status_code=401, detail='Invalid token')
+    if not user:
+        raise HTTPException(status_code=401, detail='Invalid token')
+    user_cache.put(email, token, user, payload.get('exp'))
+    return user
 
-# Update all endpoints that use get_current_user to be async
-def sync_to_async(f):
-    import functools
-    async def wrapper(*args, **kwargs):
-        return f(*args, **kwargs)
-    return functools.wraps(f)(wrapper)
+async def get_current_user_id(request: Request) -> int:
+    """Claims-only auth for endpoints that only need the user id: no user lookup.
+    Tokens issued before the `uid` claim existed fall back to get_current_user."""
+    _, payload = await get_token_claims(request)
+    if payload.get('uid') is not None:
+        return payload['uid']
+    return (await get_current_user(request))['id']
 
 @app.post("/api/v1/strategies")
 async def strategies(intake_data: IntakeData):
     print("[DEBUG] Received intake data:", intake_data.dict())
     # 1. Get the list of recommended strategy metadata from the RAG pipeline
-    recommended_metadata = get_strategies(intake_data.dict())
+    rag = await get_rag()
+    strategies_df = await get_strategies_df()
+    recommended_metadata = await rag.aget_strategies(intake_data.dict())
     print("[DEBUG] Recommended metadata:", recommended_metadata)
     # 2. Extract just the names of the strategies
     recommended_names = [meta['strategy_name'] for meta in recommended_metadata]
@@ -198,10 +317,26 @@ async def strategies(intake_data: IntakeData):
 
     return {"strategies": ordered_recommendations.to_dict(orient='records')}
 
+@app.post("/api/v1/strategies/batch")
+async def strategies_batch(batch: IntakeBatch):
+    """Recommendations for many intake profiles in one call (onboarding imports, A/B experiments)."""
+    rag = await get_rag()
+    strategy_records_by_name = await get_strategy_records_by_name()
+    recommended = await rag.aget_strategies_batch([profile.dict() for profile in batch.profiles], k=batch.top_k)
+    results = []
+    for metadata_list in recommended:
+        results.append([
+            {'Strategie naam': meta['strategy_name'], **strategy_records_by_name[meta['strategy_name']]}
+            for meta in metadata_list
+            if meta['strategy_name'] in strategy_records_by_name
+        ])
+    return {"results": results}
+
 @app.get("/api/v1/strategies/{strategy_name:path}")
 async def get_strategy_details(strategy_name: str):
     #Retrieves all details for a specific strategy by its name.
     decoded_name = urllib.parse.unquote(strategy_name)
+    strategies_df = await get_strategies_df()
     strategy_details = strategies_df[strategies_df['Strategie naam'] == decoded_name]
     if not strategy_details.empty:
         return strategy_details.to_dict(orient='records')[0]
@@ -210,32 +345,31 @@ async def get_strategy_details(strategy_name: str):
 @app.post("/api/v1/advice")
 async def advice(intake_data: IntakeData):
     #Receives user intake data and returns general advice from the RAG pipeline.
-    response = get_advice(intake_data.dict())
+    rag = await get_rag()
+    response = await rag.aget_advice(intake_data.dict())
     return response
 
 @app.post("/api/v1/register", response_model=Token)
-def register(user: UserCreate):
+async def register(user: UserCreate):
     try:
-        from db import SupabaseDB
+        from async_db import AsyncSupabaseDB
         
         # Check if user already exists
-        existing = SupabaseDB.get_user_by_email(user.email)
+        existing = await AsyncSupabaseDB.get_user_by_email(user.email)
         if existing:
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Hash password
-        hashed_pw = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt())
+        # bcrypt is deliberately slow; keep it off the event loop
+        hashed_pw = await run_in_threadpool(bcrypt.hashpw, user.password.encode('utf-8'), bcrypt.gensalt())
         
         # Create user in Supabase
-        db_user = SupabaseDB.create_user(user.email, hashed_pw.decode('utf-8'))
+        db_user = await AsyncSupabaseDB.create_user(user.email, hashed_pw.decode('utf-8'))
         if not db_user:
             raise HTTPException(status_code=500, detail="Failed to create user")
         
         # Create JWT
-        access_token = jwt.encode({
-            "sub": db_user['email'],
-            "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        }, SECRET_KEY, algorithm=ALGORITHM)
+        access_token = create_access_token(db_user)
         return {"access_token": access_token, "token_type": "bearer"}
     except Exception as e:
         print(f"Registration error: {str(e)}")
@@ -249,19 +383,16 @@ def register(user: UserCreate):
         )
 
 @app.post("/api/v1/login", response_model=Token)
-def login(user: UserLogin):
+async def login(user: UserLogin):
     try:
-        from db import SupabaseDB
+        from async_db import AsyncSupabaseDB
         
         # Get user from Supabase
-        db_user = SupabaseDB.get_user_by_email(user.email)
-        if not db_user or not bcrypt.checkpw(user.password.encode('utf-8'), db_user['hashed_password'].encode('utf-8')):
+        db_user = await AsyncSupabaseDB.get_user_by_email(user.email)
+        if not db_user or not await run_in_threadpool(bcrypt.checkpw, user.password.encode('utf-8'), db_user['hashed_password'].encode('utf-8')):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        access_token = jwt.encode({
-            "sub": db_user['email'],
-            "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        }, SECRET_KEY, algorithm=ALGORITHM)
+        access_token = create_access_token(db_user)
         return {"access_token": access_token, "token_type": "bearer"}
     except Exception as e:
         print(f"Login error: {str(e)}")
@@ -276,25 +407,26 @@ def login(user: UserLogin):
 
 @app.delete('/api/v1/delete_account')
 async def delete_account(request: Request):
-    user = await get_current_user(request)
-    from db import SupabaseDB
+    user_id = await get_current_user_id(request)
+    from async_db import AsyncSupabaseDB
     # Note: SupabaseDB.delete_user method needs to be implemented
     # For now, we'll return success (user deletion can be implemented later)
+    user_cache.invalidate(user_id=user_id)
     return {"detail": "Account deletion requested"}
 
 @app.post('/api/v1/set_strategy')
 async def set_strategy(request: Request, data: dict = Body(...)):
-    user = await get_current_user(request)
+    user_id = await get_current_user_id(request)
     strategy_name = data.get('strategy_name')
     trial_period = data.get('trial_period')  # Optional trial period data
     
     if not strategy_name:
         raise HTTPException(status_code=400, detail='No strategy_name provided')
     
-    from db import SupabaseDB
+    from async_db import AsyncSupabaseDB
     
     # Update current strategy
-    SupabaseDB.update_user_strategy(user['id'], strategy_name)
+    await AsyncSupabaseDB.update_user_strategy(user_id, strategy_name)
     
     # If trial period data is provided, create a new trial period
     if trial_period:
@@ -303,118 +435,121 @@ async def set_strategy(request: Request, data: dict = Body(...)):
             end_date = trial_period['end_date']
             
             # Create new trial period
-            SupabaseDB.create_trial_period(user['id'], strategy_name, start_date, end_date)
+            await AsyncSupabaseDB.create_trial_period(user_id, strategy_name, start_date, end_date)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f'Invalid trial period data: {str(e)}')
     
     return {"detail": "Strategy updated"}
 
+async def load_chat_context(request: Request):
+    """Return (user, context) for a chat turn: the user row plus symptoms, logs and
+    chat history, fetched concurrently instead of one round trip after another."""
+    from async_db import AsyncSupabaseDB
+
+    _, payload = await get_token_claims(request)
+    if payload.get('uid') is None:
+        # Tokens issued before the `uid` claim need the user row first
+        user = await get_current_user(request)
+        return user, await AsyncSupabaseDB.get_chat_context(user['id'])
+    user, context = await asyncio.gather(get_current_user(request), AsyncSupabaseDB.get_chat_context(payload['uid']))
+    return user, context
+
+async def build_chat_context(user: dict, context: dict):
+    """Build the prompt context of a chat turn from load_chat_context's data.
+
+    Returns (user_profile_context, history, profile_fields): history is a list of
+    (sender, text) pairs and profile_fields are the answer-relevant fields the
+    semantic answer cache keys on.
+    """
+    # 1. Tracked symptoms and logs
+    symptom_names = [s['symptom'] for s in context['symptoms']]
+    logs = context['logs']
+    print(f"[DEBUG] Retrieved {len(symptom_names)} symptoms, {len(logs)} logs")
+    
+    # 2. Retrieve current strategy details
+    strategy_details = None
+    if user.get('current_strategy'):
+        try:
+            strategies_df = await get_strategies_df()
+            details = strategies_df[strategies_df['Strategie naam'] == user['current_strategy']]
+            if not details.empty:
+                strategy_details = details.to_dict(orient='records')[0]
+            print(f"[DEBUG] Retrieved strategy details: {strategy_details is not None}")
+        except Exception as e:
+            print(f"[ERROR] Failed to get strategy details: {e}")
+    
+    # 3. Build user profile context (logs compacted to trends, within the token budget)
+    user_profile_context = build_user_profile(user, symptom_names, strategy_details, logs)
+    
+    # 4. Chat history: messages come back newest first; the condense step expects chronological order
+    history = [(msg['sender'], msg['text']) for msg in reversed(context['messages'])]
+    print(f"[DEBUG] Retrieved {len(history)} chat messages")
+
+    # 5. Keep only the most recent messages that fit the history token budget
+    trimmed_history, history_tokens = trim_history(history)
+    prompt_token_stats.record(count_tokens(user_profile_context), history_tokens, len(history) - len(trimmed_history))
+    history = trimmed_history
+
+    profile_fields = {
+        'user_id': user['id'],
+        'symptoms': symptom_names,
+        'current_strategy': user.get('current_strategy'),
+    }
+    return user_profile_context, history, profile_fields
+
 @app.post('/api/v1/chat')
-async def chat(request: Request, data: ChatRequest):
+async def chat(request: Request, data: ChatRequest, response: Response):
+    timings = {}
     try:
-        user = await get_current_user(request)
-        from db import SupabaseDB
+        from async_db import AsyncSupabaseDB, CHAT_MESSAGES_LIMIT
         
+        # 1. User, symptoms, logs and chat history in one round-trip time
+        with chat_stage_stats.stage(timings, 'context'):
+            user, context = await load_chat_context(request)
         print(f"[DEBUG] Chat request from user: {user['email']}")
         
-        # 1. Retrieve symptoms
-        try:
-            symptoms = SupabaseDB.get_user_symptoms(user['id'])
-            symptom_names = [s['symptom'] for s in symptoms]
-            print(f"[DEBUG] Retrieved {len(symptom_names)} symptoms")
-        except Exception as e:
-            print(f"[ERROR] Failed to get symptoms: {e}")
-            symptom_names = []
-        
-        # 2. Retrieve all logs
-        try:
-            logs = SupabaseDB.get_user_logs(user['id'])
-            logs_summary = []
-            for log in logs:
-                logs_summary.append({
-                    'date': log['date'],
-                    'applied_strategy': log['applied_strategy'],
-                    'energy': log['energy'],
-                    'mood': log['mood'],
-                    'symptom_scores': log['symptom_scores'],
-                    'extra_symptoms': log['extra_symptoms'],
-                    'extra_notes': log['extra_notes']
-                })
-            print(f"[DEBUG] Retrieved {len(logs_summary)} logs")
-        except Exception as e:
-            print(f"[ERROR] Failed to get logs: {e}")
-            logs_summary = []
+        # 2. Profile context and token-budgeted chat history
+        with chat_stage_stats.stage(timings, 'prompt'):
+            user_profile_context, history, profile_fields = await build_chat_context(user, context)
+
+        # 3. Store the user message while the LLM answers
+        user_message_task = asyncio.create_task(AsyncSupabaseDB.create_chat_message(user['id'], 'user', data.question))
         
-        # 3. Retrieve current strategy details
-        strategy_details = None
-        if user.get('current_strategy'):
+        # 4. Call RAG LLM with user profile context, chat history, and question
+        with chat_stage_stats.stage(timings, 'llm'):
             try:
-                details = strategies_df[strategies_df['Strategie naam'] == user['current_strategy']]
-                if not details.empty:
-                    strategy_details = details.to_dict(orient='records')[0]
-                print(f"[DEBUG] Retrieved strategy details: {strategy_details is not None}")
+                rag_input = {
+                    'user_profile': user_profile_context,
+                    'chat_history': history,
+                    'question': data.question,
+                    'profile_fields': profile_fields
+                }
+                rag = await get_rag()
+                result = await rag.agenerate_advice(rag_input)
+                # agenerate_advice always returns a dict with 'answer' key
+                answer = result['answer']
+                print(f"[DEBUG] Generated RAG response: {len(answer)} characters")
             except Exception as e:
-                print(f"[ERROR] Failed to get strategy details: {e}")
-        
-        # 4. Build user profile context
-        user_profile_context = f"""
-User Profile:
-- Email: {user['email']}
-- Symptoms: {', '.join(symptom_names) if symptom_names else 'None'}
-- Goals: {user.get('goals', 'None')}
-- Current Strategy: {user.get('current_strategy', 'None')}
-- Strategy Details: {strategy_details if strategy_details else 'None'}
-- Progress/Logs: {logs_summary if logs_summary else 'None'}
-"""
-        
-        # 5. Retrieve chat history
-        try:
-            chat_history = SupabaseDB.get_chat_messages(user['id'])
-            history = [(msg['sender'], msg['text']) for msg in chat_history]
-            print(f"[DEBUG] Retrieved {len(history)} chat messages")
-        except Exception as e:
-            print(f"[ERROR] Failed to get chat history: {e}")
-            history = []
+                print(f"[ERROR] Failed to generate RAG response: {e}")
+                import traceback
+                traceback.print_exc()
+                answer = "Sorry, I'm having trouble processing your request right now. Please try again later."
         
-        # 6. Append new user message
-        try:
-            SupabaseDB.create_chat_message(user['id'], 'user', data.question)
-            print(f"[DEBUG] Created user message")
-        except Exception as e:
-            print(f"[ERROR] Failed to create user message: {e}")
-        
-        # 7. Call RAG LLM with user profile context, chat history, and question
-        try:
-            rag_input = {
-                'user_profile': user_profile_context,
-                'chat_history': history,
-                'question': data.question
-            }
-            result = generate_advice(rag_input)
-            # generate_advice always returns a dict with 'answer' key
-            answer = result['answer']
-            print(f"[DEBUG] Generated RAG response: {len(answer)} characters")
-        except Exception as e:
-            print(f"[ERROR] Failed to generate RAG response: {e}")
-            import traceback
-            traceback.print_exc()
-            answer = "Sorry, I'm having trouble processing your request right now. Please try again later."
+        # 5. Store bot response, after the user message so their timestamps stay in order
+        with chat_stage_stats.stage(timings, 'store'):
+            user_message = await user_message_task
+            bot_message = await AsyncSupabaseDB.create_chat_message(user['id'], 'bot', answer)
         
-        # 8. Store bot response
-        try:
-            SupabaseDB.create_chat_message(user['id'], 'bot', answer)
-            print(f"[DEBUG] Created bot message")
-        except Exception as e:
-            print(f"[ERROR] Failed to create bot message: {e}")
-        
-        # 9. Return updated chat history
-        try:
-            updated_history = SupabaseDB.get_chat_messages(user['id'])
-            return {'history': [{'sender': m['sender'], 'text': m['text'], 'timestamp': m['timestamp']} for m in updated_history]}
-        except Exception as e:
-            print(f"[ERROR] Failed to get updated chat history: {e}")
-            return {'history': [{'sender': 'user', 'text': data.question, 'timestamp': datetime.utcnow().isoformat()},
-                               {'sender': 'bot', 'text': answer, 'timestamp': datetime.utcnow().isoformat()}]}
+        # 6. Return updated chat history: the stored messages on top of the history already loaded, no re-read
+        now = datetime.utcnow().isoformat()
+        new_messages = [
+            bot_message or {'sender': 'bot', 'text': answer, 'timestamp': now},
+            user_message or {'sender': 'user', 'text': data.question, 'timestamp': now},
+        ]
+        updated_history = (new_messages + context['messages'])[:CHAT_MESSAGES_LIMIT]
+        chat_stage_stats.record(timings)
+        response.headers['Server-Timing'] = server_timing(timings)
+        return {'history': [{'sender': m['sender'], 'text': m['text'], 'timestamp': m['timestamp']} for m in updated_history]}
     
     except Exception as e:
         print(f"[ERROR] Chat endpoint failed: {e}")
@@ -422,12 +557,73 @@ User Profile:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """One server-sent event: an optional `event:` line, a JSON `data:` line and a blank line."""
+    return (f"event: {event}\n" if event else "") + f"data: {json.dumps(data)}\n\n"
+
+@app.post('/api/v1/chat/stream')
+async def chat_stream(request: Request, data: ChatRequest):
+    """Server-sent-events variant of /api/v1/chat.
+
+    Emits one `data: {"token": ...}` event per LLM token, then a final `event: done`
+    carrying the full answer once the bot message has been stored. If the answer
+    fails partway, the done event (and the stored bot message) carry only the
+    error fallback, not the truncated answer.
+    """
+    from async_db import AsyncSupabaseDB
+
+    timings = {}
+    with chat_stage_stats.stage(timings, 'context'):
+        user, context = await load_chat_context(request)
+    print(f"[DEBUG] Streaming chat request from user: {user['email']}")
+
+    with chat_stage_stats.stage(timings, 'prompt'):
+        user_profile_context, history, profile_fields = await build_chat_context(user, context)
+
+    # Stored while the answer streams
+    user_message_task = asyncio.create_task(AsyncSupabaseDB.create_chat_message(user['id'], 'user', data.question))
+
+    rag_input = {
+        'user_profile': user_profile_context,
+        'chat_history': history,
+        'question': data.question,
+        'profile_fields': profile_fields
+    }
+    rag = await get_rag()
+
+    async def event_stream():
+        tokens = []
+        failed = False
+        with chat_stage_stats.stage(timings, 'llm'):
+            async for token in rag.astream_advice(rag_input):
+                if token == rag.PROCESSING_ERROR:
+                    # The stream failed partway: keep only the fallback, never a truncated answer
+                    failed = True
+                    break
+                tokens.append(token)
+                yield sse_event({'token': token})
+
+        answer = rag.PROCESSING_ERROR if failed else "".join(tokens)
+        with chat_stage_stats.stage(timings, 'store'):
+            await user_message_task
+            bot_message = await AsyncSupabaseDB.create_chat_message(user['id'], 'bot', answer)
+        chat_stage_stats.record(timings)
+        timestamp = bot_message['timestamp'] if bot_message else datetime.utcnow().isoformat()
+        # The final answer replaces whatever tokens the client has shown
+        yield sse_event({'answer': answer, 'timestamp': timestamp}, event='done')
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- Trial Period Endpoints ---
 @app.get('/api/v1/trial_periods')
 async def get_trial_periods(request: Request):
-    user = await get_current_user(request)
-    from db import SupabaseDB
-    trials = SupabaseDB.get_user_trial_periods(user['id'])
+    user_id = await get_current_user_id(request)
+    from async_db import AsyncSupabaseDB
+    trials = await AsyncSupabaseDB.get_user_trial_periods(user_id)
     return [
         {
             "id": trial['id'],
@@ -442,7 +638,7 @@ async def get_trial_periods(request: Request):
 
 @app.post('/api/v1/trial_periods')
 async def create_trial_period(request: Request, trial_data: TrialPeriodCreate):
-    user = await get_current_user(request)
+    user_id = await get_current_user_id(request)
     
     try:
         start_date = trial_data.start_date
@@ -453,10 +649,10 @@ async def create_trial_period(request: Request, trial_data: TrialPeriodCreate):
     if start_date >= end_date:
         raise HTTPException(status_code=400, detail="End date must be after start date.")
     
-    from db import SupabaseDB
+    from async_db import AsyncSupabaseDB
     
     # Create new trial period
-    new_trial = SupabaseDB.create_trial_period(user['id'], trial_data.strategy_name, start_date, end_date)
+    new_trial = await AsyncSupabaseDB.create_trial_period(user_id, trial_data.strategy_name, start_date, end_date)
     if not new_trial:
         raise HTTPException(status_code=500, detail="Failed to create trial period")
     
@@ -471,36 +667,36 @@ async def create_trial_period(request: Request, trial_data: TrialPeriodCreate):
 # --- Tracked Symptoms Endpoints ---
 @app.get('/api/v1/symptoms')
 async def get_symptoms(request: Request):
-    user = await get_current_user(request)
-    from db import SupabaseDB
-    symptoms = SupabaseDB.get_user_symptoms(user['id'])
+    user_id = await get_current_user_id(request)
+    from async_db import AsyncSupabaseDB
+    symptoms = await AsyncSupabaseDB.get_user_symptoms(user_id)
     return [s['symptom'] for s in symptoms]
 
 @app.post('/api/v1/symptoms')
 async def set_symptoms(request: Request, symptoms: list[str] = Body(...)):
-    user = await get_current_user(request)
-    from db import SupabaseDB
+    user_id = await get_current_user_id(request)
+    from async_db import AsyncSupabaseDB
     
     # Clear existing symptoms and add new ones
     for i, symptom in enumerate(symptoms):
-        SupabaseDB.create_tracked_symptom(user['id'], symptom, i)
+        await AsyncSupabaseDB.create_tracked_symptom(user_id, symptom, i)
     
     return {"success": True}
 
 # --- Daily Log Endpoints ---
 @app.get('/api/v1/logs/today')
 async def get_today_log(request: Request):
-    user = await get_current_user(request)
-    from db import SupabaseDB
+    user_id = await get_current_user_id(request)
+    from async_db import AsyncSupabaseDB
     today = date.today().isoformat()
-    logs = SupabaseDB.get_user_logs(user['id'])
+    logs = await AsyncSupabaseDB.get_user_logs(user_id)
     today_log = next((log for log in logs if log['date'] == today), None)
     return today_log
 
 @app.post('/api/v1/logs/today')
 async def upsert_today_log(request: Request, log_data: dict = Body(...)):
-    user = await get_current_user(request)
-    from db import SupabaseDB
+    user_id = await get_current_user_id(request)
+    from async_db import AsyncSupabaseDB
     today = date.today().isoformat()
     
     # Remove 'date' and 'strategy_name' from log_data to avoid duplicate/invalid argument errors
@@ -512,8 +708,8 @@ async def upsert_today_log(request: Request, log_data: dict = Body(...)):
         raise HTTPException(status_code=400, detail="applied_strategy is required and cannot be null.")
     
     # Create daily log
-    result = SupabaseDB.create_daily_log(
-        user['id'], 
+    result = await AsyncSupabaseDB.create_daily_log(
+        user_id, 
         today, 
         log_data['applied_strategy'],
         log_data.get('energy', 0),
@@ -531,8 +727,8 @@ async def upsert_today_log(request: Request, log_data: dict = Body(...)):
 # --- Edit a Past Log ---
 @app.patch('/api/v1/logs/{log_date}')
 async def edit_log(request: Request, log_date: str = Path(...), log_data: dict = Body(...)):
-    user = await get_current_user(request)
-    from db import SupabaseDB
+    user_id = await get_current_user_id(request)
+    from async_db import AsyncSupabaseDB
     
     try:
         # Validate date format
@@ -547,10 +743,10 @@ async def edit_log(request: Request, log_date: str = Path(...), log_data: dict =
 # --- Date Range Log Fetch ---
 @app.get('/api/v1/logs')
 async def get_logs_range(request: Request, start: Optional[str] = Query(None), end: Optional[str] = Query(None)):
-    user = await get_current_user(request)
-    from db import SupabaseDB
+    user_id = await get_current_user_id(request)
+    from async_db import AsyncSupabaseDB
     
-    logs = SupabaseDB.get_user_logs(user['id'])
+    logs = await AsyncSupabaseDB.get_user_logs(user_id)
     
     # Filter by date range if provided
     if start:
@@ -572,16 +768,17 @@ async def get_logs_range(request: Request, start: Optional[str] = Query(None), e
 @app.get('/api/v1/profile')
 async def get_profile(request: Request):
     user = await get_current_user(request)
-    from db import SupabaseDB
+    from async_db import AsyncSupabaseDB
     
     strategy_details = None
     if user.get('current_strategy'):
+        strategies_df = await get_strategies_df()
         details = strategies_df[strategies_df['Strategie naam'] == user['current_strategy']]
         if not details.empty:
             strategy_details = details.to_dict(orient='records')[0]
     
     # Get active trial period for debugging
-    trials = SupabaseDB.get_user_trial_periods(user['id'])
+    trials = await AsyncSupabaseDB.get_user_trial_periods(user['id'])
     active_trial = next((trial for trial in trials if trial['is_active']), None)
     
     return {
@@ -0,0 +1,119 @@
+"""
+Latency-aware model routing for chat and advice answers.
+
+Short factual follow-ups with little retrieved context don't need GPT-4. The
+router sends each request to the cheapest tier whose limits it fits, judged on
+question length, retrieved-context size (both in tokens) and conversation
+depth (prior messages). The last tier has no limits and takes everything else.
+
+Tiers, in order, are configured with env vars. Routing is opt-in: unless
+ROUTER_ENABLED=true, everything goes to the standard model (ROUTER_STANDARD_MODEL,
+which is also the main model when routing is off).
+"""
+import os
+import threading
+from collections import namedtuple
+from typing import List, Optional
+
+from chat_context import count_tokens
+
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "false").lower() == "true"
+ROUTER_FAST_MODEL = os.getenv("ROUTER_FAST_MODEL", "gpt-4o-mini")
+ROUTER_STANDARD_MODEL = os.getenv("ROUTER_STANDARD_MODEL", "gpt-4")
+ROUTER_FAST_MAX_QUESTION_TOKENS = int(os.getenv("ROUTER_FAST_MAX_QUESTION_TOKENS", "30"))
+ROUTER_FAST_MAX_CONTEXT_TOKENS = int(os.getenv("ROUTER_FAST_MAX_CONTEXT_TOKENS", "1200"))
+ROUTER_FAST_MAX_HISTORY_MESSAGES = int(os.getenv("ROUTER_FAST_MAX_HISTORY_MESSAGES", "6"))
+
+TIER_FAST = "fast"
+TIER_STANDARD = "standard"
+
+# The tier a request was sent to, and the sizes it was judged on
+Route = namedtuple("Route", ["tier", "question_tokens", "context_tokens", "history_messages"])
+
+
+class ModelTier:
+    """A model plus the largest request it should handle (None = no limit)."""
+
+    def __init__(self, name: str, llm, max_question_tokens: Optional[int] = None,
+                 max_context_tokens: Optional[int] = None, max_history_messages: Optional[int] = None):
+        self.name = name
+        self.llm = llm
+        self.max_question_tokens = max_question_tokens
+        self.max_context_tokens = max_context_tokens
+        self.max_history_messages = max_history_messages
+
+    def accepts(self, question_tokens: int, context_tokens: int, history_messages: int) -> bool:
+        return all(
+            limit is None or value <= limit
+            for value, limit in (
+                (question_tokens, self.max_question_tokens),
+                (context_tokens, self.max_context_tokens),
+                (history_messages, self.max_history_messages),
+            )
+        )
+
+
+class ModelRouter:
+    """Picks a tier per request and keeps per-tier latency and token counters."""
+
+    def __init__(self, tiers: List[ModelTier]):
+        if not tiers:
+            raise ValueError("ModelRouter needs at least one tier")
+        self.tiers = list(tiers)
+        self._lock = threading.Lock()
+        self._stats = {
+            tier.name: {"requests": 0, "total_seconds": 0.0, "max_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+            for tier in self.tiers
+        }
+
+    def route(self, question: str, context: str = "", history_messages: int = 0) -> Route:
+        question_tokens = count_tokens(question)
+        context_tokens = count_tokens(context) if context else 0
+        for tier in self.tiers[:-1]:
+            if tier.accepts(question_tokens, context_tokens, history_messages):
+                return Route(tier, question_tokens, context_tokens, history_messages)
+        return Route(self.tiers[-1], question_tokens, context_tokens, history_messages)
+
+    def route_documents(self, question: str, docs, history_messages: int = 0) -> Route:
+        return self.route(question, "\n\n".join(doc.page_content for doc in docs), history_messages)
+
+    def record(self, route: Route, seconds: float, answer: str, extra_prompt_tokens: int = 0):
+        """Count one finished request; completion tokens are counted from the answer text."""
+        completion_tokens = count_tokens(answer) if answer else 0
+        with self._lock:
+            stats = self._stats[route.tier.name]
+            stats["requests"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["prompt_tokens"] += route.question_tokens + route.context_tokens + extra_prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {}
+            for tier in self.tiers:
+                stats = self._stats[tier.name]
+                requests = stats["requests"] or 1
+                result[tier.name] = {
+                    "model": getattr(tier.llm, "model_name", None) or type(tier.llm).__name__,
+                    "requests": stats["requests"],
+                    "mean_ms": stats["total_seconds"] / requests * 1000 if stats["requests"] else 0.0,
+                    "max_ms": stats["max_seconds"] * 1000,
+                    "prompt_tokens": stats["prompt_tokens"],
+                    "completion_tokens": stats["completion_tokens"],
+                    "mean_prompt_tokens": stats["prompt_tokens"] / requests,
+                }
+            return result
+
+
+def default_tiers(fast_llm, standard_llm) -> List[ModelTier]:
+    """Fast tier with the ROUTER_FAST_* limits, then the standard model for everything else."""
+    return [
+        ModelTier(
+            TIER_FAST, fast_llm,
+            max_question_tokens=ROUTER_FAST_MAX_QUESTION_TOKENS,
+            max_context_tokens=ROUTER_FAST_MAX_CONTEXT_TOKENS,
+            max_history_messages=ROUTER_FAST_MAX_HISTORY_MESSAGES,
+        ),
+        ModelTier(TIER_STANDARD, standard_llm),
+    ]
@@ -2,7 +2,7 @@ from sqlalchemy import Column, Integer, String, Date, Boolean, ForeignKey, DateT
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
-from db import engine, supabase, supabase_connected
+import db
 
 Base = declarative_base()
 
@@ -56,9 +56,10 @@ class TrialPeriod(Base):
 
 def create_db_and_tables():
     """Create database tables - SQLite fallback only"""
-    if engine:
+    db.configure_database()
+    if db.engine:
         # Only create SQLAlchemy tables for SQLite fallback
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=db.engine)
         print("SQLite tables created successfully")
     else:
         # For Supabase, tables are managed through Supabase dashboard
@@ -0,0 +1,346 @@
+"""
+Admission control for outbound OpenAI calls.
+
+Every OpenAI request made by the app (chat, streaming, embeddings) and by the
+build scripts goes through one shared OpenAILimiter, installed as the httpx
+transport of the OpenAI clients:
+
+- token buckets for requests per minute and (estimated) tokens per minute
+- a bounded wait queue: callers that would wait too long, or find the queue
+  full, are rejected immediately instead of piling up
+- exponential backoff with jitter on 429 responses (honouring Retry-After),
+  and on the other failures the SDK used to retry: 408, 409, 5xx and
+  connection/timeout errors
+- a circuit breaker that fails fast after repeated upstream failures
+
+The OpenAI SDK's own retries are switched off (max_retries=0) so retries are
+only done here, within the rate budget.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import httpx
+
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "80000"))
+OPENAI_MAX_QUEUE = int(os.getenv("OPENAI_MAX_QUEUE", "64"))
+OPENAI_MAX_WAIT_SECONDS = float(os.getenv("OPENAI_MAX_WAIT_SECONDS", "10"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+OPENAI_BACKOFF_BASE_SECONDS = float(os.getenv("OPENAI_BACKOFF_BASE_SECONDS", "0.5"))
+OPENAI_BACKOFF_MAX_SECONDS = float(os.getenv("OPENAI_BACKOFF_MAX_SECONDS", "20"))
+OPENAI_BREAKER_FAILURES = int(os.getenv("OPENAI_BREAKER_FAILURES", "5"))
+OPENAI_BREAKER_RESET_SECONDS = float(os.getenv("OPENAI_BREAKER_RESET_SECONDS", "30"))
+# Completion tokens assumed for chat requests that don't set max_tokens
+COMPLETION_TOKEN_ESTIMATE = int(os.getenv("OPENAI_COMPLETION_TOKEN_ESTIMATE", "500"))
+
+
+# Statuses the OpenAI SDK retries besides 429 (and every 5xx)
+RETRY_STATUSES = (408, 409)
+
+
+class LimiterRejected(httpx.TransportError):
+    """The request was not sent: queue full, wait too long, or circuit open."""
+
+
+class CircuitOpenError(LimiterRejected):
+    pass
+
+
+class TokenBucket:
+    """Reservation-style token bucket: reserving may go negative, the deficit is the caller's wait."""
+
+    def __init__(self, per_minute: float, capacity: float = None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` tokens and return the seconds to wait before they are really available."""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def cancel(self, amount: float):
+        self.tokens += min(amount, self.capacity)
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures; half-open (one trial call) after the reset timeout."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = OPENAI_BREAKER_FAILURES, reset_seconds: float = OPENAI_BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            self.trial_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+        return self.state == self.CLOSED
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """Rough token cost of an OpenAI request from its JSON body (~4 characters per token)."""
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return COMPLETION_TOKEN_ESTIMATE
+    if "input" in body:  # embeddings
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return sum(len(text) if isinstance(text, str) else len(text or ()) for text in inputs) // 4 + 1
+    prompt_chars = sum(len(str(message.get("content") or "")) for message in body.get("messages", []))
+    return prompt_chars // 4 + (body.get("max_tokens") or COMPLETION_TOKEN_ESTIMATE)
+
+
+class OpenAILimiter:
+    """Shared rate limiter, wait queue, retry backoff and circuit breaker for OpenAI requests."""
+
+    def __init__(self, rpm: float = OPENAI_RPM, tpm: float = OPENAI_TPM, max_queue: int = OPENAI_MAX_QUEUE,
+                 max_wait_seconds: float = OPENAI_MAX_WAIT_SECONDS, max_retries: int = OPENAI_MAX_RETRIES,
+                 backoff_base: float = OPENAI_BACKOFF_BASE_SECONDS, backoff_max: float = OPENAI_BACKOFF_MAX_SECONDS,
+                 breaker: CircuitBreaker = None, clock=time.monotonic):
+        self.requests = TokenBucket(rpm, clock=clock)
+        self.tokens = TokenBucket(tpm, clock=clock)
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_wait_too_long = 0
+        self.rejected_circuit_open = 0
+        self.retries_429 = 0
+        self.retries_upstream_error = 0
+        self.upstream_failures = 0
+        self.total_wait_seconds = 0.0
+
+    def _admit(self, tokens: int) -> float:
+        """Reserve capacity for one request; returns the wait, or raises LimiterRejected."""
+        with self._lock:
+            if not self.breaker.allow():
+                self.rejected_circuit_open += 1
+                raise CircuitOpenError("OpenAI circuit breaker is open")
+            if self.queue_depth >= self.max_queue:
+                self.rejected_queue_full += 1
+                self._release_trial()
+                raise LimiterRejected(f"OpenAI wait queue is full ({self.max_queue})")
+            wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+            if wait > self.max_wait_seconds:
+                self.requests.cancel(1)
+                self.tokens.cancel(tokens)
+                self.rejected_wait_too_long += 1
+                self._release_trial()
+                raise LimiterRejected(f"OpenAI rate budget exhausted, wait would be {wait:.1f}s")
+            self.admitted += 1
+            self.total_wait_seconds += wait
+            if wait > 0:
+                self.queue_depth += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            return wait
+
+    def _release_trial(self):
+        """Let another call be the half-open trial; call with the lock held."""
+        if self.breaker.state == CircuitBreaker.HALF_OPEN:
+            self.breaker.trial_in_flight = False
+
+    def _dequeue(self, wait: float):
+        if wait > 0:
+            with self._lock:
+                self.queue_depth -= 1
+
+    @staticmethod
+    def _should_retry(response: httpx.Response) -> bool:
+        return response.status_code == 429 or response.status_code in RETRY_STATUSES or response.status_code >= 500
+
+    def _retried(self, response: httpx.Response = None):
+        """Count a retry; upstream errors (not 429s) also count against the circuit breaker."""
+        if response is not None and response.status_code == 429:
+            with self._lock:
+                self.retries_429 += 1
+                self._release_trial()
+            return
+        self._record(response)
+        with self._lock:
+            self.retries_upstream_error += 1
+
+    def _backoff(self, attempt: int, response: httpx.Response = None) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), self.backoff_max)
+        except ValueError:
+            pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _abandon(self):
+        """The attempt was cancelled before it got an answer; it counts neither way."""
+        with self._lock:
+            self._release_trial()
+
+    def _record(self, response: httpx.Response = None):
+        with self._lock:
+            if response is not None and response.status_code < 500 and response.status_code != 429:
+                self.breaker.record_success()
+            else:
+                self.upstream_failures += 1
+                self.breaker.record_failure()
+
+    def send(self, request: httpx.Request, send) -> httpx.Response:
+        """Send a request through the limiter with a blocking send(request) function."""
+        tokens = estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            wait = self._admit(tokens)
+            try:
+                try:
+                    if wait:
+                        time.sleep(wait)
+                finally:
+                    self._dequeue(wait)
+                response = send(request)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    self._record()
+                    raise
+                self._retried()
+                time.sleep(self._backoff(attempt))
+                continue
+            except Exception:
+                self._record()
+                raise
+            except BaseException:  # e.g. CancelledError when the client disconnects
+                self._abandon()
+                raise
+            if not self._should_retry(response) or attempt == self.max_retries:
+                self._record(response)
+                return response
+            response.close()
+            self._retried(response)
+            time.sleep(self._backoff(attempt, response))
+
+    async def asend(self, request: httpx.Request, send) -> httpx.Response:
+        """Async version of send, with an awaitable send(request)."""
+        tokens = estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            wait = self._admit(tokens)
+            try:
+                try:
+                    if wait:
+                        await asyncio.sleep(wait)
+                finally:
+                    self._dequeue(wait)
+                response = await send(request)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    self._record()
+                    raise
+                self._retried()
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except Exception:
+                self._record()
+                raise
+            except BaseException:  # e.g. CancelledError when the client disconnects
+                self._abandon()
+                raise
+            if not self._should_retry(response) or attempt == self.max_retries:
+                self._record(response)
+                return response
+            await response.aclose()
+            self._retried(response)
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "admitted": self.admitted,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_wait_too_long": self.rejected_wait_too_long,
+                "rejected_circuit_open": self.rejected_circuit_open,
+                "retries_429": self.retries_429,
+                "retries_upstream_error": self.retries_upstream_error,
+                "upstream_failures": self.upstream_failures,
+                "mean_wait_seconds": self.total_wait_seconds / self.admitted if self.admitted else 0.0,
+                "circuit_state": self.breaker.state,
+            }
+
+
+class LimitedTransport(httpx.HTTPTransport):
+    def __init__(self, limiter: OpenAILimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.limiter.send(request, super().handle_request)
+
+
+class AsyncLimitedTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, limiter: OpenAILimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.limiter.asend(request, super().handle_async_request)
+
+
+# One limiter per process, shared by every OpenAI client
+openai_limiter = OpenAILimiter()
+
+
+def limited_http_client(limiter: OpenAILimiter = openai_limiter) -> httpx.Client:
+    return httpx.Client(transport=LimitedTransport(limiter), timeout=httpx.Timeout(60.0, connect=5.0))
+
+
+def limited_async_http_client(limiter: OpenAILimiter = openai_limiter) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=AsyncLimitedTransport(limiter), timeout=httpx.Timeout(60.0, connect=5.0))
+
+
+def openai_client_kwargs(limiter: OpenAILimiter = openai_limiter) -> dict:
+    """Keyword arguments that route a LangChain OpenAI model through the limiter."""
+    return {
+        "max_retries": 0,
+        "http_client": limited_http_client(limiter),
+        "http_async_client": limited_async_http_client(limiter),
+    }
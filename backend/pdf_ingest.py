@@ -0,0 +1,134 @@
+"""
+Streaming, parallel PDF ingestion: pages -> chunks -> JSONL.
+
+Pages are extracted by a process pool (each worker opens the PDF once) and come
+back in page order through a bounded window of futures, so only a handful of
+pages are in memory at a time. The chunker keeps the unfinished tail of the
+previous page and prepends it to the next one, so a chunk can span a page
+boundary just like it did when the whole book was split as a single string.
+Chunks are written to JSONL as they are produced.
+"""
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+
+_worker_pdf = None
+
+
+def _open_pdf(path: str):
+    global _worker_pdf
+    import pdfplumber
+    _worker_pdf = pdfplumber.open(path)
+
+
+def _extract_page(page_number: int) -> str:
+    page = _worker_pdf.pages[page_number]
+    text = page.extract_text() or ""
+    # Release the parsed layout objects; pdfplumber caches them per page
+    page.flush_cache()
+    return text
+
+
+def page_count(path: str) -> int:
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_pages(path: str, workers: int = INGEST_WORKERS) -> Iterator[str]:
+    """Yield the text of each page, in order, extracted in a process pool."""
+    n_pages = page_count(path)
+    if workers <= 1:
+        _open_pdf(path)
+        for page_number in range(n_pages):
+            yield _extract_page(page_number)
+        return
+    # A sliding window of submitted pages keeps memory flat when chunking falls behind
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_pdf, initargs=(path,)) as pool:
+        window = deque()
+        for page_number in range(n_pages):
+            window.append(pool.submit(_extract_page, page_number))
+            if len(window) >= workers * 4:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+
+def iter_chunks(pages: Iterable[str], chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> Iterator[str]:
+    """
+    Split a stream of page texts into overlapping chunks.
+    The last chunk of each page is held back and re-split together with the next
+    page, so chunks run across page boundaries instead of ending at them.
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    carry = ""
+    for page_text in pages:
+        chunks = splitter.split_text(carry + page_text + "\n")
+        if not chunks:
+            continue
+        yield from chunks[:-1]
+        carry = chunks[-1] + "\n"
+    if carry.strip():
+        yield from splitter.split_text(carry)
+
+
+def write_chunks(chunks: Iterable[str], jsonl_path: str, json_path: Optional[str] = None) -> int:
+    """
+    Write chunks one JSON string per line as they arrive. With json_path, the same
+    stream is also written as the JSON array the build scripts and API read.
+    """
+    os.makedirs(os.path.dirname(jsonl_path) or ".", exist_ok=True)
+    count = 0
+    json_file = open(json_path + ".tmp", "w", encoding="utf-8") if json_path else None
+    try:
+        with open(jsonl_path + ".tmp", "w", encoding="utf-8") as jsonl_file:
+            if json_file:
+                json_file.write("[")
+            for chunk in chunks:
+                line = json.dumps(chunk, ensure_ascii=False)
+                jsonl_file.write(line + "\n")
+                if json_file:
+                    json_file.write(("," if count else "") + "\n  " + line)
+                count += 1
+            if json_file:
+                json_file.write("\n]")
+    finally:
+        if json_file:
+            json_file.close()
+    os.replace(jsonl_path + ".tmp", jsonl_path)
+    if json_path:
+        os.replace(json_path + ".tmp", json_path)
+    return count
+
+
+def read_chunks(jsonl_path: str) -> Iterator[str]:
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def ingest_pdfs(pdf_paths: List[str], jsonl_path: str, json_path: Optional[str] = None,
+                chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP, workers: int = INGEST_WORKERS,
+                dedup: bool = False, dedup_report=None) -> int:
+    """
+    Chunk one or more PDFs into a single JSONL file; returns the number of chunks.
+    With dedup, near-duplicate chunks are dropped on the way to disk; an optional
+    chunk_dedup.DedupReport records what that saved.
+    """
+    def all_chunks():
+        for path in pdf_paths:
+            yield from iter_chunks(iter_pages(str(path), workers), chunk_size, chunk_overlap)
+    chunks = all_chunks()
+    if dedup:
+        from chunk_dedup import dedup_chunks
+        chunks = dedup_chunks(chunks, report=dedup_report)
+    return write_chunks(chunks, str(jsonl_path), str(json_path) if json_path else None)
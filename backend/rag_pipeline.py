@@ -1,35 +1,66 @@
 # python rag_pipeline.py
 from langchain_openai import ChatOpenAI
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate, ChatPromptTemplate
+from langchain.prompts import ChatPromptTemplate
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain.schema.messages import HumanMessage, AIMessage
+import asyncio
+import hashlib
+import json
 import os
+import time
 from dotenv import load_dotenv
-from langchain.schema.runnable import RunnablePassthrough
+from langchain.schema.runnable import RunnableLambda, RunnablePassthrough
 from langchain.schema.output_parser import StrOutputParser
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from chat_engine import ChatEngine, CONDENSE_FAST_MODEL, CONDENSE_LLM
+from semantic_cache import SemanticCache, profile_cache_key
+from embedding_backends import EMBEDDING_BACKEND, get_embeddings, vectorstore_dir
+from strategy_index import StrategyIndex, to_chroma_filter
+from singleflight import SingleFlight
+from openai_limiter import openai_limiter, openai_client_kwargs
+from model_router import ROUTER_ENABLED, ROUTER_FAST_MODEL, ROUTER_STANDARD_MODEL, ModelRouter, default_tiers
+from flat_index import FlatSnapshot, FlatVectorRetriever
+from lexical_index import BM25Index, HybridRetriever, LEXICAL_INDEX_PATH, RETRIEVAL_VECTOR
 
 load_dotenv()
 
 # Define paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 VECTORSTORE_PATH = os.path.join(BASE_DIR, "data", "vectorstore")
-STRATEGY_VECTORSTORE_PATH = os.path.join(VECTORSTORE_PATH, "strategies_chroma")
-MAIN_VECTORSTORE_PATH = os.path.join(VECTORSTORE_PATH, "chroma")
+# Each embedding backend has its own vectorstores (see embedding_backends.vectorstore_dir)
+STRATEGY_VECTORSTORE_PATH = vectorstore_dir("strategies_chroma")
+MAIN_VECTORSTORE_PATH = vectorstore_dir("chroma")
+# Memory-mapped flat copy of the book vectors (build_flat_snapshot.py); used instead
+# of the main Chroma store when present, unless BOOK_VECTOR_INDEX=chroma
+BOOK_SNAPSHOT_PATH = vectorstore_dir("book_flat")
+BOOK_VECTOR_INDEX = os.getenv("BOOK_VECTOR_INDEX", "flat")
 
 # Initialize LLM and Embeddings
-llm = ChatOpenAI(model="gpt-4", temperature=0, api_key=os.getenv("OPENAI_API_KEY"))
-embeddings = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+# Every OpenAI call goes through the shared limiter (rate budget, 429 backoff, circuit breaker)
+llm = ChatOpenAI(model=ROUTER_STANDARD_MODEL, temperature=0, api_key=os.getenv("OPENAI_API_KEY"), **openai_client_kwargs())
+# Short, shallow requests with little context are answered by a faster model (see model_router)
+fast_llm = None
+model_router = None
+if ROUTER_ENABLED:
+    fast_llm = ChatOpenAI(model=ROUTER_FAST_MODEL, temperature=0, api_key=os.getenv("OPENAI_API_KEY"), **openai_client_kwargs())
+
+
+def build_model_router():
+    global model_router
+    model_router = ModelRouter(default_tiers(fast_llm, llm)) if fast_llm is not None else None
+
+
+build_model_router()
+# Query embeddings come from EMBEDDING_BACKEND ("openai" or a local "onnx" model)
+# and go through the shared content-hash cache (memory LRU + SQLite)
+embeddings = get_embeddings(EMBEDDING_BACKEND)
+print(f"[RAG] Embedding backend: {EMBEDDING_BACKEND}")
 
 # Load vector stores
 strategy_vectorstore = None
 strategy_retriever = None
+strategy_index = None
 main_vectorstore = None
 main_retriever = None
+book_snapshot = None
 
 try:
     print(f"[RAG] Loading strategy vectorstore from: {STRATEGY_VECTORSTORE_PATH}")
@@ -41,13 +72,28 @@ try:
     strategy_retriever = strategy_vectorstore.as_retriever(search_kwargs={"k": 3})
     print("[RAG] Strategy vectorstore loaded successfully")
 
-    print(f"[RAG] Loading main vectorstore from: {MAIN_VECTORSTORE_PATH}")
-    main_vectorstore = Chroma(
-        persist_directory=MAIN_VECTORSTORE_PATH,
-        embedding_function=embeddings
-    )
-    main_retriever = main_vectorstore.as_retriever()
-    print("[RAG] Main vectorstore loaded successfully")
+    # Load all strategy vectors once into an in-memory matrix for exact top-k
+    strategy_index = StrategyIndex.from_chroma(strategy_vectorstore)
+    print(f"[RAG] Strategy index loaded: {len(strategy_index)} strategies")
+
+    if BOOK_VECTOR_INDEX == "flat" and os.path.exists(BOOK_SNAPSHOT_PATH):
+        book_snapshot = FlatSnapshot(BOOK_SNAPSHOT_PATH)
+        if book_snapshot.meta.get("namespace") != embeddings.namespace:
+            print(f"[RAG] Flat snapshot was built with '{book_snapshot.meta.get('namespace')}', not '{embeddings.namespace}'; ignoring it")
+            book_snapshot.close()
+            book_snapshot = None
+
+    if book_snapshot is not None:
+        main_retriever = FlatVectorRetriever(snapshot=book_snapshot, embeddings=embeddings)
+        print(f"[RAG] Book snapshot mapped from {BOOK_SNAPSHOT_PATH}: {len(book_snapshot)} chunks")
+    else:
+        print(f"[RAG] Loading main vectorstore from: {MAIN_VECTORSTORE_PATH}")
+        main_vectorstore = Chroma(
+            persist_directory=MAIN_VECTORSTORE_PATH,
+            embedding_function=embeddings
+        )
+        main_retriever = main_vectorstore.as_retriever()
+        print("[RAG] Main vectorstore loaded successfully")
 
 except Exception as e:
     print(f"[RAG] Error loading vector stores: {e}")
@@ -55,6 +101,51 @@ except Exception as e:
     print(f"[RAG] Main path exists: {os.path.exists(MAIN_VECTORSTORE_PATH)}")
     # Don't exit, let the app continue with None retrievers
 
+# Book retrieval: "vector" (Chroma only, the default), "lexical" (local BM25 only),
+# "hybrid" (both, fused) or "auto" (BM25 alone for keyword-style queries)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", RETRIEVAL_VECTOR)
+lexical_index = None
+if RETRIEVAL_MODE != RETRIEVAL_VECTOR:
+    try:
+        lexical_index = BM25Index.load(LEXICAL_INDEX_PATH)
+        main_retriever = HybridRetriever(lexical_index=lexical_index, vector_retriever=main_retriever, mode=RETRIEVAL_MODE)
+        print(f"[RAG] Lexical index loaded: {len(lexical_index)} chunks, retrieval mode '{RETRIEVAL_MODE}'")
+    except Exception as e:
+        print(f"[RAG] Lexical index not available, using vector retrieval only: {e}")
+
+# How follow-up questions are condensed before retrieval (see chat_engine.CONDENSE_MODES);
+# the default always rewrites with the chat model, as ConversationalRetrievalChain did
+CHAT_CONDENSE_MODE = os.getenv("CHAT_CONDENSE_MODE", CONDENSE_LLM)
+CHAT_CONDENSE_MODEL = os.getenv("CHAT_CONDENSE_MODEL", "gpt-4o-mini")
+
+condense_llm = None
+if CHAT_CONDENSE_MODE == CONDENSE_FAST_MODEL:
+    condense_llm = ChatOpenAI(model=CHAT_CONDENSE_MODEL, temperature=0, api_key=os.getenv("OPENAI_API_KEY"), **openai_client_kwargs())
+
+# Conversational chain for the chat endpoint, built once per process
+chat_engine = None
+
+
+def build_chat_engine():
+    global chat_engine
+    chat_engine = None
+    if main_retriever is not None:
+        chat_engine = ChatEngine(llm, main_retriever, condense_mode=CHAT_CONDENSE_MODE, condense_llm=condense_llm, router=model_router)
+
+
+build_chat_engine()
+
+
+# Semantic answer caches: near-duplicate questions with the same answer-relevant
+# profile fields are served without retrieval or an LLM call
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(24 * 3600)))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+advice_cache = SemanticCache(SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL_SECONDS, SEMANTIC_CACHE_MAX_ENTRIES)
+chat_answer_cache = SemanticCache(SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL_SECONDS, SEMANTIC_CACHE_MAX_ENTRIES)
+
 
 def format_docs(docs):
     return "\n\n".join(doc.page_content for doc in docs)
@@ -99,104 +190,164 @@ def build_question(user_input: dict) -> str:
     return question
 
 
+def advice_profile_key(user_input: dict) -> tuple:
+    """Intake fields that change a general advice answer."""
+    return profile_cache_key({
+        "cycle": user_input.get('cycle'),
+        "dietary_restrictions": ensure_list(user_input.get('dietaryRestrictions')) or ensure_list(user_input.get('preferences')),
+        "symptoms": ensure_list(user_input.get('symptoms')),
+    })
+
+
+def chat_profile_key(user_input: dict) -> tuple:
+    """
+    Profile fields that change a chat answer (user id, symptoms, current strategy),
+    passed by the chat endpoint as user_input['profile_fields'], plus a digest of the
+    full user_profile prompt. Chat answers are written for one user's profile (email,
+    log trends, strategy details), so they are never shared between users.
+    """
+    profile_digest = hashlib.sha256(str(user_input.get('user_profile', '')).encode('utf-8')).hexdigest()
+    return profile_cache_key({**(user_input.get('profile_fields') or {}), 'user_profile': profile_digest})
+
+
+def _cache_embedding(text: str):
+    return embeddings.embed_query(text) if SEMANTIC_CACHE_ENABLED else None
+
+
+async def _acache_embedding(text: str):
+    return await embeddings.aembed_query(text) if SEMANTIC_CACHE_ENABLED else None
+
+
+def get_metrics() -> dict:
+    """Runtime counters for the RAG pipeline, exposed by the /api/v1/metrics endpoint."""
+    return {
+        "advice_cache": advice_cache.stats(),
+        "chat_answer_cache": chat_answer_cache.stats(),
+        "embedding_cache": embeddings.stats(),
+        "condense": chat_engine.condense_stats() if chat_engine is not None else {},
+        "singleflight": {
+            "advice": advice_flight.stats(),
+            "strategies": strategy_flight.stats(),
+        },
+        "openai_limiter": openai_limiter.stats(),
+        "model_router": model_router.stats() if model_router is not None else {},
+    }
+
+
+KNOWLEDGE_BASE_UNAVAILABLE = "I'm sorry, but I'm having trouble accessing my knowledge base right now. Please try again later or contact support if the problem persists."
+PROCESSING_ERROR = "I'm sorry, but I encountered an error while processing your request. Please try again later."
+
+
+def _format_advice_result(result: dict) -> dict:
+    return {
+        "answer": result["answer"],
+        "sources": [
+            {
+                "content": doc.page_content,
+                "metadata": doc.metadata,
+            }
+            for doc in result.get("source_documents", [])
+        ]
+    }
+
+
 def generate_advice(user_input: dict) -> dict:
     """
-    Generate advice using the conversational chatbot with memory.
-    This is the original function for the chat interface.
+    Generate advice using the conversational chatbot.
+    The chain is built once at import; chat history is passed in per request.
     """
     # Check if vectorstore is loaded
-    if main_retriever is None:
+    if chat_engine is None:
         print("[RAG] Vectorstore not loaded, returning fallback response")
-        return {
-            "answer": "I'm sorry, but I'm having trouble accessing my knowledge base right now. Please try again later or contact support if the problem persists.",
-            "sources": []
-        }
-    
+        return {"answer": KNOWLEDGE_BASE_UNAVAILABLE, "sources": []}
+
     # Always include user_profile in the system prompt
     user_profile = user_input.get('user_profile', '')
     query = user_input.get('question', '')
     chat_history = user_input.get('chat_history', [])
 
     try:
-        # Convert chat history to LangChain message format
-        messages = []
-        for sender, text in chat_history:
-            if sender == 'user':
-                messages.append(HumanMessage(content=text))
-            elif sender == 'bot':
-                messages.append(AIMessage(content=text))
-
-        prompt_template = PromptTemplate(
-            input_variables=["context", "question", "user_profile"],
-            template="""
-You are a cycle-aware nutrition assistant based on holistic and scientific insights.
-
-You have access to the following up-to-date user profile:
-{user_profile}
-
-Always answer user questions helpfully and always provide answers in a warm, empowering tone and information dense way.
+        standalone_question = chat_engine.condense_question(query, chat_history)
+        profile_key = chat_profile_key(user_input)
+        embedding = _cache_embedding(standalone_question)
+        if embedding is not None:
+            cached = chat_answer_cache.get(embedding, profile_key)
+            if cached is not None:
+                return cached
+
+        result = _format_advice_result(chat_engine.answer(standalone_question, user_profile, len(chat_history)))
+        if embedding is not None:
+            chat_answer_cache.put(embedding, result, profile_key)
+        return result
+    except Exception as e:
+        print(f"[RAG] Error in generate_advice: {e}")
+        import traceback
+        traceback.print_exc()
+        return {"answer": PROCESSING_ERROR, "sources": []}
 
-For the foods, refer to ingredients and nutrients rather than recipes or dishes.
 
-If the source materials really don't mention anything related to the question, say:
-"There are limited recommendations for your question based on science, but what science does advise is…"
+async def agenerate_advice(user_input: dict) -> dict:
+    """Async version of generate_advice; awaits the LLM instead of blocking the event loop."""
+    if chat_engine is None:
+        print("[RAG] Vectorstore not loaded, returning fallback response")
+        return {"answer": KNOWLEDGE_BASE_UNAVAILABLE, "sources": []}
 
-Be concise, clear, and nurturing in your responses.
-Keep a warm and empowering tone.
+    user_profile = user_input.get('user_profile', '')
+    query = user_input.get('question', '')
+    chat_history = user_input.get('chat_history', [])
 
-Answer based on the context below:
+    try:
+        standalone_question = await chat_engine.acondense_question(query, chat_history)
+        profile_key = chat_profile_key(user_input)
+        embedding = await _acache_embedding(standalone_question)
+        if embedding is not None:
+            cached = chat_answer_cache.get(embedding, profile_key)
+            if cached is not None:
+                return cached
+
+        result = _format_advice_result(await chat_engine.aanswer(standalone_question, user_profile, len(chat_history)))
+        if embedding is not None:
+            chat_answer_cache.put(embedding, result, profile_key)
+        return result
+    except Exception as e:
+        print(f"[RAG] Error in agenerate_advice: {e}")
+        import traceback
+        traceback.print_exc()
+        return {"answer": PROCESSING_ERROR, "sources": []}
 
-Context:
-{context}
 
-Question:
-{question}
-"""
-        )
+async def astream_advice(user_input: dict):
+    """Stream the chatbot answer token by token; same inputs as generate_advice."""
+    if chat_engine is None:
+        print("[RAG] Vectorstore not loaded, returning fallback response")
+        yield KNOWLEDGE_BASE_UNAVAILABLE
+        return
 
-        # Create memory with existing chat history
-        memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="answer"
-        )
-        
-        # Load existing chat history into memory
-        for message in messages:
-            if isinstance(message, HumanMessage):
-                memory.chat_memory.add_user_message(message.content)
-            elif isinstance(message, AIMessage):
-                memory.chat_memory.add_ai_message(message.content)
-
-        qa_chain = ConversationalRetrievalChain.from_llm(
-            llm=llm,
-            retriever=main_retriever,
-            memory=memory,
-            return_source_documents=True,
-            combine_docs_chain_kwargs={"prompt": prompt_template},
-            output_key="answer"
-        )
+    user_profile = user_input.get('user_profile', '')
+    query = user_input.get('question', '')
+    chat_history = user_input.get('chat_history', [])
 
-        result = qa_chain({"question": query, "user_profile": user_profile})
-
-        return {
-            "answer": result["answer"],
-            "sources": [
-                {
-                    "content": doc.page_content,
-                    "metadata": doc.metadata,
-                }
-                for doc in result.get("source_documents", [])
-            ]
-        }
+    try:
+        standalone_question = await chat_engine.acondense_question(query, chat_history)
+        profile_key = chat_profile_key(user_input)
+        embedding = await _acache_embedding(standalone_question)
+        if embedding is not None:
+            cached = chat_answer_cache.get(embedding, profile_key)
+            if cached is not None:
+                yield cached["answer"]
+                return
+
+        tokens = []
+        async for token in chat_engine.astream_answer(standalone_question, user_profile, len(chat_history)):
+            tokens.append(token)
+            yield token
+        if embedding is not None:
+            chat_answer_cache.put(embedding, {"answer": "".join(tokens), "sources": []}, profile_key)
     except Exception as e:
-        print(f"[RAG] Error in generate_advice: {e}")
+        print(f"[RAG] Error in astream_advice: {e}")
         import traceback
         traceback.print_exc()
-        return {
-            "answer": "I'm sorry, but I encountered an error while processing your request. Please try again later.",
-            "sources": []
-        }
+        yield PROCESSING_ERROR
 
 
 # RAG Chain for Simple Advice (no conversation memory)
@@ -209,38 +360,148 @@ RAG_PROMPT_TEMPLATE = """
 """
 rag_prompt = ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
 
+# One prompt | model chain per router tier
+advice_tier_chains = {}
+
+
+def _routed_advice_answer(inputs: dict, config) -> str:
+    """Answer with the tier the router picks for this question and retrieved context."""
+    route = model_router.route(inputs["question"], inputs["context"])
+    start = time.perf_counter()
+    answer = advice_tier_chains[route.tier.name].invoke(inputs, config)
+    model_router.record(route, time.perf_counter() - start, answer)
+    return answer
+
+
+async def _arouted_advice_answer(inputs: dict, config) -> str:
+    route = model_router.route(inputs["question"], inputs["context"])
+    start = time.perf_counter()
+    answer = await advice_tier_chains[route.tier.name].ainvoke(inputs, config)
+    model_router.record(route, time.perf_counter() - start, answer)
+    return answer
+
+
 # Initialize rag_chain only if main_retriever exists
 rag_chain = None
-if main_retriever is not None:
-    rag_chain = (
-        {"context": main_retriever | format_docs, "question": RunnablePassthrough()}
-        | rag_prompt
-        | llm
-        | StrOutputParser()
-    )
 
-def get_advice(question: str) -> str:
+
+def build_rag_chain():
+    global advice_tier_chains, rag_chain
+    advice_tier_chains = {
+        tier.name: rag_prompt | tier.llm | StrOutputParser() for tier in model_router.tiers
+    } if model_router is not None else {}
+    rag_chain = None
+    if main_retriever is not None:
+        answer_step = (
+            RunnableLambda(_routed_advice_answer, afunc=_arouted_advice_answer)
+            if model_router is not None
+            else rag_prompt | llm | StrOutputParser()
+        )
+        rag_chain = (
+            {"context": main_retriever | format_docs, "question": RunnablePassthrough()}
+            | answer_step
+        )
+
+
+build_rag_chain()
+
+INJECTABLE_MODELS = ("llm", "fast_llm", "condense_llm", "embeddings", "main_retriever", "strategy_index")
+
+
+def use_models(**models):
     """
-    Get general nutritional advice from the RAG pipeline (no conversation memory).
+    Replace any of INJECTABLE_MODELS and rebuild the router, chat engine and advice
+    chain on top of them, e.g. to run the real pipeline against fakes in the offline
+    benchmarks. Clears the answer caches, which hold answers from the old models.
     """
-    if rag_chain is None:
-        return "I'm sorry, but I'm having trouble accessing my knowledge base right now. Please try again later."
+    unknown = set(models) - set(INJECTABLE_MODELS)
+    if unknown:
+        raise TypeError(f"use_models() got unknown models: {sorted(unknown)}")
+    globals().update(models)
+    build_model_router()
+    build_chat_engine()
+    build_rag_chain()
+    advice_cache.clear()
+    chat_answer_cache.clear()
+
+
+def _advice_question_and_key(question):
+    """/api/v1/advice posts intake data; turn it into a question and a cache profile key."""
+    if isinstance(question, dict):
+        return build_question(question), advice_profile_key(question)
+    return question, ()
+
+
+# Identical requests that arrive while one is still running (e.g. a burst of users
+# opening the same screen) share that one embedding + LLM call
+advice_flight = SingleFlight()
+strategy_flight = SingleFlight()
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _advice_flight_key(question: str, profile_key: tuple) -> tuple:
+    return normalize_query(question), profile_key
+
+
+def _get_advice(question: str, profile_key: tuple) -> str:
     try:
-        return rag_chain.invoke(question)
+        embedding = _cache_embedding(question)
+        if embedding is not None:
+            cached = advice_cache.get(embedding, profile_key)
+            if cached is not None:
+                return cached
+
+        answer = rag_chain.invoke(question)
+        if embedding is not None:
+            advice_cache.put(embedding, answer, profile_key)
+        return answer
     except Exception as e:
         print(f"[RAG] Error in get_advice: {e}")
         return "I'm sorry, but I encountered an error while processing your request. Please try again later."
 
 
-def get_strategies(user_input: dict) -> list:
+async def _aget_advice(question: str, profile_key: tuple) -> str:
+    try:
+        embedding = await _acache_embedding(question)
+        if embedding is not None:
+            cached = advice_cache.get(embedding, profile_key)
+            if cached is not None:
+                return cached
+
+        answer = await rag_chain.ainvoke(question)
+        if embedding is not None:
+            advice_cache.put(embedding, answer, profile_key)
+        return answer
+    except Exception as e:
+        print(f"[RAG] Error in aget_advice: {e}")
+        return "I'm sorry, but I encountered an error while processing your request. Please try again later."
+
+
+def get_advice(question) -> str:
     """
-    Get 3 personalized strategies based on user input, using all intakeData fields and optional notes.
+    Get general nutritional advice from the RAG pipeline (no conversation memory).
+    Accepts a question string or an intake-data dict. Concurrent identical
+    requests are coalesced into one call.
     """
-    # Check if strategy retriever is available
-    if strategy_retriever is None:
-        print("[RAG] Strategy retriever not loaded, returning empty list")
-        return []
-    
+    if rag_chain is None:
+        return "I'm sorry, but I'm having trouble accessing my knowledge base right now. Please try again later."
+    question, profile_key = _advice_question_and_key(question)
+    return advice_flight.do(_advice_flight_key(question, profile_key), _get_advice, question, profile_key)
+
+
+async def aget_advice(question) -> str:
+    """Async version of get_advice."""
+    if rag_chain is None:
+        return "I'm sorry, but I'm having trouble accessing my knowledge base right now. Please try again later."
+    question, profile_key = _advice_question_and_key(question)
+    return await advice_flight.ado(_advice_flight_key(question, profile_key), _aget_advice, question, profile_key)
+
+
+def build_strategy_query(user_input: dict, log: bool = True) -> str:
+    """Build the strategy retrieval query, using all intakeData fields and optional notes."""
     symptoms = ensure_list(user_input.get('symptoms'))
     symptoms_note = user_input.get('symptoms_note', '')
     goals = ensure_list(user_input.get('goals'))
@@ -266,17 +527,158 @@ def get_strategies(user_input: dict) -> list:
         + "Looking for strategies that match this profile."
     )
 
-    print(f"[RAG] Strategy selection query: {query}")
+    if log:
+        print(f"[RAG] Strategy selection query: {query}")
+    return query
 
+
+STRATEGY_TOP_K = 3
+
+
+def _strategy_flight_key(query: str, where, k: int = STRATEGY_TOP_K):
+    """None when the call can't be coalesced (a predicate `where` has no comparable identity)."""
+    if callable(where):
+        return None
+    return normalize_query(query), json.dumps(where, sort_keys=True, default=str), k
+
+
+def _chroma_search_kwargs(k: int, where) -> dict:
+    """similarity_search arguments for the Chroma fallback; a predicate `where` ranks every strategy and filters afterwards."""
+    if callable(where):
+        return {"k": strategy_vectorstore._collection.count()}
+    return {"k": k, "filter": to_chroma_filter(where)}
+
+
+def _chroma_strategies(docs, k: int, where) -> list:
+    if callable(where):
+        docs = [doc for doc in docs if where(doc.metadata)][:k]
+    return [doc.metadata for doc in docs]
+
+
+def _get_strategies(query: str, where=None, k: int = STRATEGY_TOP_K) -> list:
     try:
-        docs = strategy_retriever.invoke(query)
-        strategies = [doc.metadata for doc in docs]
+        if strategy_index is not None:
+            return strategy_index.search_metadata(embeddings.embed_query(query), k=k, where=where)
+        # The retriever is configured for the default k and no filter; anything else queries the store directly
+        if where is None and k == STRATEGY_TOP_K:
+            docs = strategy_retriever.invoke(query)
+        else:
+            docs = strategy_vectorstore.similarity_search(query, **_chroma_search_kwargs(k, where))
+        strategies = _chroma_strategies(docs, k, where)
         return strategies
     except Exception as e:
         print(f"[RAG] Error in get_strategies: {e}")
         return []
 
 
+async def _aget_strategies(query: str, where=None, k: int = STRATEGY_TOP_K) -> list:
+    try:
+        if strategy_index is not None:
+            query_vector = await embeddings.aembed_query(query)
+            return strategy_index.search_metadata(query_vector, k=k, where=where)
+        if where is None and k == STRATEGY_TOP_K:
+            docs = await strategy_retriever.ainvoke(query)
+        else:
+            docs = await strategy_vectorstore.asimilarity_search(query, **_chroma_search_kwargs(k, where))
+        return _chroma_strategies(docs, k, where)
+    except Exception as e:
+        print(f"[RAG] Error in aget_strategies: {e}")
+        return []
+
+
+def get_strategies(user_input: dict, where=None, k: int = STRATEGY_TOP_K) -> list:
+    """
+    Get k (default 3) personalized strategies based on user input, using all intakeData fields and optional notes.
+    `where` is an optional metadata pre-filter (e.g. dietary restrictions): a Chroma-style
+    dict or a predicate, see strategy_index. Concurrent identical requests are coalesced into one call.
+    """
+    # Check if strategy retriever is available
+    if strategy_index is None and strategy_retriever is None:
+        print("[RAG] Strategy retriever not loaded, returning empty list")
+        return []
+
+    query = build_strategy_query(user_input)
+    key = _strategy_flight_key(query, where, k)
+    if key is None:
+        return _get_strategies(query, where, k)
+    return list(strategy_flight.do(key, _get_strategies, query, where, k))
+
+
+async def aget_strategies(user_input: dict, where=None, k: int = STRATEGY_TOP_K) -> list:
+    """Async version of get_strategies."""
+    if strategy_index is None and strategy_retriever is None:
+        print("[RAG] Strategy retriever not loaded, returning empty list")
+        return []
+
+    query = build_strategy_query(user_input)
+    key = _strategy_flight_key(query, where, k)
+    if key is None:
+        return await _aget_strategies(query, where, k)
+    return list(await strategy_flight.ado(key, _aget_strategies, query, where, k))
+
+
+STRATEGY_BATCH_EMBED_SIZE = 256
+STRATEGY_BATCH_CONCURRENCY = 4
+
+
+def _rank_strategy_batch(query_vectors, k: int, where=None) -> list:
+    top_indices = strategy_index.search_batch(query_vectors, k=k, where=where)
+    return [[strategy_index.metadatas[i] for i in row] for row in top_indices.tolist()]
+
+
+def get_strategies_batch(user_inputs: list, k: int = STRATEGY_TOP_K, where=None) -> list:
+    """
+    Strategies for many intake profiles at once, in input order.
+    Queries are embedded in chunked batch calls and scored against the strategy
+    matrix in one vectorized operation. `where` filters as in get_strategies.
+    """
+    if strategy_index is None:
+        print("[RAG] Strategy index not loaded, falling back to one query per profile")
+        return [get_strategies(user_input, where=where, k=k) for user_input in user_inputs]
+    if not user_inputs:
+        return []
+
+    queries = [build_strategy_query(user_input, log=False) for user_input in user_inputs]
+    print(f"[RAG] Batch strategy selection for {len(queries)} profiles")
+    try:
+        vectors = []
+        for start in range(0, len(queries), STRATEGY_BATCH_EMBED_SIZE):
+            vectors.extend(embeddings.embed_documents(queries[start:start + STRATEGY_BATCH_EMBED_SIZE]))
+        return _rank_strategy_batch(vectors, k, where)
+    except Exception as e:
+        print(f"[RAG] Error in get_strategies_batch: {e}")
+        return [[] for _ in user_inputs]
+
+
+async def aget_strategies_batch(user_inputs: list, k: int = STRATEGY_TOP_K, where=None) -> list:
+    """Async version of get_strategies_batch; embedding chunks are requested concurrently."""
+    if strategy_index is None:
+        print("[RAG] Strategy index not loaded, falling back to one query per profile")
+        return [await aget_strategies(user_input, where=where, k=k) for user_input in user_inputs]
+    if not user_inputs:
+        return []
+
+    queries = [build_strategy_query(user_input, log=False) for user_input in user_inputs]
+    print(f"[RAG] Batch strategy selection for {len(queries)} profiles")
+    semaphore = asyncio.Semaphore(STRATEGY_BATCH_CONCURRENCY)
+
+    async def embed_chunk(chunk):
+        async with semaphore:
+            return await embeddings.aembed_documents(chunk)
+
+    chunks = [queries[start:start + STRATEGY_BATCH_EMBED_SIZE] for start in range(0, len(queries), STRATEGY_BATCH_EMBED_SIZE)]
+    try:
+        vectors = [vector for chunk_vectors in await asyncio.gather(*(embed_chunk(c) for c in chunks)) for vector in chunk_vectors]
+        return _rank_strategy_batch(vectors, k, where)
+    except Exception as e:
+        print(f"[RAG] Error in aget_strategies_batch: {e}")
+        return [[] for _ in user_inputs]
+
+
+# (DataFrame, StrategyIndex) of the last get_recommendations call, so the matrix is parsed once
+_dataframe_index = None
+
+
 def get_recommendations(intake_data, df, top_k=3):
     # Build the query string from the intake data dictionary
     user_data_dict = intake_data.dict()
@@ -287,14 +689,14 @@ def get_recommendations(intake_data, df, top_k=3):
     # Use the global embeddings instance instead of creating a new one
     query_embedding = embeddings.embed_query(query_text)
 
-    # Prepare the strategy embeddings from the DataFrame
-    strategy_embeddings = np.array(df['embedding'].apply(eval).tolist())
-
-    # Calculate cosine similarity
-    similarities = cosine_similarity([query_embedding], strategy_embeddings)[0]
+    # Parse the embedding column once per DataFrame instead of eval-ing it on every call;
+    # only the latest DataFrame is kept, so replaced ones can be freed
+    global _dataframe_index
+    if _dataframe_index is None or _dataframe_index[0] is not df:
+        _dataframe_index = (df, StrategyIndex.from_dataframe(df))
 
     # Get top_k recommendations
-    top_indices = similarities.argsort()[-top_k:][::-1]
+    top_indices = _dataframe_index[1].search(query_embedding, k=top_k)
     recommendations = df.iloc[top_indices]
 
     return recommendations.to_dict(orient='records')
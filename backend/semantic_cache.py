@@ -0,0 +1,129 @@
+"""
+Semantic answer cache for the advice and chat endpoints.
+
+Answers are keyed by the embedding of the question plus the profile fields that
+change the answer (cycle phase, dietary restrictions, symptoms, strategy; for
+chat, also the user and a digest of their full profile prompt). A
+lookup is a hit when a cached question within the same profile bucket has a
+cosine similarity above the threshold and has not expired. Entries are evicted
+least-recently-used once the cache is full.
+"""
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+
+import numpy as np
+
+
+def profile_cache_key(fields: dict) -> tuple:
+    """Normalize profile fields into a hashable key; list order and case don't matter."""
+    key = []
+    for name in sorted(fields):
+        value = fields[name]
+        if isinstance(value, (list, tuple, set)):
+            value = tuple(sorted(str(v).strip().lower() for v in value if v))
+        elif value is None:
+            value = ""
+        else:
+            value = str(value).strip().lower()
+        key.append((name, value))
+    return tuple(key)
+
+
+class _Entry:
+    __slots__ = ("profile_key", "vector", "value", "created_at")
+
+    def __init__(self, profile_key, vector, value, created_at):
+        self.profile_key = profile_key
+        self.vector = vector
+        self.value = value
+        self.created_at = created_at
+
+
+class SemanticCache:
+    """Thread-safe TTL + LRU cache keyed by query embedding and profile key."""
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 24 * 3600, max_entries: int = 1000, clock=time.monotonic):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._by_profile = {}
+        self._ids = count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        bucket = self._by_profile.get(entry.profile_key)
+        if bucket is not None:
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._by_profile[entry.profile_key]
+
+    def get(self, embedding, profile_key=()):
+        """Return the cached value for a near-duplicate question, or None."""
+        vector = self._normalize(embedding)
+        now = self._clock()
+        with self._lock:
+            best_id, best_score = None, -1.0
+            for entry_id in list(self._by_profile.get(profile_key, ())):
+                entry = self._entries[entry_id]
+                if now - entry.created_at > self.ttl_seconds:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                score = float(np.dot(vector, entry.vector))
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is not None and best_score >= self.threshold:
+                self._entries.move_to_end(best_id)
+                self.hits += 1
+                return self._entries[best_id].value
+
+            self.misses += 1
+            return None
+
+    def put(self, embedding, value, profile_key=()):
+        """Store an answer; evicts the least recently used entry when full."""
+        vector = self._normalize(embedding)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = _Entry(profile_key, vector, value, self._clock())
+            self._by_profile.setdefault(profile_key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_profile.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,87 @@
+"""
+Request coalescing ("singleflight") for expensive RAG calls.
+
+When several callers ask for the same key while a computation for it is still
+running, only the first one (the leader) runs it; the others wait for and share
+its result or exception. Nothing is cached: once the call finishes the key is
+forgotten, so the next caller starts a fresh computation.
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with equal keys, for threads (do) and asyncio tasks (ado)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.calls = 0
+        self.executions = 0
+        self.deduplicated = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs), or wait for an in-flight call with the same key."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key, coro_fn, *args, **kwargs):
+        """Await coro_fn(*args, **kwargs), or join an in-flight task with the same key."""
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+                self._tasks[key] = task
+                task.add_done_callback(lambda _, key=key: self._forget(key))
+                self.executions += 1
+            else:
+                self.deduplicated += 1
+        # shield: a caller that disconnects must not cancel the work the others wait on
+        return await asyncio.shield(task)
+
+    def _forget(self, key):
+        with self._lock:
+            self._tasks.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "deduplicated": self.deduplicated,
+                "in_flight": len(self._calls) + len(self._tasks),
+                "dedup_rate": self.deduplicated / self.calls if self.calls else 0.0,
+            }
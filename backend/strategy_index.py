@@ -0,0 +1,139 @@
+"""
+In-memory NumPy index over the strategy vectors.
+
+strategies.csv holds a few dozen rows, so an exact search over a contiguous,
+L2-normalized float32 matrix is cheaper than going through Chroma's HNSW index
+and SQLite. Top-k is one matrix-vector product followed by argpartition.
+
+For unit-length embeddings (OpenAI's are) ranking by cosine similarity is the
+same as ranking by the L2 distance Chroma uses, so results match the Chroma path.
+
+Searches take an optional metadata pre-filter `where`: a Chroma-style equality
+filter ({"field": value} or {"field": {"$in"/"$nin"/"$ne"/"$eq": ...}}), or a
+predicate on the metadata dict. Filtered-out strategies are masked before the
+top-k selection, so k results come back whenever k strategies match.
+"""
+import json
+from typing import Callable, List, Optional, Union
+
+import numpy as np
+from langchain.schema import Document
+
+
+Where = Union[dict, Callable[[dict], bool], None]
+
+
+def _matches(metadata: dict, where: dict) -> bool:
+    """Chroma-style equality filter: {"field": value} or {"field": {"$in"/"$nin"/"$ne"/"$eq": ...}}."""
+    for field, condition in where.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$eq" and value != operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def to_chroma_filter(where: Optional[dict]) -> Optional[dict]:
+    """The same filter in Chroma's `where` syntax: one operator per clause, several clauses joined with $and."""
+    if not where:
+        return None
+    clauses = []
+    for field, condition in where.items():
+        if isinstance(condition, dict):
+            clauses.extend({field: {op: operand}} for op, operand in condition.items())
+        else:
+            clauses.append({field: condition})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class StrategyIndex:
+    """Exact top-k cosine search over a normalized float32 strategy matrix."""
+
+    def __init__(self, vectors, metadatas: List[dict], documents: Optional[List[str]] = None, ids: Optional[List[str]] = None):
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = matrix / norms
+        self.metadatas = list(metadatas)
+        self.documents = list(documents) if documents is not None else [""] * len(self.metadatas)
+        self.ids = list(ids) if ids is not None else [str(i) for i in range(len(self.metadatas))]
+
+    def __len__(self):
+        return len(self.metadatas)
+
+    @classmethod
+    def from_chroma(cls, vectorstore) -> "StrategyIndex":
+        """Load every vector of a langchain_chroma collection once."""
+        data = vectorstore.get(include=["embeddings", "metadatas", "documents"])
+        return cls(data["embeddings"], data["metadatas"], data["documents"], data["ids"])
+
+    @classmethod
+    def from_dataframe(cls, df, embedding_column: str = "embedding") -> "StrategyIndex":
+        """Build from a DataFrame whose embedding column holds JSON-encoded lists."""
+        vectors = [json.loads(v) if isinstance(v, str) else v for v in df[embedding_column]]
+        metadatas = df.drop(columns=[embedding_column]).to_dict(orient="records")
+        return cls(vectors, metadatas)
+
+    def _mask(self, where: Where) -> Optional[np.ndarray]:
+        if where is None:
+            return None
+        predicate = where if callable(where) else (lambda metadata: _matches(metadata, where))
+        return np.fromiter((predicate(m) for m in self.metadatas), dtype=bool, count=len(self.metadatas))
+
+    def scores(self, query_vectors) -> np.ndarray:
+        """Cosine similarity of each query (rows) against every strategy (columns)."""
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (queries / norms) @ self.matrix.T
+
+    @staticmethod
+    def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest scores, best first (1-D scores)."""
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def search(self, query_vector, k: int = 3, where: Where = None) -> List[int]:
+        """Row indices of the top-k strategies, optionally pre-filtered on metadata."""
+        scores = self.scores(query_vector)[0]
+        mask = self._mask(where)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            k = min(k, int(mask.sum()))
+        return self.top_k_indices(scores, k).tolist()
+
+    def search_batch(self, query_vectors, k: int = 3, where: Where = None) -> np.ndarray:
+        """Top-k row indices for many queries at once: one matrix product, row-wise argpartition."""
+        scores = self.scores(query_vectors)
+        mask = self._mask(where)
+        if mask is not None:
+            scores = np.where(mask[np.newaxis, :], scores, -np.inf)
+            k = min(k, int(mask.sum()))
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return np.empty((scores.shape[0], 0), dtype=np.int64)
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind="stable")
+        return np.take_along_axis(candidates, order, axis=1)
+
+    def search_metadata(self, query_vector, k: int = 3, where: Where = None) -> List[dict]:
+        return [self.metadatas[i] for i in self.search(query_vector, k, where)]
+
+    def search_documents(self, query_vector, k: int = 3, where: Where = None) -> List[Document]:
+        return [
+            Document(page_content=self.documents[i], metadata=self.metadatas[i])
+            for i in self.search(query_vector, k, where)
+        ]
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+SSE framing and failure handling of /api/v1/chat/stream.
+
+Runs the real app on the offline backend (benchmarks/offline_app: in-process fake
+Supabase and fake OpenAI models), so no network access or credentials are needed.
+The fake LLM has a fixed time to first token and token rate, so the time-to-first-token
+test can check that tokens reach the client while the answer is still being generated.
+"""
+import asyncio
+import json
+import shutil
+import time
+
+import httpx
+import pytest
+
+LLM_DELAY = 0.2
+TOKENS_PER_SECOND = 80.0
+
+
+@pytest.fixture(scope="module")
+def backend():
+    from benchmarks.offline_app import install_offline_backend
+
+    app, supabase, snapshot = install_offline_backend(db_latency=0.0, llm_delay=LLM_DELAY, tokens_per_second=TOKENS_PER_SECOND, embed_delay=0.0)
+    yield app, supabase
+    snapshot.close()
+    shutil.rmtree(snapshot.path, ignore_errors=True)
+
+
+def parse_events(body: str) -> list:
+    """[(event name, JSON payload)] of an SSE body; every event must end with a blank line."""
+    assert body.endswith("\n\n"), "stream does not end with a complete event"
+    events = []
+    for raw in body[:-2].split("\n\n"):
+        name, data = "message", None
+        for line in raw.split("\n"):
+            field, _, value = line.partition(": ")
+            if field == "event":
+                name = value
+            elif field == "data":
+                data = json.loads(value)
+            else:
+                raise AssertionError(f"unexpected SSE line: {line!r}")
+        assert data is not None, f"event without data: {raw!r}"
+        events.append((name, data))
+    return events
+
+
+async def register(client: httpx.AsyncClient, email: str) -> dict:
+    response = await client.post("/api/v1/register", json={"email": email, "password": "test-password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def stream_chat(app, email: str, question: str) -> list:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://offline") as client:
+        headers = await register(client, email)
+        response = await client.post("/api/v1/chat/stream", headers=headers, json={"question": question})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        return parse_events(response.text)
+
+
+async def timed_stream_chat(app, email: str, question: str):
+    """
+    Drive the ASGI app directly (httpx's ASGITransport buffers the whole body) and
+    return (seconds to the first token event, seconds to the end of the stream, body).
+    """
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://offline") as client:
+        headers = await register(client, email)
+
+    body = json.dumps({"question": question}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/api/v1/chat/stream", "raw_path": b"/api/v1/chat/stream", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"offline"), (b"content-type", b"application/json"),
+                    (b"authorization", headers["Authorization"].encode())],
+        "client": ("127.0.0.1", 50000), "server": ("offline", 80),
+    }
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # the client never disconnects
+
+    chunks = []
+    first_token = None
+    start = time.perf_counter()
+
+    async def send(message):
+        nonlocal first_token
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks.append(message["body"].decode())
+            if first_token is None and "data: " in chunks[-1] and "event: done" not in chunks[-1]:
+                first_token = time.perf_counter() - start
+
+    await app(scope, receive, send)
+    return first_token, time.perf_counter() - start, "".join(chunks)
+
+
+def stored_bot_messages(supabase) -> list:
+    return [row["text"] for row in supabase.tables["chat_messages"] if row["sender"] == "bot"]
+
+
+def test_stream_is_token_events_then_done(backend):
+    app, supabase = backend
+    events = asyncio.run(stream_chat(app, "stream-ok@example.com", "What should I eat in my luteal phase?"))
+
+    names = [name for name, _ in events]
+    assert names[-1] == "done"
+    assert set(names[:-1]) == {"message"}
+    done = events[-1][1]
+    assert "".join(data["token"] for _, data in events[:-1]) == done["answer"]
+    assert done["timestamp"]
+    assert stored_bot_messages(supabase)[-1] == done["answer"]
+
+
+def test_first_token_arrives_before_the_answer_is_done(backend):
+    app, _ = backend
+    first_token, total, body = asyncio.run(
+        timed_stream_chat(app, "stream-ttft@example.com", "Which foods help with cramps during my period?")
+    )
+
+    events = parse_events(body)
+    assert len(events) > 2 and events[-1][0] == "done"
+    assert first_token is not None
+    # The fake LLM needs LLM_DELAY for its first token and about a second more for the rest
+    assert first_token < LLM_DELAY + 0.5
+    assert first_token < total / 2
+
+
+def test_failed_stream_stores_only_the_fallback(backend, monkeypatch):
+    import rag_pipeline
+
+    async def failing_stream(user_input):
+        yield "Eat more "
+        yield "magnesium"
+        yield rag_pipeline.PROCESSING_ERROR
+
+    monkeypatch.setattr(rag_pipeline, "astream_advice", failing_stream)
+    app, supabase = backend
+    events = asyncio.run(stream_chat(app, "stream-fail@example.com", "What should I eat in my luteal phase?"))
+
+    assert [data["token"] for _, data in events[:-1]] == ["Eat more ", "magnesium"]
+    assert events[-1][0] == "done"
+    assert events[-1][1]["answer"] == rag_pipeline.PROCESSING_ERROR
+    assert stored_bot_messages(supabase)[-1] == rag_pipeline.PROCESSING_ERROR
@@ -68,7 +68,9 @@ def test_sqlalchemy():
     print("\n=== Testing SQLAlchemy connection ===")
     
     try:
-        from db import engine
+        import db
+        db.configure_database()
+        engine = db.engine
         
         # Test connection
         with engine.connect() as conn:
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Startup budget check for the API process.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and fails if
+importing main takes longer than IMPORT_TIME_BUDGET_MS, or if it pulls in any of
+the heavy modules that are meant to load in the background warm-up task.
+"""
+import os
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+# Loaded by main's background warm-up, never on the import path
+DEFERRED_MODULES = ("pandas", "sklearn", "langchain", "langchain_core", "langchain_openai", "chromadb", "supabase", "rag_pipeline", "db")
+
+
+def measure_import_time(module: str = "main"):
+    """Return ({top-level module: cumulative microseconds}, total microseconds for `module`)."""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not cumulative_us.isdigit():
+            continue
+        top_level = name.split(".")[0]
+        cumulative[top_level] = max(cumulative.get(top_level, 0), int(cumulative_us))
+    return cumulative, cumulative.get(module, 0)
+
+
+def test_import_time_budget():
+    cumulative, total_us = measure_import_time("main")
+    loaded_heavy = [name for name in DEFERRED_MODULES if name in cumulative]
+    assert not loaded_heavy, f"import main pulls in deferred modules: {loaded_heavy}"
+    assert total_us / 1000 <= IMPORT_TIME_BUDGET_MS, f"import main took {total_us / 1000:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)"
+
+
+if __name__ == "__main__":
+    cumulative, total_us = measure_import_time("main")
+    print(f"import main: {total_us / 1000:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)")
+    print("Slowest top-level imports:")
+    for name, us in sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f"  {name:<24} {us / 1000:8.1f} ms")
+    test_import_time_budget()
+    print("✅ Startup import budget OK")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker state machine of the shared OpenAI limiter.
+
+Drives OpenAILimiter.send/asend with a fake upstream and an injectable clock:
+closed -> open after repeated failures, half-open after the reset timeout, and
+a half-open trial that ends in a success, a failure, a 429 or a cancellation.
+Whatever the trial's outcome, the breaker must not stay stuck in half-open.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from openai_limiter import CircuitBreaker, CircuitOpenError, OpenAILimiter
+
+FAILURES = 3
+RESET_SECONDS = 30.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(max_retries: int = 0):
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=FAILURES, reset_seconds=RESET_SECONDS, clock=clock)
+    limiter = OpenAILimiter(rpm=6000, tpm=10_000_000, max_retries=max_retries, backoff_base=0.0, breaker=breaker, clock=clock)
+    return limiter, clock
+
+
+def responder(*statuses):
+    """send(request) answering with the given statuses in turn."""
+    remaining = list(statuses)
+
+    def send(request):
+        return httpx.Response(remaining.pop(0), request=request)
+    return send
+
+
+def always(status):
+    return lambda request: httpx.Response(status, request=request)
+
+
+def request():
+    return httpx.Request("POST", "https://api.openai.com/v1/chat/completions", json={"messages": [], "max_tokens": 1})
+
+
+def open_breaker(limiter, clock):
+    while limiter.breaker.state != CircuitBreaker.OPEN:
+        assert limiter.send(request(), always(500)).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        limiter.send(request(), responder(200))
+    clock.now += RESET_SECONDS
+
+
+def test_failures_open_the_breaker_and_a_trial_success_closes_it():
+    limiter, clock = make_limiter()
+    open_breaker(limiter, clock)
+
+    assert limiter.send(request(), responder(200)).status_code == 200
+    assert limiter.breaker.state == CircuitBreaker.CLOSED
+    assert limiter.stats()["rejected_circuit_open"] == 1
+
+
+def test_trial_failure_reopens_the_breaker():
+    limiter, clock = make_limiter()
+    open_breaker(limiter, clock)
+
+    assert limiter.send(request(), responder(500)).status_code == 500
+    assert limiter.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        limiter.send(request(), responder(200))
+
+
+def test_trial_429_releases_the_trial():
+    limiter, clock = make_limiter(max_retries=2)
+    open_breaker(limiter, clock)
+
+    # Every retry of the rate-limited trial is admitted as the new trial
+    assert limiter.send(request(), always(429)).status_code == 429
+    assert limiter.stats()["retries_429"] == 2
+    assert not limiter.breaker.trial_in_flight
+    clock.now += RESET_SECONDS
+    assert limiter.send(request(), always(200)).status_code == 200
+    assert limiter.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_trial_429_is_retried_as_the_trial():
+    limiter, clock = make_limiter(max_retries=2)
+    open_breaker(limiter, clock)
+
+    assert limiter.send(request(), responder(429, 200)).status_code == 200
+    assert limiter.breaker.state == CircuitBreaker.CLOSED
+    assert limiter.stats()["retries_429"] == 1
+
+
+def test_cancelled_trial_releases_the_trial():
+    limiter, clock = make_limiter()
+    open_breaker(limiter, clock)
+
+    async def cancelled_trial():
+        started = asyncio.Event()
+
+        async def hanging_send(request):
+            started.set()
+            await asyncio.Event().wait()
+
+        task = asyncio.create_task(limiter.asend(request(), hanging_send))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_trial())
+    assert limiter.breaker.state == CircuitBreaker.HALF_OPEN
+    assert not limiter.breaker.trial_in_flight
+
+    async def ok(request):
+        return httpx.Response(200, request=request)
+
+    assert asyncio.run(limiter.asend(request(), ok)).status_code == 200
+    assert limiter.breaker.state == CircuitBreaker.CLOSED
+
+
+if __name__ == "__main__":
+    test_failures_open_the_breaker_and_a_trial_success_closes_it()
+    test_trial_failure_reopens_the_breaker()
+    test_trial_429_releases_the_trial()
+    test_trial_429_is_retried_as_the_trial()
+    test_cancelled_trial_releases_the_trial()
+    print("✅ Circuit breaker never sticks in half-open")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Ranking parity checks for the in-memory StrategyIndex.
+
+The index replaces Chroma for strategy retrieval, so for unit-length vectors its
+top-k must match both a brute-force L2 ranking and Chroma's own results over the
+same vectors, also under a metadata pre-filter. Runs offline on random vectors; the Chroma check is skipped when
+langchain_chroma is not installed.
+"""
+import uuid
+
+import numpy as np
+
+from strategy_index import StrategyIndex, to_chroma_filter
+
+STRATEGIES = 21
+DIM = 64
+QUERIES = 50
+K = 3
+DIETS = ("vegan", "vegetarian", "omnivore")
+# Equivalent filters: Chroma-style dicts and a predicate
+FILTERS = (
+    {"diet": "vegan"},
+    {"diet": {"$in": ["vegan", "vegetarian"]}},
+    {"diet": {"$ne": "omnivore"}, "strategy_name": {"$nin": ["Strategy 1", "Strategy 4"]}},
+)
+
+
+def make_vectors(rows: int, seed: int) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((rows, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_index():
+    vectors = make_vectors(STRATEGIES, seed=0)
+    metadatas = [{"strategy_name": f"Strategy {i}", "diet": DIETS[i % len(DIETS)]} for i in range(STRATEGIES)]
+    return vectors, metadatas, StrategyIndex(vectors, metadatas, [f"Document {i}" for i in range(STRATEGIES)])
+
+
+def make_queries(vectors: np.ndarray) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(len(vectors), size=QUERIES)] + rng.standard_normal((QUERIES, DIM)).astype(np.float32) * 0.3
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def test_search_matches_brute_force_l2():
+    vectors, _, index = make_index()
+    queries = make_queries(vectors)
+    for query in queries:
+        distances = np.linalg.norm(vectors - query, axis=1)
+        assert index.search(query, k=K) == np.argsort(distances, kind="stable")[:K].tolist()
+
+
+def test_search_batch_matches_search():
+    vectors, _, index = make_index()
+    queries = make_queries(vectors)
+    assert index.search_batch(queries, k=K).tolist() == [index.search(query, k=K) for query in queries]
+
+
+def brute_force_filtered(vectors, metadatas, query, where) -> list:
+    allowed = [i for i, metadata in enumerate(metadatas) if where(metadata)]
+    distances = np.linalg.norm(vectors[allowed] - query, axis=1)
+    return [allowed[i] for i in np.argsort(distances, kind="stable")[:K]]
+
+
+def test_filtered_search_matches_brute_force_l2():
+    vectors, metadatas, index = make_index()
+
+    def vegan(metadata):
+        return metadata["diet"] == "vegan"
+
+    for query in make_queries(vectors):
+        expected = brute_force_filtered(vectors, metadatas, query, vegan)
+        assert index.search(query, k=K, where=vegan) == expected
+        assert index.search(query, k=K, where=FILTERS[0]) == expected
+        assert all(metadatas[i]["diet"] == "vegan" for i in expected)
+
+
+def test_filtered_search_batch_matches_search():
+    vectors, _, index = make_index()
+    queries = make_queries(vectors)
+    for where in FILTERS:
+        assert index.search_batch(queries, k=K, where=where).tolist() == [index.search(query, k=K, where=where) for query in queries]
+
+
+def test_filter_with_fewer_matches_than_k():
+    vectors, _, index = make_index()
+    where = {"strategy_name": {"$in": ["Strategy 2", "Strategy 5"]}}
+    assert sorted(index.search(vectors[0], k=K, where=where)) == [2, 5]
+    assert index.search(vectors[0], k=K, where={"diet": "paleo"}) == []
+
+
+def test_search_matches_chroma():
+    import pytest
+
+    langchain_chroma = pytest.importorskip("langchain_chroma")
+    vectors, metadatas, index = make_index()
+    vectorstore = langchain_chroma.Chroma(collection_name=f"parity-{uuid.uuid4().hex}")
+    try:
+        vectorstore._collection.add(
+            ids=[str(i) for i in range(STRATEGIES)],
+            embeddings=vectors.tolist(),
+            metadatas=metadatas,
+            documents=[f"Document {i}" for i in range(STRATEGIES)],
+        )
+        loaded = StrategyIndex.from_chroma(vectorstore)
+        for query in make_queries(vectors):
+            chroma_names = [doc.metadata["strategy_name"] for doc in vectorstore.similarity_search_by_vector(query.tolist(), k=K)]
+            assert [m["strategy_name"] for m in index.search_metadata(query, k=K)] == chroma_names
+            assert [m["strategy_name"] for m in loaded.search_metadata(query, k=K)] == chroma_names
+            for where in FILTERS:
+                chroma_names = [
+                    doc.metadata["strategy_name"]
+                    for doc in vectorstore.similarity_search_by_vector(query.tolist(), k=K, filter=to_chroma_filter(where))
+                ]
+                assert [m["strategy_name"] for m in index.search_metadata(query, k=K, where=where)] == chroma_names
+    finally:
+        vectorstore.delete_collection()
+
+
+if __name__ == "__main__":
+    test_search_matches_brute_force_l2()
+    test_search_batch_matches_search()
+    test_filtered_search_matches_brute_force_l2()
+    test_filtered_search_batch_matches_search()
+    test_filter_with_fewer_matches_than_k()
+    test_search_matches_chroma()
+    print("✅ StrategyIndex ranking matches brute force and Chroma, with and without filters")
@@ -0,0 +1,133 @@
+"""
+Per-process cache of authenticated user rows for get_current_user.
+
+Every authenticated request used to decode the JWT and then fetch the same
+users row from Supabase. Rows are now cached per (email, token) for a short
+TTL (and never past the token's own expiry), in an LRU bounded by
+USER_CACHE_MAX_ENTRIES. Writes to a user row invalidate all of that user's
+entries in this process; other uvicorn workers pick up the change when their
+entry expires, so keep the TTL short.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+
+class UserCache:
+    """Thread-safe TTL + LRU cache of user rows keyed by email and token."""
+
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_entries: int = USER_CACHE_MAX_ENTRIES,
+                 enabled: bool = USER_CACHE_ENABLED, clock=time.monotonic, wall_clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._clock = clock
+        self._wall_clock = wall_clock
+        # (email, token hash) -> (expires_at, user row)
+        self._entries = OrderedDict()
+        self._keys_by_email = {}
+        self._email_by_id = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(email: str, token: str) -> tuple:
+        # Only a digest of the token is kept in memory
+        return email, hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _remove(self, key):
+        _, user = self._entries.pop(key)
+        keys = self._keys_by_email.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_email[key[0]]
+                self._email_by_id.pop(user.get("id"), None)
+
+    def get(self, email: str, token: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        key = self._key(email, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if self._clock() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(user)
+
+    def put(self, email: str, token: str, user: dict, token_expires_at: Optional[float] = None):
+        """Cache a user row; token_expires_at is the JWT `exp` (epoch seconds), if any."""
+        if not self.enabled or not user:
+            return
+        ttl = self.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - self._wall_clock())
+        if ttl <= 0:
+            return
+        key = self._key(email, token)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock() + ttl, dict(user))
+            self._keys_by_email.setdefault(email, set()).add(key)
+            if user.get("id") is not None:
+                self._email_by_id[user["id"]] = email
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, email: Optional[str] = None, user_id=None):
+        """Drop every cached entry (all tokens) of a user, by email or by id."""
+        with self._lock:
+            if email is None and user_id is not None:
+                email = self._email_by_id.get(user_id)
+            if email is None:
+                return
+            keys = list(self._keys_by_email.get(email, ()))
+            for key in keys:
+                self._remove(key)
+            if keys:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_email.clear()
+            self._email_by_id.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+user_cache = UserCache()
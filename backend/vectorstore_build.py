@@ -0,0 +1,130 @@
+"""
+Incremental, resumable vectorstore builds for build_vectorstore.py and build_strategy_store.py.
+
+Every document gets a content-hash id (sha256 of its text and metadata). A
+manifest next to the Chroma files records which ids have been embedded and
+with which embedding model, so a rebuild only:
+
+- embeds documents whose hash isn't in the manifest yet (new or edited rows),
+- deletes vectors whose hash no longer appears in the source (stale rows),
+- leaves everything else alone.
+
+Missing documents are embedded in batches with a bounded number of concurrent
+requests. Each finished batch is written to Chroma and checkpointed in the
+manifest right away, so a crashed build resumes where it stopped.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import List
+
+from langchain_core.documents import Document
+
+MANIFEST_FILE = "build_manifest.json"
+BUILD_BATCH_SIZE = int(os.getenv("BUILD_EMBED_BATCH_SIZE", "128"))
+BUILD_CONCURRENCY = int(os.getenv("BUILD_EMBED_CONCURRENCY", "4"))
+
+
+def document_id(doc: Document) -> str:
+    payload = json.dumps({"text": doc.page_content, "metadata": doc.metadata}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _manifest_path(persist_dir: str, collection_name: str) -> str:
+    return os.path.join(persist_dir, f"{collection_name}_{MANIFEST_FILE}")
+
+
+def load_manifest(persist_dir: str, collection_name: str) -> dict:
+    try:
+        with open(_manifest_path(persist_dir, collection_name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"namespace": None, "ids": []}
+
+
+def save_manifest(persist_dir: str, collection_name: str, manifest: dict):
+    path = _manifest_path(persist_dir, collection_name)
+    os.makedirs(persist_dir, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+async def _embed_batches(embeddings, batches, concurrency, on_batch_done):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(batch):
+        async with semaphore:
+            vectors = await embeddings.aembed_documents([doc.page_content for _, doc in batch])
+        on_batch_done(batch, vectors)
+
+    await asyncio.gather(*(run(batch) for batch in batches))
+
+
+def build_incremental(vectorstore, documents: List[Document], embeddings, persist_dir: str,
+                      batch_size: int = BUILD_BATCH_SIZE, concurrency: int = BUILD_CONCURRENCY) -> dict:
+    """
+    Bring a Chroma vectorstore in line with `documents`, embedding only what changed.
+    Returns a report with counts and the build time.
+    """
+    start = time.perf_counter()
+    collection = vectorstore._collection
+    collection_name = collection.name
+    namespace = getattr(embeddings, "namespace", None) or type(embeddings).__name__
+
+    current = {}
+    for doc in documents:
+        current.setdefault(document_id(doc), doc)
+
+    manifest = load_manifest(persist_dir, collection_name)
+    stored_ids = set(collection.get(include=[])["ids"])
+    if manifest.get("namespace") != namespace:
+        # Different embedding model: nothing already stored can be reused
+        done = set()
+        stale = stored_ids
+    else:
+        # Only trust ids that are both checkpointed and actually in Chroma
+        done = set(manifest["ids"]) & stored_ids & current.keys()
+        stale = stored_ids - current.keys()
+
+    if stale:
+        stale_ids = list(stale)
+        for i in range(0, len(stale_ids), 5000):
+            collection.delete(ids=stale_ids[i:i + 5000])
+
+    manifest = {"namespace": namespace, "ids": sorted(done)}
+    save_manifest(persist_dir, collection_name, manifest)
+
+    pending = [(doc_id, doc) for doc_id, doc in current.items() if doc_id not in done]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    def checkpoint(batch, vectors):
+        collection.upsert(
+            ids=[doc_id for doc_id, _ in batch],
+            embeddings=vectors,
+            documents=[doc.page_content for _, doc in batch],
+            metadatas=[doc.metadata or None for _, doc in batch],
+        )
+        done.update(doc_id for doc_id, _ in batch)
+        manifest["ids"] = sorted(done)
+        save_manifest(persist_dir, collection_name, manifest)
+        print(f"  embedded {len(done)}/{len(current)} documents")
+
+    if batches:
+        asyncio.run(_embed_batches(embeddings, batches, concurrency, checkpoint))
+
+    return {
+        "documents": len(current),
+        "unchanged": len(current) - len(pending),
+        "embedded": len(pending),
+        "deleted": len(stale),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def format_report(report: dict) -> str:
+    return (f"{report['documents']} documents: {report['embedded']} embedded, {report['unchanged']} unchanged, "
+            f"{report['deleted']} stale deleted in {report['seconds']:.2f}s")
@@ -1,63 +1,67 @@
-from pathlib import Path
+import os
+import sys
 import json
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import pdfplumber
+from pathlib import Path
 from dotenv import load_dotenv
 
+# The ingestion, embedding cache and build helpers live in backend/ and are shared with the API
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
 load_dotenv()
 
-# 📍 Pad naar je bronbestand (PDF)
-pdf_path = Path("data/raw_book/InFloBook.pdf")
+# 📍 Pad naar je bronbestand(en) (PDF)
+pdf_paths = [Path("data/raw_book/InFloBook.pdf")]
+output_path = Path("data/processed/chunks_AlisaVita.json")
 
-# 📤 Extract tekst uit PDF
-text = ""
-with pdfplumber.open(pdf_path) as pdf:
-    for page in pdf.pages:
-        text += page.extract_text() + "\n"
 
-# 🔪 Chunken met langchain's TextSplitter
-splitter = RecursiveCharacterTextSplitter(
-    chunk_size=500,
-    chunk_overlap=100
-)
-chunks = splitter.split_text(text)
+def chunk_books():
+    # 📤🔪 Pagina's parallel extraheren en als stream chunken; chunks direct wegschrijven als JSONL
+    # (en als JSON-lijst voor de build hieronder en de API)
+    # 🧹 Bijna-dubbele chunks (herhaalde koppen, inhoudsopgave) vallen eruit vóór het embedden
+    from chunk_dedup import DedupReport
+    from embedding_backends import embedding_dimension
+    from pdf_ingest import ingest_pdfs
 
-# ✅ Opslaan als JSON
-output_path = Path("data/processed/chunks_AlisaVita.json")
-output_path.parent.mkdir(parents=True, exist_ok=True)
+    dedup_report = DedupReport(embedding_dim=embedding_dimension())
+    count = ingest_pdfs(pdf_paths, output_path.with_suffix(".jsonl"), json_path=output_path, chunk_size=500, chunk_overlap=100,
+                        dedup=True, dedup_report=dedup_report)
+    print(f"✅ Extracted and chunked {count} passages to {output_path.with_suffix('.jsonl')} and {output_path}")
+    print(f"🧹 Near-duplicate removal: {dedup_report}")
 
-with open(output_path, "w", encoding="utf-8") as f:
-    json.dump(chunks, f, ensure_ascii=False, indent=2)
 
-print(f"✅ Extracted and chunked {len(chunks)} passages to {output_path}")
+def build_vectorstore():
+    from langchain_community.vectorstores import Chroma
+    from langchain.schema import Document
+    from embedding_backends import EMBEDDING_BACKEND, get_embeddings, vectorstore_dir
+    from vectorstore_build import build_incremental, format_report
 
-import os
-import json
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.schema import Document
-
-persist_dir = "data/vectorstore"
-
-# 📖 Chunks laden
-with open("data/processed/chunks_AlisaVita.json", "r", encoding="utf-8") as f:
-    chunks = json.load(f)
-
-documents = [
-    Document(page_content=chunk, metadata={"source": "AlisaVita"})
-    for chunk in chunks
-]
-
-# 🔑 Embedding model
-embedding_model = OpenAIEmbeddings(openai_api_key=os.environ["OPENAI_API_KEY"])
-
-# 💾 Vectorstore bouwen en opslaan
-vectorstore = Chroma.from_documents(
-    documents=documents,
-    embedding=embedding_model,
-    persist_directory=persist_dir,
-    collection_name="langchain"
-)
-vectorstore.persist()
-
-print(f"✅ Vectorstore created and saved to: {persist_dir}")
\ No newline at end of file
+    # The store the API reads; EMBEDDING_BACKEND=onnx writes a parallel store so both backends can be compared
+    persist_dir = vectorstore_dir("chroma", EMBEDDING_BACKEND)
+
+    # 📖 Chunks laden
+    with open("data/processed/chunks_AlisaVita.json", "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+
+    documents = [
+        Document(page_content=chunk, metadata={"source": "AlisaVita"})
+        for chunk in chunks
+    ]
+
+    # 🔑 Embedding model
+    embedding_model = get_embeddings(EMBEDDING_BACKEND)
+
+    # 💾 Vectorstore bijwerken: alleen nieuwe/gewijzigde chunks embedden, verdwenen chunks verwijderen
+    vectorstore = Chroma(
+        embedding_function=embedding_model,
+        persist_directory=persist_dir,
+        collection_name="langchain"
+    )
+    report = build_incremental(vectorstore, documents, embedding_model, persist_dir)
+
+    print(f"✅ Vectorstore up to date in {persist_dir}: {format_report(report)}")
+
+
+# The process pool re-imports this file in its workers, so nothing may run at import
+if __name__ == "__main__":
+    chunk_books()
+    build_vectorstore()
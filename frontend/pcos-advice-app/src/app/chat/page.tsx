@@ -2,7 +2,7 @@
 import { useState, useRef, useEffect } from "react";
 import { v4 as uuidv4 } from "uuid";
 import { ChatStep } from "@/components/ChatStep";
-import { fetchChatHistoryAndSend } from "@/lib/api";
+import { fetchChatHistoryAndSend, streamChatAnswer } from "@/lib/api";
 import { auth } from "@/lib/auth";
 import { useRouter } from 'next/navigation';
 import { useAuth } from '@/lib/auth';
@@ -61,20 +61,31 @@ export default function ChatPage() {
     if (!input.trim()) return;
     const token = auth.getToken();
     if (!token) return;
+    const question = input.trim();
+    const botMessageId = uuidv4();
     setMessages((prev) => [
       ...prev,
-      { id: uuidv4(), type: "user", text: input.trim() },
+      { id: uuidv4(), type: "user", text: question },
     ]);
     setInput("");
     setIsLoading(true);
     try {
-      const res = await fetchChatHistoryAndSend(input.trim(), token);
-      setMessages(res.history.map((m) => ({
-        id: uuidv4(),
-        type: m.sender === 'user' ? 'user' : 'bot',
-        text: m.text,
-        timestamp: m.timestamp,
-      })));
+      let started = false;
+      const { answer, timestamp } = await streamChatAnswer(question, token, (chunk) => {
+        // Show the bot message as soon as the first token arrives
+        if (!started) {
+          started = true;
+          setIsLoading(false);
+          setMessages((prev) => [...prev, { id: botMessageId, type: "bot", text: chunk }]);
+        } else {
+          setMessages((prev) => prev.map((m) => m.id === botMessageId ? { ...m, text: m.text + chunk } : m));
+        }
+      });
+      if (!started) {
+        setMessages((prev) => [...prev, { id: botMessageId, type: "bot", text: answer, timestamp }]);
+      } else {
+        setMessages((prev) => prev.map((m) => m.id === botMessageId ? { ...m, text: answer, timestamp } : m));
+      }
     } catch {
       setMessages((prev) => [
         ...prev,
@@ -83,6 +83,61 @@ export async function fetchChatHistoryAndSend(question: string, token: string):
   return response.json();
 } 
 
+// Streams the bot answer from /chat/stream (server-sent events), calling onToken per token
+export async function streamChatAnswer(question: string, token: string, onToken: (token: string) => void): Promise<{answer: string, timestamp: string}> {
+  const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${token}`,
+    },
+    body: JSON.stringify({ question }),
+  });
+  if (!response.ok || !response.body) {
+    const errorBody = await response.text();
+    console.error('Failed to stream chat answer:', response.status, errorBody);
+    throw new Error('Failed to stream chat answer');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let answer = '';
+  let timestamp = new Date().toISOString();
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // SSE events are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let eventName = 'message';
+      let data = '';
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) eventName = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (eventName === 'done') {
+        answer = payload.answer;
+        timestamp = payload.timestamp;
+      } else {
+        answer += payload.token;
+        onToken(payload.token);
+      }
+    }
+  }
+  return { answer, timestamp };
+}
+
 export async function getTrackedSymptoms(): Promise<string[]> {
   const token = auth.getToken();
   const res = await fetch(`${API_BASE_URL}/symptoms`, {